@@ -1,18 +1,46 @@
 import os
 import time  # Added import for Python's time module
+from threading import Thread
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QLineEdit, QRadioButton, QButtonGroup, 
     QPushButton, QGroupBox, QFormLayout, QTabWidget,
-    QTableWidget, QTableWidgetItem, QHeaderView,
-    QProgressBar, QTextEdit, QFileDialog,
-    QCheckBox, QMessageBox
+    QHeaderView, QTextEdit, QFileDialog,
+    QCheckBox, QMessageBox, QTableView, QComboBox
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from services.tcp_client import TCPClient
-from services.worker_manager import WorkerManager
+from services.deadline import Deadline
+from services.result_view import ResultFilter
+from services.batch_index import BatchTermIndex
+from services.batch_journal import BatchJournal, load_journal, unfinished_journals, discard_journal
+from services.cpf_preflight import preflight_cpfs, is_valid_cpf
+from models.results_model import ResultsTableModel
+from models.jobs_model import JobsTableModel
+from models.batch_terms_model import BatchTermsModel, TERM_VIEWS
+from services.query_history import COMPLETED, FAILED, CANCELLED
+from models.delegates import ProgressBarDelegate, ButtonDelegate
+
+# Delay before pre-warming connections, so the network stack is imported after the first paint
+PREWARM_DELAY_MS = 100
+
+# Search-as-you-type: quiet period after the last keystroke and minimum term length
+LIVE_SEARCH_DEBOUNCE_MS = 300
+LIVE_SEARCH_MIN_CHARS = 3
+
+# How often the rate-limit status is refreshed
+RATE_STATUS_INTERVAL_MS = 1000
+
+# Quiet period after the last change to the result filters
+RESULT_FILTER_DEBOUNCE_MS = 250
+
+# Delay before offering to resume interrupted batches, so the window is painted first
+RESUME_CHECK_DELAY_MS = 500
 
 class MainWindow(QMainWindow):
+    # (pre-flight result or exception, (host, port, batch_size, deadline_seconds)),
+    # emitted from the pre-flight thread
+    preflight_ready = pyqtSignal(object, object)
+    
     def __init__(self):
         super().__init__()
         
@@ -22,14 +50,36 @@ class MainWindow(QMainWindow):
         # Request counter for identifying requests
         self.request_counter = 0
         
-        # Dictionary to store request start times
-        self.request_times = {}
+        # Worker manager is created on first use (see the worker_manager property)
+        self._worker_manager = None
+        
+        # Server whose connections were last pre-warmed
+        self.prewarmed_server = None
         
-        # Initialize worker manager
-        self.worker_manager = WorkerManager(use_workers=False)  # Configurado para sempre usar modo sem worker
+        # Newest search-as-you-type query; results of older ones are ignored
+        self.live_query_id = None
+        
+        # Journals of the batches still running
+        self.batch_journals = set()
         
         # Set up the UI
         self.setup_ui()
+        self.preflight_ready.connect(self.finish_batch_preflight)
+        
+        # Open connections to the default server in the background once the window is up
+        QTimer.singleShot(PREWARM_DELAY_MS, self.prewarm_connections)
+        
+        # Offer to continue batches a crash or shutdown interrupted
+        QTimer.singleShot(RESUME_CHECK_DELAY_MS, self.offer_batch_resume)
+        
+    @property
+    def worker_manager(self):
+        # Importing the services pulls in requests, urllib3 and multiprocessing,
+        # so it is deferred until a query or pre-warm actually needs them
+        if self._worker_manager is None:
+            from services.worker_manager import WorkerManager
+            self._worker_manager = WorkerManager(use_workers=False)  # Configurado para sempre usar modo sem worker
+        return self._worker_manager
         
     def setup_ui(self):
         # Create central widget and main layout
@@ -45,6 +95,37 @@ class MainWindow(QMainWindow):
         connection_layout.addRow("Host:", self.host_input)
         connection_layout.addRow("Porta:", self.port_input)
         
+        # Time budget for each query, or for a whole batch
+        self.deadline_input = QLineEdit()
+        self.deadline_input.setPlaceholderText("Sem prazo")
+        connection_layout.addRow("Prazo (s):", self.deadline_input)
+        
+        # Dispatch rate limit per server endpoint
+        self.rate_limit_input = QLineEdit()
+        self.rate_limit_input.setPlaceholderText("Sem limite")
+        self.rate_limit_input.editingFinished.connect(self.apply_rate_limit)
+        connection_layout.addRow("Limite (req/s):", self.rate_limit_input)
+        
+        # Persistent cache of results (lookups run in the executor threads)
+        self.use_cache_checkbox = QCheckBox("Usar cache local de CPFs")
+        self.use_cache_checkbox.setChecked(True)
+        self.use_cache_checkbox.setToolTip("Também responde buscas por nome mais específicas a partir de buscas recentes, sem consultar o servidor")
+        self.cache_names_checkbox = QCheckBox("Incluir buscas por nome no cache")
+        connection_layout.addRow(self.use_cache_checkbox)
+        connection_layout.addRow(self.cache_names_checkbox)
+        
+        # Run queries on the shared non-blocking I/O thread instead of one thread each
+        self.nonblocking_checkbox = QCheckBox("E/S não bloqueante (uma thread para todas as consultas)")
+        connection_layout.addRow(self.nonblocking_checkbox)
+        
+        # Multiplex queries over one HTTP/2 connection (HTTP/1.1 if the server doesn't support it)
+        self.http2_checkbox = QCheckBox("HTTP/2 (várias consultas em uma conexão)")
+        connection_layout.addRow(self.http2_checkbox)
+        
+        # Pre-warm connections whenever the server changes
+        self.host_input.editingFinished.connect(self.prewarm_connections)
+        self.port_input.editingFinished.connect(self.prewarm_connections)
+        
         connection_group.setLayout(connection_layout)
         main_layout.addWidget(connection_group)
         
@@ -78,13 +159,28 @@ class MainWindow(QMainWindow):
         self.search_input = QLineEdit()
         search_layout.addWidget(self.search_input)
         
+        # Search-as-you-type status
+        self.live_status_label = QLabel()
+        self.live_status_label.setVisible(False)
+        search_layout.addWidget(self.live_status_label)
+        
         # Batch mode checkbox
         batch_mode_layout = QHBoxLayout()
         self.batch_mode_checkbox = QCheckBox("Modo de requisições múltiplas")
+        self.live_search_checkbox = QCheckBox("Buscar enquanto digita")
         
         batch_mode_layout.addWidget(self.batch_mode_checkbox)
+        batch_mode_layout.addWidget(self.live_search_checkbox)
         search_layout.addLayout(batch_mode_layout)
         
+        # Debounce keystrokes: the query starts once typing pauses
+        self.live_search_timer = QTimer(self)
+        self.live_search_timer.setSingleShot(True)
+        self.live_search_timer.setInterval(LIVE_SEARCH_DEBOUNCE_MS)
+        self.live_search_timer.timeout.connect(self.perform_live_search)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.live_search_checkbox.stateChanged.connect(self.toggle_live_search)
+        
         # Batch size input (hidden by default)
         batch_size_layout = QHBoxLayout()
         batch_size_layout.addWidget(QLabel("Número de requisições:"))
@@ -97,6 +193,11 @@ class MainWindow(QMainWindow):
         self.batch_terms_input.setPlaceholderText("Termo 1\nTermo 2\nTermo 3")
         search_layout.addWidget(self.batch_terms_input)
         
+        # Outcome of the CPF batch pre-flight (valid, repeated and rejected terms)
+        self.preflight_label = QLabel()
+        self.preflight_label.setWordWrap(True)
+        search_layout.addWidget(self.preflight_label)
+        
         # File upload button (hidden by default)
         self.file_upload_button = QPushButton("Carregar arquivo de termos")
         search_layout.addWidget(self.file_upload_button)
@@ -107,6 +208,7 @@ class MainWindow(QMainWindow):
         # Hide batch-related widgets initially
         self.batch_size_input.setVisible(False)
         self.batch_terms_input.setVisible(False)
+        self.preflight_label.setVisible(False)
         self.file_upload_button.setVisible(False)
         
         # Connect batch mode checkbox
@@ -119,44 +221,251 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.search_button)
         
         # Results section with tabs
-        results_tabs = QTabWidget()
+        self.results_tabs = QTabWidget()
         
         # Individual queries tab
         self.queries_tab = QWidget()
         queries_layout = QVBoxLayout(self.queries_tab)
-        self.queries_table = QTableWidget(0, 5)
-        self.queries_table.setHorizontalHeaderLabels(["ID", "Termo", "Status", "Progresso", "Tempo (s)"])
-        self.queries_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.queries_model = JobsTableModel(
+            [("id", "ID"), ("term", "Termo"), ("status", "Status"), ("progress", "Progresso"),
+             ("elapsed", "Tempo (s)"), ("action", "Ação")],
+            parent=self
+        )
+        self.queries_table = self.create_jobs_table(self.queries_model)
         queries_layout.addWidget(self.queries_table)
+        self.queries_stats_label = QLabel()
+        self.queries_model.stats_changed.connect(self.queries_stats_label.setText)
+        queries_layout.addWidget(self.queries_stats_label)
+        
+        # Result filters (applied off the GUI thread, like sorting)
+        filter_layout = QHBoxLayout()
+        self.filter_cpf_input = QLineEdit()
+        self.filter_cpf_input.setPlaceholderText("CPF começa com")
+        self.filter_name_input = QLineEdit()
+        self.filter_name_input.setPlaceholderText("Nome contém")
+        self.filter_sex_combo = QComboBox()
+        self.filter_sex_combo.addItems(["Todos", "M", "F"])
+        self.filter_birth_from_input = QLineEdit()
+        self.filter_birth_from_input.setPlaceholderText("Nascimento de (dd/mm/aaaa ou ano)")
+        self.filter_birth_to_input = QLineEdit()
+        self.filter_birth_to_input.setPlaceholderText("até")
+        filter_layout.addWidget(QLabel("Filtrar:"))
+        filter_layout.addWidget(self.filter_cpf_input)
+        filter_layout.addWidget(self.filter_name_input)
+        filter_layout.addWidget(self.filter_sex_combo)
+        filter_layout.addWidget(self.filter_birth_from_input)
+        filter_layout.addWidget(self.filter_birth_to_input)
+        queries_layout.addLayout(filter_layout)
         
-        # Results display
-        self.results_table = QTableWidget(0, 4)
-        self.results_table.setHorizontalHeaderLabels(["CPF", "Nome", "Sexo", "Data de Nascimento"])
+        self.result_filter_timer = QTimer(self)
+        self.result_filter_timer.setSingleShot(True)
+        self.result_filter_timer.setInterval(RESULT_FILTER_DEBOUNCE_MS)
+        self.result_filter_timer.timeout.connect(self.apply_result_filter)
+        for filter_input in (self.filter_cpf_input, self.filter_name_input,
+                             self.filter_birth_from_input, self.filter_birth_to_input):
+            filter_input.textChanged.connect(lambda _: self.result_filter_timer.start())
+        self.filter_sex_combo.currentIndexChanged.connect(lambda _: self.result_filter_timer.start())
+        
+        # Results display: a view over a model, sorted by clicking the headers
+        self.results_model = ResultsTableModel(cpf_formatter=self.format_cpf, parent=self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Fixed row heights keep scrolling cheap with millions of rows
+        self.results_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Start unsorted (received order) before enabling sorting, which sorts right away
+        self.results_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.results_table.setSortingEnabled(True)
         queries_layout.addWidget(self.results_table)
         
-        # Batch queries tab
+        self.results_status_label = QLabel()
+        self.results_model.status_changed.connect(self.results_status_label.setText)
+        queries_layout.addWidget(self.results_status_label)
+        
+        # Batch queries tab (contents are built on first use)
         self.batch_tab = QWidget()
-        batch_layout = QVBoxLayout(self.batch_tab)
-        self.batch_table = QTableWidget(0, 5)
-        self.batch_table.setHorizontalHeaderLabels(["ID de Lote", "Status", "Progresso", "Resultados", "Tempo Total (s)"])
-        self.batch_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        batch_layout.addWidget(self.batch_table)
+        QVBoxLayout(self.batch_tab)
+        self.batch_model = None
+        self.batch_table = None
+        self.batch_terms_model = None
         
         # Add tabs to tab widget
-        results_tabs.addTab(self.queries_tab, "Consultas Individuais")
-        results_tabs.addTab(self.batch_tab, "Consultas em Lote")
+        self.results_tabs.addTab(self.queries_tab, "Consultas Individuais")
+        self.results_tabs.addTab(self.batch_tab, "Consultas em Lote")
+        self.results_tabs.currentChanged.connect(self.on_tab_changed)
         
-        main_layout.addWidget(results_tabs)
+        main_layout.addWidget(self.results_tabs)
         
         # Set central widget
         self.setCentralWidget(central_widget)
         
+        # Rate-limit status in the status bar
+        self.rate_status_timer = QTimer(self)
+        self.rate_status_timer.setInterval(RATE_STATUS_INTERVAL_MS)
+        self.rate_status_timer.timeout.connect(self.update_rate_status)
+        self.rate_status_timer.start()
+        
+    def setup_batch_tab(self):
+        # Build the batch table the first time it is needed
+        if self.batch_table is not None:
+            return
+        
+        batch_layout = self.batch_tab.layout()
+        self.batch_model = JobsTableModel(
+            [("label", "ID de Lote"), ("status", "Status"), ("progress", "Progresso"), ("results", "Resultados"),
+             ("elapsed", "Tempo Total (s)"), ("action", "Ação")],
+            item_name="lotes",
+            parent=self
+        )
+        self.batch_table = self.create_jobs_table(self.batch_model)
+        batch_layout.addWidget(self.batch_table)
+        self.batch_stats_label = QLabel()
+        self.batch_model.stats_changed.connect(self.batch_stats_label.setText)
+        batch_layout.addWidget(self.batch_stats_label)
+        
+        # Drill-down: the terms of the selected batch, each with its own results
+        terms_header_layout = QHBoxLayout()
+        terms_header_layout.addWidget(QLabel("Termos do lote:"))
+        self.batch_terms_view_combo = QComboBox()
+        for _, label in TERM_VIEWS:
+            self.batch_terms_view_combo.addItem(label)
+        terms_header_layout.addWidget(self.batch_terms_view_combo)
+        self.batch_terms_summary_label = QLabel("Selecione um lote")
+        terms_header_layout.addWidget(self.batch_terms_summary_label, 1)
+        batch_layout.addLayout(terms_header_layout)
+        
+        self.batch_terms_model = BatchTermsModel(self)
+        self.batch_terms_table = QTableView()
+        self.batch_terms_table.setModel(self.batch_terms_model)
+        self.batch_terms_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.batch_terms_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.batch_terms_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.batch_terms_table.setToolTip("Clique duas vezes em um termo para ver os resultados dele")
+        batch_layout.addWidget(self.batch_terms_table)
+        
+        # Which term of the selected batch returned a person
+        origin_layout = QHBoxLayout()
+        origin_layout.addWidget(QLabel("Termos que retornaram o CPF:"))
+        self.batch_origin_input = QLineEdit()
+        self.batch_origin_input.setPlaceholderText("000.000.000-00")
+        origin_layout.addWidget(self.batch_origin_input)
+        self.batch_origin_label = QLabel()
+        origin_layout.addWidget(self.batch_origin_label, 1)
+        batch_layout.addLayout(origin_layout)
+        
+        self.batch_table.selectionModel().currentRowChanged.connect(lambda current, _: self.show_batch_terms())
+        self.batch_terms_view_combo.currentIndexChanged.connect(
+            lambda position: self.batch_terms_model.set_view(TERM_VIEWS[position][0])
+        )
+        self.batch_terms_table.doubleClicked.connect(self.show_batch_term_results)
+        self.batch_origin_input.textChanged.connect(lambda _: self.find_batch_person_terms())
+        
+    def selected_batch(self):
+        """Term index of the batch selected in the batch table, or None"""
+        row = self.batch_table.currentIndex().row()
+        if row < 0 or row >= len(self.batch_model.rows):
+            return None
+        return self.batch_model.rows[row].get("batch")
+        
+    def show_batch_terms(self):
+        # List the terms of the newly selected batch
+        position = self.batch_terms_view_combo.currentIndex()
+        self.batch_terms_model.set_batch(self.selected_batch(), TERM_VIEWS[position][0])
+        self.update_batch_terms_summary()
+        self.find_batch_person_terms()
+        
+    def update_batch_terms_summary(self):
+        batch = self.batch_terms_model.batch
+        if batch is None:
+            self.batch_terms_summary_label.setText("Selecione um lote")
+            return
+        self.batch_terms_summary_label.setText(batch.summary())
+        
+    def batch_term_finished(self, batch, term_index):
+        # Repaint the term and the counts if its batch is the one being drilled into
+        if self.batch_terms_model.batch is batch:
+            self.batch_terms_model.term_changed(batch, term_index)
+            self.update_batch_terms_summary()
+        
+    def refresh_batch_terms(self, batch):
+        # Statuses changed all at once (cancellation): list the terms again
+        if self.batch_terms_model.batch is batch:
+            self.show_batch_terms()
+        
+    def show_batch_term_results(self, index):
+        # Show one term's results in the results table
+        batch = self.batch_terms_model.batch
+        if batch is None or not index.isValid():
+            return
+        self.display_results(batch.results_of(self.batch_terms_model.term_at(index.row())))
+        self.results_tabs.setCurrentWidget(self.queries_tab)
+        
+    def find_batch_person_terms(self):
+        batch = self.batch_terms_model.batch
+        cpf = ''.join(filter(str.isdigit, self.batch_origin_input.text()))
+        if batch is None or not cpf:
+            self.batch_origin_label.setText("")
+            return
+        terms = batch.terms_of(cpf)
+        if not terms:
+            self.batch_origin_label.setText("Nenhum termo deste lote retornou este CPF")
+            return
+        shown = ", ".join(f"#{term + 1} \"{batch.terms[term]}\"" for term in terms[:5])
+        more = f" e mais {len(terms) - 5}" if len(terms) > 5 else ""
+        self.batch_origin_label.setText(shown + more)
+        
+    def create_jobs_table(self, model):
+        """
+        View of a queries or batches model
+        
+        Progress bars and cancel buttons are painted by delegates rather than
+        being one widget per row, and updates repaint only the changed cells.
+        The model keeps a bounded history; evicted rows release whatever the
+        worker manager still holds for their queries.
+        """
+        model.rows_evicted.connect(self.forget_history_rows)
+        table = QTableView()
+        table.setModel(model)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.setEditTriggers(QTableView.NoEditTriggers)
+        
+        progress_delegate = ProgressBarDelegate(table)
+        table.setItemDelegateForColumn(model.column_of["progress"], progress_delegate)
+        cancel_delegate = ButtonDelegate(table)
+        cancel_delegate.clicked.connect(model.cancel)
+        table.setItemDelegateForColumn(model.column_of["action"], cancel_delegate)
+        return table
+        
+    def forget_history_rows(self, rows):
+        # Finished rows left the history: drop any bookkeeping still kept for their queries
+        if self.batch_terms_model is not None and any(
+            row.get("batch") is not None and row.get("batch") is self.batch_terms_model.batch for row in rows
+        ):
+            self.batch_terms_model.set_batch(None)
+            self.update_batch_terms_summary()
+        # Delete the results of evicted batches now rather than whenever the callbacks
+        # holding them are collected, except the batch the results table is showing
+        shown_store = getattr(self.results_model.results, "store", None)
+        for row in rows:
+            batch = row.get("batch")
+            if batch is not None and batch.store is not shown_store:
+                batch.close()
+        if self._worker_manager is None:
+            return
+        query_ids = [query_id for row in rows for query_id in row.get("query_ids", ())]
+        self._worker_manager.forget_queries(query_ids)
+        
+    def on_tab_changed(self, index):
+        if self.results_tabs.widget(index) is self.batch_tab:
+            self.setup_batch_tab()
+        
     def toggle_batch_mode(self, state):
         # Show/hide batch-related widgets based on checkbox state
         is_batch_mode = state == Qt.Checked
         self.batch_size_input.setVisible(is_batch_mode)
         self.batch_terms_input.setVisible(is_batch_mode)
+        self.preflight_label.setVisible(is_batch_mode and bool(self.preflight_label.text()))
         self.file_upload_button.setVisible(is_batch_mode)
         
         # Update search button text
@@ -165,6 +474,144 @@ class MainWindow(QMainWindow):
         else:
             self.search_button.setText("Buscar")
     
+    def apply_rate_limit(self):
+        text = self.rate_limit_input.text().strip().replace(',', '.')
+        requests_per_second = None
+        if text:
+            try:
+                requests_per_second = float(text)
+                if requests_per_second <= 0:
+                    raise ValueError()
+            except ValueError:
+                QMessageBox.warning(self, "Aviso", "Limite inválido. Digite o número de requisições por segundo.")
+                return
+        self.worker_manager.configure_rate_limit(requests_per_second=requests_per_second)
+    
+    def update_rate_status(self):
+        # Nothing to report before the services are loaded
+        if self._worker_manager is None:
+            return
+        stats = self._worker_manager.rate_limit_stats()
+        parts = []
+        for endpoint, endpoint_stats in sorted(stats.items()):
+            if endpoint_stats["rate"] == 0 and endpoint_stats["wait"] == 0:
+                continue
+            part = f"{endpoint}: {endpoint_stats['rate']:.1f} req/s"
+            if endpoint_stats["wait"] > 0:
+                part += f", espera {endpoint_stats['wait']:.1f}s"
+            parts.append(part)
+        self.statusBar().showMessage(" | ".join(parts))
+    
+    def toggle_live_search(self, state):
+        is_live = state == Qt.Checked
+        self.live_status_label.setVisible(is_live)
+        if is_live:
+            self.on_search_text_changed(self.search_input.text())
+        else:
+            self.live_search_timer.stop()
+            self.cancel_live_query()
+            self.live_status_label.clear()
+    
+    def on_search_text_changed(self, text):
+        if not self.live_search_checkbox.isChecked() or self.batch_mode_checkbox.isChecked():
+            return
+        # Restart the quiet period on every keystroke
+        self.live_search_timer.start()
+    
+    def cancel_live_query(self):
+        # Superseded queries give their connection slot back immediately
+        if self.live_query_id is not None:
+            self.worker_manager.cancel_query(self.live_query_id)
+            self.live_query_id = None
+    
+    def perform_live_search(self):
+        host = self.host_input.text().strip()
+        try:
+            port = int(self.port_input.text().strip())
+        except ValueError:
+            return
+        if not host or port <= 0 or port > 65535:
+            return
+        
+        search_term = self.search_input.text().strip()
+        query_type = self.get_query_type()
+        if query_type == "cpf":
+            search_term = ''.join(filter(str.isdigit, search_term))
+            is_complete = len(search_term) == 11
+        else:
+            is_complete = len(search_term) >= LIVE_SEARCH_MIN_CHARS
+        
+        self.cancel_live_query()
+        if not is_complete:
+            self.live_status_label.setText("Continue digitando...")
+            return
+        
+        self.request_counter += 1
+        query_id = f"live_{self.request_counter}_{int(time.time() * 1000)}"
+        self.live_query_id = query_id
+        started = time.time()
+        self.live_status_label.setText(f"Buscando \"{search_term}\"...")
+        
+        # Only the newest query may touch the UI
+        def on_progress(update):
+            if query_id == self.live_query_id:
+                self.live_status_label.setText(f"Buscando \"{search_term}\"... {int(update['progress'])}%")
+        
+        def on_complete(results):
+            if query_id != self.live_query_id:
+                return
+            self.live_query_id = None
+            elapsed_time = time.time() - started
+            self.live_status_label.setText(f"{len(results)} resultados para \"{search_term}\" em {elapsed_time:.2f}s")
+            self.display_results(results)
+        
+        def on_error(error):
+            if query_id != self.live_query_id:
+                return
+            self.live_query_id = None
+            self.live_status_label.setText(f"Erro: {error}")
+        
+        self.worker_manager.execute_query(
+            {
+                "host": host,
+                "port": port,
+                "search_term": search_term,
+                "query_type": query_type,
+                "query_id": query_id,
+                "request_number": self.request_counter,
+                "use_cache": self.use_cache_checkbox.isChecked(),
+                "cache_names": self.cache_names_checkbox.isChecked(),
+                "transport": self.selected_transport()
+            },
+            {
+                "on_progress": on_progress,
+                "on_complete": on_complete,
+                "on_error": on_error
+            }
+        )
+    
+    def selected_transport(self):
+        """Transport for new queries: HTTP/2 or HTTP/1.1 on the non-blocking core, or blocking requests"""
+        if self.http2_checkbox.isChecked():
+            return "h2"
+        return "selectors" if self.nonblocking_checkbox.isChecked() else "requests"
+    
+    def prewarm_connections(self):
+        # Silently ignore incomplete connection settings
+        host = self.host_input.text().strip()
+        try:
+            port = int(self.port_input.text().strip())
+        except ValueError:
+            return
+        if not host or port <= 0 or port > 65535:
+            return
+        
+        # Only pre-warm when the server actually changed
+        if self.prewarmed_server == (host, port):
+            return
+        self.prewarmed_server = (host, port)
+        self.worker_manager.prewarm(host, port)
+    
     def load_file(self):
         # Open file dialog to select a file
         file_path, _ = QFileDialog.getOpenFileName(self, "Abrir Arquivo de Termos", "", "Arquivos de Texto (*.txt *.csv)")
@@ -212,18 +659,22 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Aviso", "Porta inválida. Digite um número entre 1 e 65535.")
             return
         
+        # Validate the optional deadline
+        deadline_text = self.deadline_input.text().strip().replace(',', '.')
+        deadline_seconds = None
+        if deadline_text:
+            try:
+                deadline_seconds = float(deadline_text)
+                if deadline_seconds <= 0:
+                    raise ValueError()
+            except ValueError:
+                QMessageBox.warning(self, "Aviso", "Prazo inválido. Digite um número de segundos maior que zero.")
+                return
+        
         # Check if batch mode is enabled
         is_batch_mode = self.batch_mode_checkbox.isChecked()
         
         if is_batch_mode:
-            # Get batch terms
-            batch_text = self.batch_terms_input.toPlainText().strip()
-            batch_terms = [term.strip() for term in batch_text.replace(',', '\n').split('\n') if term.strip()]
-            
-            if not batch_terms:
-                QMessageBox.warning(self, "Aviso", "Nenhum termo de busca fornecido para consulta em lote")
-                return
-                
             # Get batch size
             try:
                 batch_size = int(self.batch_size_input.text())
@@ -232,9 +683,21 @@ class MainWindow(QMainWindow):
             except ValueError:
                 QMessageBox.warning(self, "Aviso", "Número de requisições inválido")
                 return
+            
+            # Get batch terms
+            batch_text = self.batch_terms_input.toPlainText().strip()
+            if self.get_query_type() == "cpf" and batch_text:
+                # The batch starts once its CPFs are checked (see finish_batch_preflight)
+                self.start_batch_preflight(host, port, batch_text, batch_size, deadline_seconds)
+                return
+            batch_terms = [term.strip() for term in batch_text.replace(',', '\n').split('\n') if term.strip()]
+            
+            if not batch_terms:
+                QMessageBox.warning(self, "Aviso", "Nenhum termo de busca fornecido para consulta em lote")
+                return
                 
             # Execute batch query
-            self.execute_batch_query(host, port, batch_terms, batch_size)
+            self.execute_batch_query(host, port, batch_terms, batch_size, deadline_seconds)
         else:
             # Single query mode
             search_term = self.search_input.text().strip()
@@ -242,18 +705,57 @@ class MainWindow(QMainWindow):
             if not search_term:
                 QMessageBox.warning(self, "Aviso", "Termo de busca não pode estar vazio")
                 return
+            
+            if self.get_query_type() == "cpf" and not is_valid_cpf(''.join(filter(str.isdigit, search_term))):
+                QMessageBox.warning(self, "Aviso", "CPF inválido: são necessários 11 dígitos com dígitos verificadores corretos")
+                return
                 
             # Execute single query
-            self.execute_query(host, port, search_term)
+            self.execute_query(host, port, search_term, deadline_seconds)
+    
+    def start_batch_preflight(self, host, port, batch_text, batch_size, deadline_seconds=None):
+        # Normalize, validate and dedupe in bulk, so only CPFs that can exist reach the
+        # network; millions of lines take a while, so it runs off the GUI thread
+        self.preflight_label.setText("Verificando os CPFs do lote...")
+        self.preflight_label.setVisible(True)
+        self.search_button.setEnabled(False)
+        
+        def run():
+            try:
+                preflight = preflight_cpfs(batch_text)
+            except Exception as e:
+                preflight = e
+            self.preflight_ready.emit(preflight, (host, port, batch_size, deadline_seconds))
+        
+        preflight_thread = Thread(target=run, name="batch-preflight")
+        preflight_thread.daemon = True
+        preflight_thread.start()
     
-    def execute_query(self, host, port, search_term):
+    def finish_batch_preflight(self, preflight, batch):
+        self.search_button.setEnabled(True)
+        if isinstance(preflight, Exception):
+            self.preflight_label.setText(f"Erro ao verificar o lote: {str(preflight)}")
+            QMessageBox.warning(self, "Erro", f"Não foi possível verificar os CPFs do lote: {str(preflight)}")
+            return
+        
+        print(f"Batch pre-flight: {preflight.summary()}")
+        self.preflight_label.setText(preflight.summary())
+        if preflight.total_terms and not preflight.cpfs:
+            QMessageBox.warning(self, "Aviso", f"Nenhum CPF válido no lote.\n{preflight.summary()}")
+            return
+        if not preflight.cpfs:
+            QMessageBox.warning(self, "Aviso", "Nenhum termo de busca fornecido para consulta em lote")
+            return
+        
+        # The first batch_size CPFs in input order are queried
+        host, port, batch_size, deadline_seconds = batch
+        self.execute_batch_query(host, port, preflight.cpfs, batch_size, deadline_seconds)
+    
+    def execute_query(self, host, port, search_term, deadline_seconds=None):
         # Increment request counter
         self.request_counter += 1
         query_id = f"query_{self.request_counter}_{int(time.time() * 1000)}"
         
-        # Registrar o tempo inicial da requisição
-        self.request_times[query_id] = time.time()
-        
         # Get query type
         query_type = self.get_query_type()
         
@@ -261,43 +763,26 @@ class MainWindow(QMainWindow):
         if query_type == "cpf":
             search_term = ''.join(filter(str.isdigit, search_term))
         
-        # Add query to table
-        row_position = self.queries_table.rowCount()
-        self.queries_table.insertRow(row_position)
-        self.queries_table.setItem(row_position, 0, QTableWidgetItem(str(self.request_counter)))
-        self.queries_table.setItem(row_position, 1, QTableWidgetItem(search_term))
-        self.queries_table.setItem(row_position, 2, QTableWidgetItem("Pendente"))
+        def on_cancel():
+            # Frees the connection slot right away; late results are discarded
+            self.worker_manager.cancel_query(query_id)
+            self.queries_model.finish(row_position, "Cancelado", CANCELLED)
         
-        # Create progress bar
-        progress_bar = QProgressBar()
-        progress_bar.setRange(0, 100)
-        progress_bar.setValue(0)
-        self.queries_table.setCellWidget(row_position, 3, progress_bar)
-        self.queries_table.setItem(row_position, 4, QTableWidgetItem("Calculando..."))
+        # Add query to table (the model records its start time)
+        row_position = self.queries_model.add_row(
+            on_cancel=on_cancel, id=str(self.request_counter), term=search_term, query_ids=[query_id]
+        )
         
         # Define callbacks
         def on_progress(update):
-            progress_bar.setValue(int(update["progress"]))
-            self.queries_table.setItem(row_position, 2, QTableWidgetItem(update["status"]))
+            self.queries_model.update(row_position, status=update["status"], progress=int(update["progress"]))
             
         def on_complete(results):
-            # Calcular o tempo de execução
-            elapsed_time = time.time() - self.request_times.get(query_id, time.time())
-            elapsed_str = f"{elapsed_time:.2f}"
-            
-            progress_bar.setValue(100)
-            self.queries_table.setItem(row_position, 2, QTableWidgetItem("Concluído"))
-            self.queries_table.setItem(row_position, 4, QTableWidgetItem(elapsed_str))
+            self.queries_model.finish(row_position, "Concluído", COMPLETED, progress=100)
             self.display_results(results)
             
         def on_error(error):
-            # Calcular o tempo até o erro
-            elapsed_time = time.time() - self.request_times.get(query_id, time.time())
-            elapsed_str = f"{elapsed_time:.2f}"
-            
-            progress_bar.setValue(0)
-            self.queries_table.setItem(row_position, 2, QTableWidgetItem(f"Erro: {error}"))
-            self.queries_table.setItem(row_position, 4, QTableWidgetItem(elapsed_str))
+            self.queries_model.finish(row_position, f"Erro: {error}", FAILED, progress=0)
             QMessageBox.warning(self, "Erro na Consulta", f"Ocorreu um erro: {error}")
         
         # Execute query
@@ -308,7 +793,11 @@ class MainWindow(QMainWindow):
                 "search_term": search_term,
                 "query_type": query_type,
                 "query_id": query_id,
-                "request_number": self.request_counter
+                "request_number": self.request_counter,
+                "timeout_budget": deadline_seconds,
+                "use_cache": self.use_cache_checkbox.isChecked(),
+                "cache_names": self.cache_names_checkbox.isChecked(),
+                "transport": self.selected_transport()
             },
             {
                 "on_progress": on_progress,
@@ -317,73 +806,123 @@ class MainWindow(QMainWindow):
             }
         )
         
-    def execute_batch_query(self, host, port, batch_terms, batch_size):
-        # Get query type
-        query_type = self.get_query_type()
+    def execute_batch_query(self, host, port, batch_terms, batch_size, deadline_seconds=None, resume=None):
+        """
+        Run a batch, journaling every answered term so it can be resumed after a crash
+        
+        Args:
+            resume: JournalState of an interrupted batch; its answered terms are
+                restored and only the rest are queried (batch_terms is ignored), within
+                a fresh deadline of the batch's original budget
+        """
+        self.setup_batch_tab()
         
-        # Create batch ID
-        batch_id = f"batch_{int(time.time() * 1000)}"
+        # Get query type
+        query_type = resume.query_type if resume is not None else self.get_query_type()
         
-        # Registrar o tempo inicial do lote de consultas
-        self.request_times[batch_id] = time.time()
+        # Create batch ID (a resumed batch keeps its own, and its journal)
+        batch_id = resume.header["batch_id"] if resume is not None else f"batch_{int(time.time() * 1000)}"
+        if resume is not None:
+            batch_terms, batch_size = resume.terms, len(resume.terms)
+            deadline_seconds = resume.deadline_seconds
         
-        # Add batch to table
-        row_position = self.batch_table.rowCount()
-        self.batch_table.insertRow(row_position)
+        # One deadline bounds the whole batch, including terms waiting in the queue
+        batch_deadline = Deadline(deadline_seconds)
         
         # Show number of terms to process
         terms_to_process = min(len(batch_terms), batch_size)
-        self.batch_table.setItem(row_position, 0, QTableWidgetItem(f"Lote #{row_position+1} ({terms_to_process} termos)"))
-        self.batch_table.setItem(row_position, 1, QTableWidgetItem("Pendente"))
-        self.batch_table.setItem(row_position, 3, QTableWidgetItem("0"))
-        self.batch_table.setItem(row_position, 4, QTableWidgetItem("Calculando..."))
-        
-        # Create progress bar
-        progress_bar = QProgressBar()
-        progress_bar.setRange(0, 100)
-        progress_bar.setValue(0)
-        self.batch_table.setCellWidget(row_position, 2, progress_bar)
-        
-        # Keep track of completed queries and results
-        completed_queries = 0
-        all_results = []
         
-        # Process each term
+        # Terms as sent (CPFs as digits only)
         terms_to_process_list = batch_terms[:batch_size]
+        if query_type == "cpf":
+            terms_to_process_list = [''.join(filter(str.isdigit, term)) for term in terms_to_process_list]
+        
+        # Finished batches stay in the history for drill-down, read from disk
+        for row in self.batch_model.rows:
+            if row.get("batch") is not None and row["elapsed"] is not None:
+                row["batch"].store.release_memory()
+        
+        # Keep track of completed queries and each term's results (older results
+        # spill to disk past the memory ceiling, so a batch can outgrow RAM)
+        completed_queries = 0
+        batch = BatchTermIndex(terms_to_process_list)
+        all_results = batch.store
+        batch_query_ids = []
+        
+        # Terms answered before an interruption are restored instead of queried again
+        pending_terms = range(terms_to_process)
+        if resume is not None:
+            for term_index, results in resume.completed.items():
+                batch.add_results(term_index, results)
+            completed_queries = len(resume.completed)
+            pending_terms = resume.remaining
+        journal = self.open_batch_journal(
+            batch_id, query_type, host, port, terms_to_process_list, deadline_seconds, resume
+        )
+        
+        def end_batch(status, outcome):
+            # Nothing left to resume: drop the journal
+            if journal is not None:
+                journal.finish()
+                self.batch_journals.discard(journal)
+            self.batch_model.finish(row_position, status, outcome)
+            self.display_results(all_results)
+        
+        # Cancel button for the whole batch
+        def on_cancel():
+            # Cancels running and queued terms; results received so far are kept
+            self.worker_manager.cancel_queries(batch_query_ids)
+            batch.cancel_pending()
+            end_batch(f"Cancelado ({completed_queries}/{terms_to_process})", CANCELLED)
+            self.refresh_batch_terms(batch)
+        
+        # Add batch to table
+        # Numbered over the whole session (older rows may have left the history)
+        batch_number = self.batch_model.next_key + 1
+        row_position = self.batch_model.add_row(
+            on_cancel=on_cancel,
+            label=f"Lote #{batch_number} ({terms_to_process} termos{', retomado' if resume is not None else ''})",
+            results=len(all_results), progress=int(completed_queries / terms_to_process * 100),
+            query_ids=batch_query_ids, batch=batch
+        )
+        # Drill into the new batch while it runs
+        self.batch_table.selectRow(self.batch_model.rowCount() - 1)
         
-        for term in terms_to_process_list:
+        if completed_queries >= terms_to_process:
+            # Interrupted after its last term was journaled
+            end_batch("Concluído", COMPLETED)
+            return
+        
+        # Process each term
+        for term_index in pending_terms:
+            term = terms_to_process_list[term_index]
             # Increment request counter
             self.request_counter += 1
             query_id = f"{batch_id}_{self.request_counter}"
+            batch_query_ids.append(query_id)
             
             # Define callbacks for this term
             def make_on_complete(term_index):
                 def on_complete(results):
-                    nonlocal completed_queries, all_results
+                    nonlocal completed_queries
                     completed_queries += 1
-                    all_results.extend(results)
+                    batch.add_results(term_index, results)
+                    if journal is not None:
+                        journal.record(term_index, results)
+                    self.batch_term_finished(batch, term_index)
                     
-                    # Update progress
+                    # Update progress, status and results count in one repaint of the row
                     progress = (completed_queries / terms_to_process) * 100
-                    progress_bar.setValue(int(progress))
-                    
-                    # Update status
-                    self.batch_table.setItem(row_position, 1, 
-                                            QTableWidgetItem(f"Processando ({completed_queries}/{terms_to_process})"))
-                    
-                    # Update results count
-                    self.batch_table.setItem(row_position, 3, QTableWidgetItem(str(len(all_results))))
+                    self.batch_model.update(
+                        row_position,
+                        status=f"Processando ({completed_queries}/{terms_to_process})",
+                        progress=int(progress),
+                        results=len(all_results)
+                    )
                     
                     # Check if batch is complete
                     if completed_queries >= terms_to_process:
-                        self.batch_table.setItem(row_position, 1, QTableWidgetItem("Concluído"))
-                        
-                        # Calcular o tempo total de execução do lote
-                        elapsed_time = time.time() - self.request_times.get(batch_id, time.time())
-                        elapsed_str = f"{elapsed_time:.2f}"
-                        self.batch_table.setItem(row_position, 4, QTableWidgetItem(elapsed_str))
-                        
-                        self.display_results(all_results)
+                        end_batch("Concluído", COMPLETED)
                         
                 return on_complete
             
@@ -391,35 +930,22 @@ class MainWindow(QMainWindow):
                 def on_error(error):
                     nonlocal completed_queries
                     completed_queries += 1
+                    batch.add_error(term_index, error)
+                    self.batch_term_finished(batch, term_index)
                     
-                    # Update progress
+                    # Update progress and status with error info
                     progress = (completed_queries / terms_to_process) * 100
-                    progress_bar.setValue(int(progress))
-                    
-                    # Update status with error info
-                    current_status = self.batch_table.item(row_position, 1).text()
-                    if "Erro" not in current_status:
-                        self.batch_table.setItem(row_position, 1, 
-                                                QTableWidgetItem(f"{current_status} (Erro em alguns termos)"))
+                    status = self.batch_model.value(row_position, "status") or ""
+                    if "Erro" not in status:
+                        status = f"{status} (Erro em alguns termos)"
+                    self.batch_model.update(row_position, status=status, progress=int(progress))
                     
                     # Check if batch is complete
                     if completed_queries >= terms_to_process:
-                        self.batch_table.setItem(row_position, 1, 
-                                               QTableWidgetItem("Concluído com erros"))
-                        
-                        # Calcular o tempo total de execução do lote
-                        elapsed_time = time.time() - self.request_times.get(batch_id, time.time())
-                        elapsed_str = f"{elapsed_time:.2f}"
-                        self.batch_table.setItem(row_position, 4, QTableWidgetItem(elapsed_str))
-                        
-                        self.display_results(all_results)
+                        end_batch("Concluído com erros", FAILED)
                         
                 return on_error
             
-            # Format term if CPF
-            if query_type == "cpf":
-                term = ''.join(filter(str.isdigit, term))
-            
             # Execute query
             self.worker_manager.execute_query(
                 {
@@ -428,28 +954,85 @@ class MainWindow(QMainWindow):
                     "search_term": term,
                     "query_type": query_type,
                     "query_id": query_id,
-                    "request_number": self.request_counter
+                    "request_number": self.request_counter,
+                    "deadline": batch_deadline,
+                    "use_cache": self.use_cache_checkbox.isChecked(),
+                    "cache_names": self.cache_names_checkbox.isChecked(),
+                    "transport": self.selected_transport()
                 },
                 {
                     "on_progress": None,  # No progress tracking for individual terms in batch
-                    "on_complete": make_on_complete(term),
-                    "on_error": make_on_error(term)
+                    "on_complete": make_on_complete(term_index),
+                    "on_error": make_on_error(term_index)
                 }
             )
     
-    def display_results(self, results):
-        # Clear current results
-        self.results_table.setRowCount(0)
-        
-        # Add each result to the table
-        for result in results:
-            row_position = self.results_table.rowCount()
-            self.results_table.insertRow(row_position)
-            
-            # Format CPF for display
-            cpf = self.format_cpf(result.get("cpf", ""))
+    def open_batch_journal(self, batch_id, query_type, host, port, terms, deadline_seconds=None, resume=None):
+        """Journal of a batch's answered terms, or None if it can't be written (the batch runs anyway)"""
+        try:
+            if resume is not None:
+                journal = BatchJournal.reopen(resume)
+            else:
+                journal = BatchJournal.create(batch_id, query_type, host, port, terms, deadline_seconds)
+        except OSError as e:
+            print(f"Batch journal unavailable: {str(e)}")
+            return None
+        self.batch_journals.add(journal)
+        return journal
+    
+    def offer_batch_resume(self):
+        # Batches interrupted by a crash or shutdown continue where they stopped
+        running = {journal.path for journal in self.batch_journals}
+        for state in unfinished_journals():
+            if state.path in running:
+                continue
+            dialog = QMessageBox(self)
+            dialog.setWindowTitle("Retomar lote")
+            dialog.setText("Um lote foi interrompido antes de terminar.")
+            question = "Retomar apenas os termos restantes?"
+            if state.deadline_seconds:
+                question += f"\nO prazo de {state.deadline_seconds:g}s do lote recomeça a contar ao retomar."
+            dialog.setInformativeText(f"{state.summary()}\n\n{question}")
+            resume_button = dialog.addButton("Retomar", QMessageBox.AcceptRole)
+            discard_button = dialog.addButton("Descartar", QMessageBox.DestructiveRole)
+            dialog.addButton("Depois", QMessageBox.RejectRole)
+            dialog.exec_()
             
-            self.results_table.setItem(row_position, 0, QTableWidgetItem(cpf))
-            self.results_table.setItem(row_position, 1, QTableWidgetItem(result.get("nome", "")))
-            self.results_table.setItem(row_position, 2, QTableWidgetItem(result.get("sexo", "")))
-            self.results_table.setItem(row_position, 3, QTableWidgetItem(result.get("nasc", "")))
\ No newline at end of file
+            if dialog.clickedButton() is discard_button:
+                discard_journal(state.path)
+            elif dialog.clickedButton() is resume_button:
+                try:
+                    state = load_journal(state.path)
+                except (OSError, ValueError, KeyError) as e:
+                    QMessageBox.warning(self, "Erro", f"Não foi possível ler o lote interrompido: {str(e)}")
+                    continue
+                print(f"Resuming batch {state.header['batch_id']}: {state.summary()}")
+                self.results_tabs.setCurrentWidget(self.batch_tab)
+                self.execute_batch_query(state.host, state.port, state.terms, len(state.terms), resume=state)
+    
+    def closeEvent(self, event):
+        # Write what running batches answered so far; they are offered for resume on the next start
+        for journal in list(self.batch_journals):
+            journal.close()
+        self.batch_journals.clear()
+        super().closeEvent(event)
+    
+    def display_results(self, results):
+        # The model shows the rows at once and sorts/filters them in the background
+        self.results_model.set_results(results)
+    
+    def apply_result_filter(self):
+        """Filter the displayed results with the values in the filter bar"""
+        sex = self.filter_sex_combo.currentText()
+        try:
+            row_filter = ResultFilter(
+                cpf=self.filter_cpf_input.text(),
+                nome=self.filter_name_input.text(),
+                sexo="" if sex == "Todos" else sex,
+                nasc_from=self.filter_birth_from_input.text(),
+                nasc_to=self.filter_birth_to_input.text()
+            )
+        except ValueError as e:
+            self.results_status_label.setText(str(e))
+            return
+        self.results_model.set_filter(row_filter)
@@ -0,0 +1,52 @@
+"""
+Parse-throughput benchmark for the JSON backends
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_json --records 50000
+"""
+import argparse
+import json
+import time
+
+from services import json_backend
+from benchmarks.payloads import make_results
+
+
+def bench_backend(name: str, payload: bytes, repeat: int) -> float:
+    """Return the best parse time in seconds for a backend"""
+    decode = json_backend.get_decoder(name)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends on person result payloads")
+    parser.add_argument("--records", type=int, default=50000, help="Number of person records in the payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per backend (best time is reported)")
+    args = parser.parse_args()
+
+    payload = json.dumps(
+        {"isComplete": True, "results": make_results(args.records)},
+        ensure_ascii=False
+    ).encode("utf-8")
+    size_mb = len(payload) / (1024 * 1024)
+    print(f"Payload: {args.records} records, {size_mb:.2f} MB")
+
+    timings = {}
+    for name in json_backend.available_backends():
+        elapsed = bench_backend(name, payload, args.repeat)
+        timings[name] = elapsed
+        print(f"{name:>8}: {elapsed * 1000:8.2f} ms  {size_mb / elapsed:8.1f} MB/s")
+
+    baseline = timings.get("json")
+    for name, elapsed in timings.items():
+        if baseline and name != "json":
+            print(f"{name} speedup over json: {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Microbenchmarks of the client's hot paths, compared against a saved baseline
+
+Each case runs a fixed workload several times and keeps the best time (the
+least disturbed by other processes). With --save-baseline the times are
+written to the baseline file; later runs print the change against it and
+exit with code 1 when any case got slower than --threshold percent.
+Baselines are per machine: save one before a change and compare after it.
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_micro --save-baseline
+    python -m benchmarks.bench_micro --threshold 15
+    python -m benchmarks.bench_micro --only framer --repeat 9
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import contextlib
+from typing import Callable, Dict, List, Tuple
+
+from PyQt5.QtCore import QCoreApplication
+
+from services.json_stream import JSONObjectFramer
+from services.worker_manager import ResultProcessor, WorkerManager
+from services.cpf_preflight import preflight_cpfs
+from services.result_view import ResultKeys, view_order
+from models.results_model import ResultsTableModel
+from models.jobs_model import JobsTableModel
+from benchmarks.payloads import make_results, make_stream_body, split_chunks
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+
+# Baseline file format version
+BASELINE_VERSION = 1
+
+# name -> setup(scale) returning (run, units, unit name); run() prepares its
+# state, times the measured part itself and returns the seconds it took
+CASES: Dict[str, Callable[[float], Tuple[Callable[[], float], int, str]]] = {}
+
+
+def case(name: str):
+    """Register a benchmark case"""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def timed(function, *args) -> float:
+    """Seconds taken by function(*args), with its output discarded"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+
+
+def qt_application() -> QCoreApplication:
+    """The event loop signals are delivered through (one per process)"""
+    return QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+
+# Stream framing (the response body split into JSON documents)
+
+def _framer_case(body: bytes, chunk_size: int):
+    chunks = split_chunks(body, chunk_size)
+
+    def run():
+        framer = JSONObjectFramer()
+        return timed(lambda: [framer.feed(chunk) for chunk in chunks])
+    return run, len(body) // 1024, "KB"
+
+
+@case("framer.progress_objects")
+def framer_progress_objects(scale):
+    """Many small progress documents, as sent by a long name search"""
+    return _framer_case(make_stream_body(count=10, progress_messages=int(20000 * scale)), 4096)
+
+
+@case("framer.results_64k_reads")
+def framer_results_large_reads(scale):
+    """One large results document read in 64 KB pieces"""
+    return _framer_case(make_stream_body(count=int(20000 * scale)), 65536)
+
+
+@case("framer.results_512b_reads")
+def framer_results_small_reads(scale):
+    """The same document in 512-byte pieces (scanning resumes after every read)"""
+    return _framer_case(make_stream_body(count=int(20000 * scale)), 512)
+
+
+@case("framer.escaped_strings")
+def framer_escaped_strings(scale):
+    """Names with braces, escaped quotes and accents, in pieces that split multibyte characters"""
+    records = make_results(int(5000 * scale))
+    for index, record in enumerate(records):
+        if index % 3 == 0:
+            record["nome"] += ' {"APELIDO"} \\ }{'
+    body = json.dumps({"isComplete": True, "results": records}, ensure_ascii=False).encode("utf-8")
+    return _framer_case(body, 61)
+
+
+# Result processor signal dispatch
+
+def _dispatch_case(count: int, from_thread: bool):
+    application = qt_application()
+    processor = ResultProcessor()
+    processor.progress_signal.connect(processor.handle_progress)
+    update = {"progress": 50, "status": "Consultando", "message": "Processando bloco"}
+
+    def run():
+        received = [0]
+
+        def on_progress(_):
+            received[0] += 1
+        processor.register_callbacks("bench", {"on_progress": on_progress})
+
+        def emit_all():
+            for _ in range(count):
+                processor.progress_signal.emit("bench", update)
+
+        def measured():
+            if not from_thread:
+                emit_all()
+                return
+            # Like the result thread: emitted elsewhere, delivered by the GUI event loop
+            emitter = threading.Thread(target=emit_all)
+            emitter.start()
+            while received[0] < count:
+                application.processEvents()
+            emitter.join()
+
+        elapsed = timed(measured)
+        processor.unregister_callbacks("bench")
+        return elapsed
+    return run, count, "signal"
+
+
+@case("dispatch.direct")
+def dispatch_direct(scale):
+    """Progress signals emitted and handled on the same thread"""
+    return _dispatch_case(int(50000 * scale), from_thread=False)
+
+
+@case("dispatch.queued")
+def dispatch_queued(scale):
+    """Progress signals from another thread, delivered through the event loop"""
+    return _dispatch_case(int(20000 * scale), from_thread=True)
+
+
+# Results table
+
+@case("results.set_results")
+def results_set_results(scale):
+    """A large result set handed to the model in received order"""
+    qt_application()
+    results = make_results(int(200000 * scale))
+
+    def run():
+        model = ResultsTableModel()
+        return timed(model.set_results, results)
+    return run, len(results), "row"
+
+
+@case("results.sorted_view")
+def results_sorted_view(scale):
+    """Sort keys and the name-sorted permutation of a new result set (the background part of a sorted display)"""
+    results = make_results(int(100000 * scale))
+    return (lambda: timed(lambda: view_order(ResultKeys(results), "nome"))), len(results), "row"
+
+
+@case("results.cell_reads")
+def results_cell_reads(scale):
+    """data() for every cell of a sorted view, as read while painting and scrolling"""
+    qt_application()
+    results = make_results(int(20000 * scale))
+    model = ResultsTableModel()
+    model.set_results(results)
+    model.keys = ResultKeys(results)
+    model.order = view_order(model.keys, "nome")
+    indexes = [model.index(row, column) for row in range(len(results)) for column in range(model.columnCount())]
+
+    def run():
+        return timed(lambda: [model.data(index) for index in indexes])
+    return run, len(indexes), "cell"
+
+
+# Jobs history
+
+@case("jobs.progress_updates")
+def jobs_progress_updates(scale):
+    """Progress updates of the running rows of a full history table"""
+    qt_application()
+    rows = 1000
+    updates = int(50000 * scale)
+
+    def run():
+        model = JobsTableModel([("status", "Status"), ("progress", "Progresso"), ("elapsed", "Tempo")], max_rows=rows)
+        keys = [model.add_row(query=str(index)) for index in range(rows)]
+        return timed(lambda: [
+            model.update(keys[index % rows], status="Consultando", progress=index % 100)
+            for index in range(updates)
+        ])
+    return run, updates, "update"
+
+
+# Query queue
+
+class QueueOnlyManager(WorkerManager):
+    """WorkerManager whose queries take a slot but never run, to time the queue alone"""
+    def _execute_query(self, options, callbacks):
+        self.active_connections += 1
+        self.active_workers[options.get("query_id")] = options
+
+
+def _queued_manager(count: int) -> Tuple[QueueOnlyManager, List[Dict]]:
+    manager = QueueOnlyManager()
+    queries = [
+        {"query_id": f"query_{index}", "query_type": "cpf", "host": "127.0.0.1", "port": 5000,
+         "search_term": f"{index:011d}", "allow_refinement": False}
+        for index in range(count)
+    ]
+    return manager, queries
+
+
+def _stop(manager: WorkerManager):
+    # The result thread notices within its 0.1s poll; nothing else runs
+    manager.should_stop = True
+
+
+@case("queue.enqueue")
+def queue_enqueue(scale):
+    """Queries submitted while every connection slot is busy"""
+    qt_application()
+    count = int(2000 * scale)
+
+    def run():
+        manager, queries = _queued_manager(count)
+        elapsed = timed(lambda: [manager.execute_query(options, {}) for options in queries])
+        _stop(manager)
+        return elapsed
+    return run, count, "query"
+
+
+@case("queue.drain")
+def queue_drain(scale):
+    """Queries started one by one as running ones finish, with thousands pending"""
+    qt_application()
+    count = int(2000 * scale)
+
+    def run():
+        manager, queries = _queued_manager(count)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for options in queries:
+                manager.execute_query(options, {})
+
+        def drain():
+            for options in queries:
+                manager._finish_query(options["query_id"])
+        elapsed = timed(drain)
+        _stop(manager)
+        return elapsed
+    return run, count, "query"
+
+
+# Batch pre-flight
+
+@case("preflight.python")
+def preflight_python(scale):
+    """Pure-Python validation and deduplication of a CPF batch"""
+    count = int(100000 * scale)
+    text = "\n".join(f"{index:09d}{index % 100:02d}" for index in range(count))
+    return (lambda: timed(preflight_cpfs, text, False)), count, "term"
+
+
+def run_cases(names: List[str], scale: float, repeat: int) -> Dict[str, Dict]:
+    """Best time of every case"""
+    measurements = {}
+    for name in names:
+        run, units, unit = CASES[name](scale)
+        # One untimed round warms caches, imports and Qt's type registrations
+        run()
+        best = min(run() for _ in range(repeat))
+        measurements[name] = {"seconds": best, "units": units, "unit": unit}
+        print(f"{name:<28} {best * 1000:9.2f} ms  {best * 1e6 / max(units, 1):9.3f} µs/{unit}")
+    return measurements
+
+
+def load_baseline(path: str) -> Dict:
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version in {path}: {baseline.get('version')}")
+    return baseline
+
+
+def save_baseline(path: str, measurements: Dict[str, Dict], scale: float):
+    """Write the measurements, keeping the baseline of cases that weren't run this time"""
+    cases = {}
+    if os.path.exists(path):
+        try:
+            previous = load_baseline(path)
+            if previous.get("scale") == scale:
+                cases = previous["cases"]
+        except (OSError, ValueError) as e:
+            print(f"Replacing unreadable baseline: {str(e)}")
+    cases.update(measurements)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    baseline = {
+        "version": BASELINE_VERSION,
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "scale": scale,
+        "cases": cases
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+    print(f"Baseline saved to {path}")
+
+
+def compare(measurements: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """
+    Print the change of every case against the baseline
+
+    Returns:
+        Names of the cases slower than the baseline by more than `threshold` percent
+    """
+    print(f"\nAgainst the baseline of {baseline['saved_at']} ({baseline['machine']}, Python {baseline['python']}):")
+    regressions = []
+    for name, measurement in measurements.items():
+        reference = baseline["cases"].get(name)
+        if reference is None or reference["units"] != measurement["units"]:
+            print(f"{name:<28} {'no comparable baseline':>22}")
+            continue
+        change = (measurement["seconds"] / reference["seconds"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<28} {reference['seconds'] * 1000:9.2f} ms -> {measurement['seconds'] * 1000:9.2f} ms  {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the client's hot paths with baseline comparison")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file (default: benchmarks/baselines/micro.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Slowdown in percent reported as a regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (best time is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Workload size multiplier (baselines compare only at the same scale)")
+    parser.add_argument("--only", action="append", default=[], help="Run only cases whose name contains this text (repeatable)")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, setup in CASES.items():
+            print(f"{name:<28} {setup.__doc__}")
+        return 0
+
+    names = [name for name in CASES if not args.only or any(text in name for text in args.only)]
+    if not names:
+        print("No case matches --only")
+        return 1
+
+    measurements = run_cases(names, args.scale, args.repeat)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, measurements, args.scale)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline.get("scale") != args.scale:
+        print(f"\nBaseline was saved at scale {baseline.get('scale')}, not {args.scale}; nothing to compare")
+        return 0
+
+    regressions = compare(measurements, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) more than {args.threshold:.0f}% slower: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo case more than {args.threshold:.0f}% slower")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
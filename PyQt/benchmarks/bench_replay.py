@@ -0,0 +1,148 @@
+"""
+Record/replay benchmark: capture raw response streams once, then run the
+client's response pipeline (decompression, stream framing, progress and
+results) on them offline, at the recorded pace or as fast as possible
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_replay record --out fixtures/ --standin --records 50000 --name A --name SILVA
+    python -m benchmarks.bench_replay record --out fixtures/ --host 192.168.0.101 --port 5000 --tls --name SILVA
+    python -m benchmarks.bench_replay replay fixtures/ --repeat 5
+    python -m benchmarks.bench_replay replay fixtures/ --speed 1   (original timing)
+
+Responses of the app itself can be recorded too: run it with
+CPF_RECORD_DIR=fixtures/ and every response is saved there.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import contextlib
+import urllib.parse
+
+from services.tcp_client import TCPClient
+from services.stream_recording import ReplaySession, load_recordings
+from benchmarks.bench_transport import wait_for_port
+
+
+def query(client, path):
+    """Run the client method that issues `path`"""
+    endpoint, _, term = path.strip("/").partition("/")
+    term = urllib.parse.unquote(term)
+    if endpoint == "get-person-by-name":
+        return client.get_person_by_name(term)
+    if endpoint == "get-person-by-exact-name":
+        return client.get_person_by_exact_name(term)
+    if endpoint == "get-person-by-cpf":
+        return client.get_person_by_cpf(term)
+    raise ValueError(f"Unknown endpoint in recording: {path}")
+
+
+def record(args):
+    server = None
+    host, port, use_https = args.host, args.port, args.tls
+    if args.standin:
+        host = "127.0.0.1"
+        command = [
+            sys.executable, "-m", "benchmarks.standin_server", "--port", str(port),
+            "--records", str(args.records), "--latency-ms", str(args.latency_ms)
+        ]
+        if use_https:
+            command.append("--tls")
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        if not wait_for_port(port):
+            server.kill()
+            print(f"Stand-in server did not start on port {port}")
+            return 1
+
+    paths = (
+        [f"/get-person-by-name/{urllib.parse.quote(name)}" for name in args.name]
+        + [f"/get-person-by-exact-name/{urllib.parse.quote(name)}" for name in args.exact_name]
+        + [f"/get-person-by-cpf/{''.join(filter(str.isdigit, cpf))}" for cpf in args.cpf]
+    )
+    try:
+        for path in paths:
+            client = TCPClient(host, port, use_https=use_https, transport=args.transport)
+            client.max_retries = 0
+            client.record_dir = args.out
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = query(client, path)
+            print(f"{path}: {len(results)} results recorded")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+def replay(args):
+    recordings = load_recordings(args.fixtures)
+    if not recordings:
+        print("No recordings found")
+        return 1
+
+    total_cpu = total_wall = 0.0
+    total_bytes = 0
+    for recording in recordings:
+        best_cpu = best_wall = float("inf")
+        for _ in range(args.repeat):
+            client = TCPClient("replay", 0, use_https=False)
+            client.max_retries = 0
+            client.record_dir = None
+            client.session = ReplaySession([recording], speed=args.speed)
+
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = query(client, recording.path)
+            best_wall = min(best_wall, time.perf_counter() - wall_start)
+            best_cpu = min(best_cpu, time.process_time() - cpu_start)
+
+        megabytes = recording.size / (1024 * 1024)
+        total_cpu += best_cpu
+        total_wall += best_wall
+        total_bytes += recording.size
+        note = "" if recording.complete else "  (incomplete recording)"
+        print(f"{recording.path[:48]:<48} {len(recording.chunks):6d} chunks {megabytes:7.2f} MB "
+              f"{len(results):7d} results  wall {best_wall * 1000:8.1f} ms  CPU {best_cpu * 1000:7.1f} ms  "
+              f"{best_cpu * 1000 / max(megabytes, 1e-9):7.1f} ms/MB{note}")
+
+    megabytes = total_bytes / (1024 * 1024)
+    print(f"{'total':<48} {'':13} {megabytes:7.2f} MB {'':15} wall {total_wall * 1000:8.1f} ms  "
+          f"CPU {total_cpu * 1000:7.1f} ms  {total_cpu * 1000 / max(megabytes, 1e-9):7.1f} ms/MB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record response streams and replay them through the client")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    recorder = commands.add_parser("record", help="Query a server and save the raw responses")
+    recorder.add_argument("--out", required=True, help="Directory for the recordings")
+    recorder.add_argument("--host", default="127.0.0.1", help="Server host")
+    recorder.add_argument("--port", type=int, default=8853, help="Server port")
+    recorder.add_argument("--tls", action="store_true", help="Use HTTPS")
+    recorder.add_argument("--transport", default="requests", choices=("requests", "selectors", "h2"))
+    recorder.add_argument("--standin", action="store_true", help="Start the stand-in server on --port")
+    recorder.add_argument("--records", type=int, default=50000, help="Stand-in records searchable by name")
+    recorder.add_argument("--latency-ms", type=float, default=0, help="Stand-in delay before answering")
+    recorder.add_argument("--name", action="append", default=[], help="Name search to record (repeatable)")
+    recorder.add_argument("--exact-name", action="append", default=[], help="Exact-name search to record")
+    recorder.add_argument("--cpf", action="append", default=[], help="CPF lookup to record")
+
+    replayer = commands.add_parser("replay", help="Run the client on saved recordings")
+    replayer.add_argument("fixtures", nargs="+", help="Recording files or directories")
+    replayer.add_argument("--speed", type=float, default=0,
+                          help="1 replays at the recorded pace, 10 ten times faster, 0 without waiting (default)")
+    replayer.add_argument("--repeat", type=int, default=3, help="Runs per recording (best time is reported)")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        if not (args.name or args.exact_name or args.cpf):
+            parser.error("record needs at least one --name, --exact-name or --cpf")
+        return record(args)
+    return replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Import-time and startup benchmark with a budget
+
+Runs the application in fresh interpreters using `-X importtime`, reports
+the heaviest imports and fails (exit code 1) when the budget is exceeded or
+when the network stack is imported before the first paint.
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_startup --runs 5 --import-budget-ms 150 --startup-budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PYQT_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported on first use
+DEFERRED_MODULES = ("requests", "urllib3", "multiprocessing", "selectors")
+
+# Builds the main window, waits for the first paint and reports the elapsed time
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from app import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+print(f"STARTUP_MS={(time.perf_counter() - start) * 1000:.2f}")
+print("LOADED=" + ",".join(sorted(m for m in sys.modules if m.split('.')[0] in %r)))
+""" % (DEFERRED_MODULES,)
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output
+
+    Returns:
+        List of (module, self microseconds, cumulative microseconds)
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line.split(":", 1)[1].split("|")
+        entries.append((module.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module: str) -> List[Tuple[str, int, int]]:
+    """Import a module in a fresh interpreter and return the importtime entries"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PYQT_DIR,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return parse_importtime(completed.stderr)
+
+
+def measure_startup() -> Tuple[float, List[str]]:
+    """Start the main window in a fresh interpreter and return (ms to first paint, deferred modules loaded)"""
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=PYQT_DIR,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    startup_ms = 0.0
+    loaded = []
+    for line in completed.stdout.splitlines():
+        if line.startswith("STARTUP_MS="):
+            startup_ms = float(line.split("=", 1)[1])
+        elif line.startswith("LOADED="):
+            loaded = [name for name in line.split("=", 1)[1].split(",") if name]
+    return startup_ms, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first paint")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters per measurement")
+    parser.add_argument("--import-budget-ms", type=float, default=150.0, help="Budget for `import app`")
+    parser.add_argument("--startup-budget-ms", type=float, default=1000.0, help="Budget for first paint")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list")
+    args = parser.parse_args()
+
+    import_times = []
+    entries = []
+    for _ in range(args.runs):
+        entries = measure_import("app")
+        app_entry = next(entry for entry in entries if entry[0] == "app")
+        import_times.append(app_entry[2] / 1000)
+
+    startup_times = []
+    loaded = []
+    for _ in range(args.runs):
+        startup_ms, loaded = measure_startup()
+        startup_times.append(startup_ms)
+
+    import_ms = statistics.median(import_times)
+    startup_ms = statistics.median(startup_times)
+
+    print("Heaviest imports (last run, cumulative):")
+    for module, _, cumulative_us in sorted(entries, key=lambda entry: entry[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.2f} ms  {module}")
+
+    print(f"import app:     {import_ms:8.2f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"first paint:    {startup_ms:8.2f} ms (budget {args.startup_budget_ms:.0f} ms)")
+
+    failed = False
+    if import_ms > args.import_budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if startup_ms > args.startup_budget_ms:
+        print("FAIL: startup time over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules imported before first paint: {', '.join(loaded)}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
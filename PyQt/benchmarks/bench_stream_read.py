@@ -0,0 +1,84 @@
+"""
+Streaming read benchmark: CPU per MB received by a blocking name search
+with fixed 512-byte reads against adaptive read sizes
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_stream_read --records 50000 --repeat 5
+    python -m benchmarks.bench_stream_read --tls --term SILVA
+    python -m benchmarks.bench_stream_read --identity   (uncompressed responses)
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import contextlib
+
+from services.tcp_client import TCPClient, STREAM_READ_MIN, STREAM_READ_MAX
+from benchmarks.bench_transport import wait_for_port
+
+
+def run(port, use_https, term, repeat, read_min, read_max):
+    """Best CPU time and wall time of `repeat` searches, with the transfer sizes of the last one"""
+    best_cpu = best_wall = float("inf")
+    stats = None
+    for _ in range(repeat):
+        client = TCPClient("127.0.0.1", port, use_https=use_https)
+        client.max_retries = 0
+        client.stream_read_min = read_min
+        client.stream_read_max = read_max
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = client.get_person_by_name(term)
+        best_wall = min(best_wall, time.perf_counter() - wall_start)
+        best_cpu = min(best_cpu, time.process_time() - cpu_start)
+        stats = client.last_transfer_stats
+    return best_cpu, best_wall, len(results), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fixed and adaptive stream read sizes")
+    parser.add_argument("--records", type=int, default=50000, help="Stand-in records searchable by name")
+    parser.add_argument("--term", default="A", help="Name searched (broader terms return more data)")
+    parser.add_argument("--repeat", type=int, default=5, help="Searches per mode (best time is reported)")
+    parser.add_argument("--tls", action="store_true", help="Use HTTPS")
+    parser.add_argument("--identity", action="store_true", help="Have the server skip compression")
+    parser.add_argument("--port", type=int, default=8852, help="Port for the stand-in server")
+    args = parser.parse_args()
+
+    command = [
+        sys.executable, "-m", "benchmarks.standin_server", "--port", str(args.port),
+        "--records", str(args.records)
+    ]
+    if args.tls:
+        command.append("--tls")
+    if args.identity:
+        command.append("--no-gzip")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    if not wait_for_port(args.port):
+        server.kill()
+        print(f"Stand-in server did not start on port {args.port}")
+        return 1
+
+    modes = (
+        ("fixed 512", 512, 512),
+        ("adaptive", STREAM_READ_MIN, STREAM_READ_MAX)
+    )
+    try:
+        for label, read_min, read_max in modes:
+            cpu, wall, count, stats = run(args.port, args.tls, args.term, args.repeat, read_min, read_max)
+            decoded_mb = stats["decoded_bytes"] / (1024 * 1024)
+            received_mb = stats["compressed_bytes"] / (1024 * 1024)
+            print(f"{label:<10} {count:6d} results  {received_mb:6.2f} MB received ({decoded_mb:6.2f} MB decoded)  "
+                  f"wall {wall * 1000:7.1f} ms  CPU {cpu * 1000:7.1f} ms  "
+                  f"{cpu * 1000 / received_mb:7.1f} ms/MB received  {cpu * 1000 / decoded_mb:6.1f} ms/MB decoded")
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
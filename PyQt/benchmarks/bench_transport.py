@@ -0,0 +1,151 @@
+"""
+Transport benchmark: blocking `requests` (one thread per query) against the
+non-blocking selectors core (one I/O thread for every query), and optionally
+HTTP/2 over that core (every query multiplexed on one connection)
+
+Usage (from the PyQt directory):
+    python -m benchmarks.bench_transport --queries 400 --concurrency 50
+    python -m benchmarks.bench_transport --tls --latency-ms 50 --kind name
+    python -m benchmarks.bench_transport --tls --http2   (needs `h2`)
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from services.tcp_client import TCPClient
+
+CPFS = ["123.456.789-09", "987.654.321-00", "111.444.777-35", "529.982.247-25"]
+NAMES = ["SILVA", "MARIA", "SANTOS", "OLIVEIRA"]
+
+
+def run_requests(host, port, use_https, kind, queries, concurrency):
+    """Blocking transport: a pool of `concurrency` threads, like ThreadedExecutor"""
+    def one(index):
+        client = TCPClient(host, port, use_https=use_https, request_number=index)
+        client.max_retries = 0
+        if kind == "cpf":
+            return client.get_person_by_cpf(CPFS[index % len(CPFS)])
+        return client.get_person_by_name(NAMES[index % len(NAMES)])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(queries)))
+    return len(results), 0
+
+
+def run_selectors(host, port, use_https, kind, queries, concurrency, transport="selectors"):
+    """Non-blocking transport: at most `concurrency` queries in flight on the I/O thread"""
+    done = threading.Event()
+    slots = threading.Semaphore(concurrency)
+    counts = {"ok": 0, "errors": 0, "finished": 0}
+    lock = threading.Lock()
+
+    def finish(ok):
+        with lock:
+            counts["ok" if ok else "errors"] += 1
+            counts["finished"] += 1
+            if counts["finished"] == queries:
+                done.set()
+        slots.release()
+
+    for index in range(queries):
+        slots.acquire()
+        client = TCPClient(host, port, use_https=use_https, request_number=index, transport=transport)
+        client.max_retries = 0
+        term = CPFS[index % len(CPFS)] if kind == "cpf" else NAMES[index % len(NAMES)]
+        client.start_query(kind, term, lambda results: finish(True), lambda error: finish(False))
+
+    done.wait()
+    return counts["ok"], counts["errors"]
+
+
+def measure(label, runner, *args):
+    threads_before = threading.active_count()
+    peak_threads = [threads_before]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(0.01):
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        ok, errors = runner(*args)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    stop.set()
+    sampler.join()
+    extra_threads = peak_threads[0] - threads_before - 1  # minus the sampler
+    print(f"{label:<10} {ok:6d} ok {errors:4d} err  {wall:7.2f}s  {ok / wall:8.1f} q/s  "
+          f"CPU {cpu:6.2f}s ({cpu / max(ok, 1) * 1000:5.2f} ms/q)  extra threads {extra_threads:4d}")
+
+
+def wait_for_port(port, timeout=10.0):
+    """Wait until something accepts connections on a local port"""
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the requests and selectors transports")
+    parser.add_argument("--queries", type=int, default=400, help="Queries per transport")
+    parser.add_argument("--concurrency", type=int, default=50, help="Queries in flight at once")
+    parser.add_argument("--kind", choices=("cpf", "name"), default="cpf", help="Query type")
+    parser.add_argument("--tls", action="store_true", help="Use HTTPS")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in server latency")
+    parser.add_argument("--records", type=int, default=2000, help="Stand-in records searchable by name")
+    parser.add_argument("--port", type=int, default=8851, help="Port for the stand-in server")
+    parser.add_argument("--http2", action="store_true", help="Also measure HTTP/2 (implies --tls)")
+    args = parser.parse_args()
+    args.tls = args.tls or args.http2
+
+    # The server runs in its own process so its threads and CPU time aren't counted
+    command = [
+        sys.executable, "-m", "benchmarks.standin_server", "--port", str(args.port),
+        "--records", str(args.records), "--latency-ms", str(args.latency_ms)
+    ]
+    if args.tls:
+        command.append("--tls")
+    if args.http2:
+        command.append("--http2")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    if not wait_for_port(args.port):
+        server.kill()
+        print(f"Stand-in server did not start on port {args.port}")
+        return 1
+
+    print(f"{args.queries} {args.kind} queries, {args.concurrency} in flight, "
+          f"{'https' if args.tls else 'http'}, server latency {args.latency_ms:.0f}ms")
+    runners = [("requests", run_requests), ("selectors", run_selectors)]
+    if args.http2:
+        runners.append(("h2", lambda *run_args: run_selectors(*run_args, transport="h2")))
+    try:
+        for label, runner in runners:
+            # Warm up connections and imports before measuring
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                runner("127.0.0.1", args.port, args.tls, args.kind, min(args.concurrency, args.queries), args.concurrency)
+            measure(label, runner, "127.0.0.1", args.port, args.tls, args.kind, args.queries, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
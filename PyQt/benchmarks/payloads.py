@@ -0,0 +1,55 @@
+import random
+from typing import Dict, List
+
+FIRST_NAMES = [
+    "MARIA", "JOSÉ", "ANA", "JOÃO", "ANTÔNIO", "FRANCISCA", "CARLOS", "PAULO",
+    "LUCAS", "LUÍS", "MÁRCIA", "CONCEIÇÃO", "SEBASTIÃO", "JÚLIA", "ÂNGELA",
+]
+SURNAMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES",
+    "PEREIRA", "LIMA", "GOMES", "RIBEIRO", "CONCEIÇÃO", "ASSUNÇÃO", "GONÇALVES",
+]
+
+
+def make_person(rng: random.Random) -> Dict[str, str]:
+    """Build a record shaped like the server's person results"""
+    name_parts = [rng.choice(FIRST_NAMES)] + rng.sample(SURNAMES, rng.randint(1, 3))
+    return {
+        "cpf": f"{rng.randrange(10 ** 11):011d}",
+        "nome": " ".join(name_parts),
+        "sexo": rng.choice("MF"),
+        "nasc": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1930, 2010)}",
+    }
+
+
+def make_results(count: int, seed: int = 42) -> List[Dict[str, str]]:
+    """Build a list of person records"""
+    rng = random.Random(seed)
+    return [make_person(rng) for _ in range(count)]
+
+
+def make_stream_body(count: int, progress_messages: int = 20, seed: int = 42) -> bytes:
+    """
+    Build a name-search stream body: progress objects followed by the final results object
+
+    Args:
+        count: Number of person records in the final payload
+        progress_messages: Number of progress objects before the results
+        seed: Random seed for reproducible payloads
+
+    Returns:
+        Raw UTF-8 encoded stream body
+    """
+    import json
+
+    parts = []
+    for i in range(progress_messages):
+        progress = int(i * 100 / max(progress_messages, 1))
+        parts.append(json.dumps({"progress": progress, "message": f"Processando bloco {i}"}, ensure_ascii=False))
+    parts.append(json.dumps({"isComplete": True, "results": make_results(count, seed)}, ensure_ascii=False))
+    return "\n".join(parts).encode("utf-8")
+
+
+def split_chunks(body: bytes, chunk_size: int) -> List[bytes]:
+    """Split a body into fixed-size chunks the way a socket read would"""
+    return [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
@@ -0,0 +1,316 @@
+"""
+Local stand-in for the CPF server.
+
+Serves the three lookup endpoints with synthetic data and configurable
+latency, so the client and the load generator can be exercised without
+the real server. Run from the PyQt directory:
+
+    python -m benchmarks.standin_server --port 8801
+    python -m benchmarks.standin_server --port 8802 --tls
+    python -m benchmarks.standin_server --port 8803 --tls --http2   (needs `h2`)
+"""
+import ssl
+import sys
+import gzip
+import zlib
+import time
+import heapq
+import random
+import select
+import argparse
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from services import json_backend
+from benchmarks.payloads import make_person, make_results
+
+SSL_DIR = Path(__file__).resolve().parent.parent / "ssl"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers /get-person-by-cpf, /get-person-by-name and /get-person-by-exact-name"""
+    protocol_version = "HTTP/1.1"
+
+    # Set by make_server
+    results = []
+    latency = 0.0
+    jitter = 0.2
+    progress_messages = 10
+    gzip_enabled = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self, seconds: float) -> float:
+        """A latency sample around `seconds`"""
+        if seconds <= 0:
+            return 0.0
+        return max(0.0, random.gauss(seconds, seconds * self.jitter))
+
+    def _plan(self, path: str) -> Optional[Tuple[bool, List[Tuple[float, bytes]]]]:
+        """
+        Plan the response to a request path
+
+        Returns:
+            (streaming, [(seconds to wait before the part, JSON part)]), or None for unknown paths
+        """
+        path, _, term = path.rpartition("/")
+        term = unquote(term)
+
+        if path == "/get-person-by-cpf":
+            person = make_person(random.Random(term))
+            person["cpf"] = term
+            return False, [(self._delay(self.latency), json_backend.dumps({"results": [person]}))]
+
+        if path in ("/get-person-by-name", "/get-person-by-exact-name"):
+            query = " ".join(term.upper().split())
+            if path.endswith("exact-name"):
+                matches = [result for result in self.results if result["nome"] == query]
+            else:
+                matches = [result for result in self.results if query in result["nome"]]
+
+            documents = [{"progress": step * 100 // self.progress_messages} for step in range(self.progress_messages)]
+            documents.append({"isComplete": True, "results": matches})
+
+            # Spread the latency over the progress messages like the real server
+            step = self.latency / len(documents)
+            return True, [(self._delay(step), json_backend.dumps(document) + b"\n") for document in documents]
+
+        return None
+
+    def do_GET(self):
+        plan = self._plan(self.path)
+        if plan is None:
+            self.send_error(404)
+            return
+        streaming, parts = plan
+        compress = self.gzip_enabled and "gzip" in self.headers.get("Accept-Encoding", "")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+
+        if not streaming:
+            delay, body = parts[0]
+            time.sleep(delay)
+            if compress:
+                body = gzip.compress(body, 6)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+        def write_chunk(data: bytes):
+            if data:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        for delay, part in parts:
+            time.sleep(delay)
+            if compressor:
+                part = compressor.compress(part) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            write_chunk(part)
+        if compressor:
+            write_chunk(compressor.flush())
+        self.wfile.write(b"0\r\n\r\n")
+
+    def handle(self):
+        selected = getattr(self.connection, "selected_alpn_protocol", None)
+        if selected is not None and selected() == "h2":
+            self._serve_http2()
+        else:
+            super().handle()
+
+    def _serve_http2(self):
+        """
+        Serve one HTTP/2 connection on this thread.
+
+        Streams are answered concurrently: every response part is scheduled
+        at its due time and sent from a single loop (an SSL socket can't be
+        read and written from different threads).
+        """
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        sock = self.connection
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        conn.initiate_connection()
+
+        # Due parts: (time, sequence, stream, data, last part)
+        schedule = []
+        sequence = 0
+        # Stream -> [bytes waiting for flow-control window, whether the stream ends after them]
+        blocked: Dict[int, List] = {}
+        cancelled = set()
+
+        def send(stream_id: int, data: bytes, end: bool):
+            pending = blocked.setdefault(stream_id, [bytearray(), False])
+            pending[0] += data
+            pending[1] = pending[1] or end
+            while True:
+                window = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if pending[0] and window <= 0:
+                    # Resumed by a WINDOW_UPDATE
+                    return
+                size = min(window, len(pending[0]))
+                piece = bytes(pending[0][:size])
+                del pending[0][:size]
+                finished = pending[1] and not pending[0]
+                if piece or finished:
+                    conn.send_data(stream_id, piece, end_stream=finished)
+                if finished:
+                    del blocked[stream_id]
+                    return
+                if not pending[0]:
+                    return
+
+        def start(stream_id: int, headers: Dict[str, str]):
+            nonlocal sequence
+            plan = self._plan(headers.get(":path", ""))
+            if plan is None:
+                conn.send_headers(stream_id, [(":status", "404")], end_stream=True)
+                return
+            _, parts = plan
+            compress = self.gzip_enabled and "gzip" in headers.get("accept-encoding", "")
+            response_headers = [(":status", "200"), ("content-type", "application/json")]
+            if compress:
+                response_headers.append(("content-encoding", "gzip"))
+            conn.send_headers(stream_id, response_headers)
+
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+            due = time.monotonic()
+            for index, (delay, part) in enumerate(parts):
+                due += delay
+                last = index == len(parts) - 1
+                if compressor:
+                    part = compressor.compress(part) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+                sequence += 1
+                heapq.heappush(schedule, (due, sequence, stream_id, part, last))
+
+        try:
+            sock.sendall(conn.data_to_send())
+            while True:
+                now = time.monotonic()
+                while schedule and schedule[0][0] <= now:
+                    _, _, stream_id, part, last = heapq.heappop(schedule)
+                    if stream_id not in cancelled:
+                        send(stream_id, part, last)
+
+                outgoing = conn.data_to_send()
+                if outgoing:
+                    sock.sendall(outgoing)
+
+                timeout = max(0.0, schedule[0][0] - time.monotonic()) if schedule else 1.0
+                if not sock.pending() and not select.select([sock], [], [], timeout)[0]:
+                    continue
+
+                data = sock.recv(65536)
+                if not data:
+                    return
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        start(event.stream_id, dict(event.headers))
+                    elif isinstance(event, h2.events.StreamReset):
+                        cancelled.add(event.stream_id)
+                        blocked.pop(event.stream_id, None)
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        for stream_id in list(blocked):
+                            send(stream_id, b"", False)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+        except OSError:
+            # Client went away (ssl.SSLError is an OSError too)
+            return
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded server that ignores clients dropping their connections"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        error = sys.exc_info()[1]
+        if isinstance(error, (ConnectionError, ssl.SSLError)):
+            # Cancelled streams and clients closing keep-alive connections
+            return
+        super().handle_error(request, client_address)
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8801,
+    tls: bool = False,
+    records: int = 3000,
+    latency: float = 0.0,
+    jitter: float = 0.2,
+    progress_messages: int = 10,
+    http2: bool = False,
+    gzip_enabled: bool = True
+) -> ThreadingHTTPServer:
+    """
+    Build a stand-in server (call serve_forever() to run it)
+
+    Args:
+        host: Address to bind
+        port: Port to bind
+        tls: Serve HTTPS with the certificate in PyQt/ssl
+        records: Number of synthetic people searchable by name
+        latency: Mean seconds per request (spread over a name search's stream)
+        jitter: Standard deviation of the latency, as a fraction of it
+        progress_messages: Progress objects sent before name search results
+        http2: Also offer HTTP/2 via ALPN (TLS only, needs `h2`)
+        gzip_enabled: Compress responses for clients that accept gzip
+
+    Returns:
+        The bound server
+    """
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {
+        "results": make_results(records),
+        "latency": latency,
+        "jitter": jitter,
+        "progress_messages": progress_messages,
+        "gzip_enabled": gzip_enabled
+    })
+    server = StandInServer((host, port), handler)
+    if tls:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(str(SSL_DIR / "cert.pem"), str(SSL_DIR / "key.pem"))
+        context.set_alpn_protocols(["h2", "http/1.1"] if http2 else ["http/1.1"])
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the CPF server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--tls", action="store_true", help="Serve HTTPS")
+    parser.add_argument("--http2", action="store_true", help="Offer HTTP/2 (with --tls; needs the h2 package)")
+    parser.add_argument("--records", type=int, default=3000, help="Synthetic people searchable by name")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean latency per request")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency standard deviation as a fraction of it")
+    parser.add_argument("--no-gzip", action="store_true", help="Send uncompressed responses")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, args.tls, args.records,
+        args.latency_ms / 1000.0, args.jitter, http2=args.http2, gzip_enabled=not args.no_gzip
+    )
+    protocol = "https" if args.tls else "http"
+    print(f"Stand-in server on {protocol}://{args.host}:{args.port}{' (h2)' if args.http2 and args.tls else ''}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Headless open-loop load generator for the CPF server.
+
+Examples (from the PyQt directory):
+    python loadgen.py --host 127.0.0.1 --port 8801 --http --rate 50 --duration 30
+    python loadgen.py --profile ramp --start-rate 10 --rate 200 --duration 60 --mix name=1,exactName=1,cpf=8
+    python loadgen.py --profile poisson --rate 100 --cpf-file cpfs.txt --json report.json
+"""
+import os
+import sys
+import argparse
+import contextlib
+from typing import Dict, List
+
+from services import json_backend
+from services.load_generator import ArrivalSchedule, LoadGenerator, QueryMix, PROFILES, QUERY_TYPES
+
+# Terms used when no term files are given
+DEFAULT_TERMS = {
+    "name": ["SILVA", "MARIA SANTOS", "JOSÉ", "OLIVEIRA", "ANA LIMA"],
+    "exactName": ["MARIA SILVA", "JOÃO SANTOS", "ANA OLIVEIRA"],
+    "cpf": ["123.456.789-09", "987.654.321-00", "111.444.777-35"]
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse "name=1,exactName=1,cpf=8" into weights"""
+    weights = {}
+    for item in text.split(","):
+        query_type, _, weight = item.partition("=")
+        query_type = query_type.strip()
+        if query_type not in QUERY_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown query type in mix: {query_type}")
+        weights[query_type] = float(weight) if weight else 1.0
+    return weights
+
+
+def read_terms(path: str) -> List[str]:
+    """Read one search term per line, skipping blank lines"""
+    with open(path, encoding="utf-8") as terms_file:
+        return [line.strip() for line in terms_file if line.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the CPF server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--http", action="store_true", help="Use plain HTTP instead of HTTPS")
+    parser.add_argument("--profile", choices=PROFILES, default="constant", help="Arrival profile")
+    parser.add_argument("--rate", type=float, default=10.0, help="Target requests per second (final rate for ramps)")
+    parser.add_argument("--start-rate", type=float, default=0.0, help="Initial rate for ramps")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--mix", type=parse_mix, default={"name": 1, "exactName": 1, "cpf": 8},
+                        help="Query mix as type=weight pairs")
+    parser.add_argument("--name-file", help="Partial-name terms, one per line")
+    parser.add_argument("--exact-name-file", help="Exact-name terms, one per line")
+    parser.add_argument("--cpf-file", help="CPFs, one per line")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Concurrent requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--window", type=float, default=1.0, help="Report window width in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--json", help="Also write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the client's per-request log")
+    args = parser.parse_args()
+
+    terms = dict(DEFAULT_TERMS)
+    for query_type, path in (("name", args.name_file), ("exactName", args.exact_name_file), ("cpf", args.cpf_file)):
+        if path:
+            terms[query_type] = read_terms(path)
+
+    try:
+        schedule = ArrivalSchedule(args.profile, args.rate, args.duration, args.start_rate, args.seed)
+        mix = QueryMix(args.mix, terms, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    generator = LoadGenerator(
+        args.host, args.port, schedule, mix,
+        use_https=not args.http,
+        max_in_flight=args.max_in_flight,
+        request_timeout=args.timeout,
+        window=args.window
+    )
+
+    protocol = "http" if args.http else "https"
+    print(f"Generating load against {protocol}://{args.host}:{args.port} for {args.duration:.0f}s...")
+
+    # The client logs every request; at load-test rates that output would dominate
+    with open(os.devnull, "w") as devnull:
+        log_target = sys.stdout if args.verbose else devnull
+        try:
+            with contextlib.redirect_stdout(log_target):
+                report = generator.run()
+        except KeyboardInterrupt:
+            generator.stop()
+            return 1
+
+    print(report.format())
+    if args.json:
+        with open(args.json, "wb") as report_file:
+            report_file.write(json_backend.dumps(report.summary()))
+        print(f"\nReport written to {args.json}")
+
+    summary = report.summary()
+    return 1 if summary["errors"] == summary["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Qt item models and delegates for PyQt Client application
@@ -0,0 +1,104 @@
+from typing import List, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+
+from services.batch_index import BatchTermIndex, PENDING, FOUND, NO_HITS, FAILED, CANCELLED
+
+STATUS_LABELS = {
+    PENDING: "Pendente",
+    FOUND: "Encontrado",
+    NO_HITS: "Sem resultados",
+    FAILED: "Erro",
+    CANCELLED: "Cancelado"
+}
+
+# Subsets of terms that can be listed, with their labels (None lists every term)
+TERM_VIEWS = (
+    (None, "Todos os termos"),
+    (NO_HITS, "Sem resultados"),
+    (FAILED, "Com erro"),
+    (FOUND, "Com resultados"),
+    (PENDING, "Pendentes")
+)
+
+
+class BatchTermsModel(QAbstractTableModel):
+    """
+    Terms of one batch with their status and number of results, read
+    straight from its BatchTermIndex.
+
+    Listing every term costs nothing per row; a subset (e.g. the terms
+    without results) is a list of term positions taken when it is chosen,
+    so terms finishing later keep their place until the view is chosen
+    again.
+    """
+    HEADERS = ["#", "Termo", "Situação", "Resultados"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.batch: Optional[BatchTermIndex] = None
+        self.view_status: Optional[str] = None
+        # Term positions on display, or None for every term in batch order
+        self.rows: Optional[List[int]] = None
+        self.row_of_term = {}
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid() or self.batch is None:
+            return 0
+        return len(self.batch) if self.rows is None else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return QVariant()
+        term_index = self.term_at(index.row())
+        column = index.column()
+        if column == 0:
+            return term_index + 1
+        if column == 1:
+            return self.batch.terms[term_index]
+        status = self.batch.status(term_index)
+        if column == 2:
+            error = self.batch.errors.get(term_index)
+            return f"{STATUS_LABELS[status]}: {error}" if error else STATUS_LABELS[status]
+        return "" if status == PENDING else self.batch.result_counts[term_index]
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+
+    def term_at(self, row: int) -> int:
+        """Position in the batch of the term shown on a row"""
+        return row if self.rows is None else self.rows[row]
+
+    def set_batch(self, batch: Optional[BatchTermIndex], view_status: Optional[str] = None):
+        """Show the terms of a batch (None clears the table)"""
+        self.beginResetModel()
+        self.batch = batch
+        self.view_status = view_status
+        if batch is None or view_status is None:
+            self.rows = None
+        elif view_status == NO_HITS:
+            # Kept as a set by the index; failed terms are listed under "Com erro"
+            self.rows = [term for term in batch.terms_without_hits() if batch.status(term) == NO_HITS]
+        else:
+            self.rows = batch.terms_with_status(view_status)
+        self.row_of_term = {} if self.rows is None else {term: row for row, term in enumerate(self.rows)}
+        self.endResetModel()
+
+    def set_view(self, view_status: Optional[str]):
+        """List another subset of the current batch's terms"""
+        self.set_batch(self.batch, view_status)
+
+    def term_changed(self, batch: BatchTermIndex, term_index: int):
+        """Repaint a term that just finished, if its batch is on display"""
+        if batch is not self.batch:
+            return
+        row = term_index if self.rows is None else self.row_of_term.get(term_index)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 2), self.index(row, 3))
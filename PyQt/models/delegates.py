@@ -0,0 +1,74 @@
+from PyQt5.QtCore import Qt, QEvent, QModelIndex, QPersistentModelIndex, pyqtSignal
+from PyQt5.QtWidgets import (
+    QApplication, QStyle, QStyledItemDelegate,
+    QStyleOptionButton, QStyleOptionProgressBar
+)
+
+
+def _style(option):
+    return option.widget.style() if option.widget is not None else QApplication.style()
+
+
+class ProgressBarDelegate(QStyledItemDelegate):
+    """Paints an integer percentage (0-100) as a progress bar"""
+    def paint(self, painter, option, index):
+        value = index.data(Qt.DisplayRole)
+        if not isinstance(value, (int, float)):
+            super().paint(painter, option, index)
+            return
+
+        progress = max(0, min(100, int(value)))
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.state = option.state | QStyle.State_Horizontal
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = progress
+        bar.text = f"{progress}%"
+        bar.textVisible = True
+        bar.textAlignment = Qt.AlignCenter
+        _style(option).drawControl(QStyle.CE_ProgressBar, bar, painter, option.widget)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """
+    Paints the cell's text as a push button and emits `clicked` when it is
+    clicked. The button is disabled while the item isn't enabled (see the
+    model's flags()).
+    """
+    clicked = pyqtSignal(QModelIndex)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Button held down, drawn sunken until released
+        self.pressed = QPersistentModelIndex()
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = str(index.data(Qt.DisplayRole) or "")
+        if index.flags() & Qt.ItemIsEnabled:
+            button.state = QStyle.State_Enabled
+            # A release outside the cell never reaches the delegate, so check the mouse too
+            held = self.pressed == index and QApplication.mouseButtons() & Qt.LeftButton
+            button.state |= QStyle.State_Sunken if held else QStyle.State_Raised
+        else:
+            button.state = QStyle.State_None
+        _style(option).drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return False
+        if event.button() != Qt.LeftButton or not index.flags() & Qt.ItemIsEnabled:
+            return False
+
+        if event.type() == QEvent.MouseButtonPress:
+            self.pressed = QPersistentModelIndex(index)
+        else:
+            was_pressed = self.pressed == index
+            self.pressed = QPersistentModelIndex()
+            if was_pressed and option.rect.contains(event.pos()):
+                self.clicked.emit(index)
+        if option.widget is not None:
+            option.widget.viewport().update(option.rect)
+        return True
@@ -0,0 +1,224 @@
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal
+
+from services.query_history import HistoryStats, default_history_depth, COMPLETED, FAILED, CANCELLED
+
+# Column of the action button (present in every jobs table)
+ACTION_COLUMN = "action"
+
+
+class JobsTableModel(QAbstractTableModel):
+    """
+    Bounded history of queries or batches with their status, progress and
+    elapsed time.
+
+    Each row is a dict of column values, addressed by the key returned by
+    add_row(). Updates change only the fields given and emit dataChanged
+    for just those cells of that row; progress and the cancel button are
+    painted by delegates (see models.delegates) instead of one widget per
+    row.
+
+    Once the table holds more than `max_rows` rows, the oldest finished
+    ones are evicted (rows still running are kept). Every finished row is
+    counted in `stats`, so totals and latency percentiles cover the whole
+    session however long the window stays open.
+    """
+    # Rows removed from the history (their dicts, with any extra fields given to add_row)
+    rows_evicted = pyqtSignal(list)
+    # Human-readable totals ("120 consultas: 118 com sucesso, ... · tempo médio 0.42s ...")
+    stats_changed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        columns: Sequence[Tuple[str, str]],
+        item_name: str = "consultas",
+        max_rows: Optional[int] = None,
+        parent=None
+    ):
+        """
+        Args:
+            columns: (field, header) pairs in display order; "progress",
+                "elapsed" and "action" are rendered specially
+            item_name: Plural shown in the stats summary
+            max_rows: Rows kept (default: CPF_HISTORY_ROWS or 1000)
+        """
+        super().__init__(parent)
+        self.fields = [field for field, _ in columns]
+        self.headers = [header for _, header in columns]
+        self.column_of = {field: column for column, field in enumerate(self.fields)}
+        self.item_name = item_name
+        self.max_rows = max_rows if max_rows is not None else default_history_depth()
+
+        # Rows in display order and their keys (ascending, so positions are found by bisection)
+        self.rows: List[Dict[str, Any]] = []
+        self.keys: List[int] = []
+        self.next_key = 0
+        self.finished_rows = 0
+        # Key -> cancel callback, dropped once the row is finished or cancelled
+        self.cancel_callbacks: Dict[int, Callable[[], None]] = {}
+
+        self.stats = HistoryStats()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return QVariant()
+        field = self.fields[index.column()]
+        row = self.rows[index.row()]
+        if field == "elapsed":
+            elapsed = row["elapsed"]
+            return "Calculando..." if elapsed is None else f"{elapsed:.2f}"
+        if field == ACTION_COLUMN:
+            return "Cancelar"
+        return row.get(field, "")
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self.fields[index.column()] == ACTION_COLUMN and self.keys[index.row()] not in self.cancel_callbacks:
+            # Painted as a disabled button
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def _position(self, key: int) -> Optional[int]:
+        """Current row of a key, or None if it was evicted"""
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return position
+        return None
+
+    def add_row(self, on_cancel: Optional[Callable[[], None]] = None, **fields) -> int:
+        """
+        Append a pending row, evicting the oldest finished rows past `max_rows`
+
+        Args:
+            on_cancel: Called when the row's cancel button is clicked
+            **fields: Initial column values (status defaults to "Pendente");
+                other fields are kept with the row, e.g. for rows_evicted
+
+        Returns:
+            The row's key, used for later updates
+        """
+        self._evict(self.max_rows - 1)
+
+        row = {"status": "Pendente", "progress": 0, "elapsed": None}
+        row.update(fields)
+        row["started"] = time.time()
+        key = self.next_key
+        self.next_key += 1
+
+        position = len(self.rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.append(row)
+        self.keys.append(key)
+        if on_cancel is not None:
+            self.cancel_callbacks[key] = on_cancel
+        self.endInsertRows()
+        return key
+
+    def _evict(self, keep: int):
+        """Remove the oldest finished rows until at most `keep` rows are left (or none is finished)"""
+        excess = min(len(self.rows) - keep, self.finished_rows)
+        if excess <= 0:
+            return
+
+        evicted = []
+        position = 0
+        while len(evicted) < excess and position < len(self.rows):
+            if self.rows[position]["elapsed"] is None:
+                position += 1
+                continue
+            # Remove the run of finished rows starting here in one go
+            end = position
+            while end < len(self.rows) and len(evicted) + end - position < excess and self.rows[end]["elapsed"] is not None:
+                end += 1
+            self.beginRemoveRows(QModelIndex(), position, end - 1)
+            evicted.extend(self.rows[position:end])
+            del self.rows[position:end]
+            del self.keys[position:end]
+            self.endRemoveRows()
+        self.finished_rows -= len(evicted)
+        self.rows_evicted.emit(evicted)
+
+    def value(self, key: int, field: str) -> Any:
+        """Current value of a row's field (None once the row was evicted)"""
+        position = self._position(key)
+        return None if position is None else self.rows[position].get(field)
+
+    def update(self, key: int, **fields):
+        """Change some fields of a row, repainting only the cells that changed"""
+        position = self._position(key)
+        if position is None:
+            return
+        row = self.rows[position]
+        changed = [self.column_of[field] for field, value in fields.items()
+                   if row.get(field) != value and field in self.column_of]
+        row.update(fields)
+        if changed:
+            self.dataChanged.emit(self.index(position, min(changed)), self.index(position, max(changed)))
+
+    def finish(self, key: int, status: str, outcome: str = COMPLETED, **fields):
+        """
+        Mark a row as done: record its elapsed time, disable its cancel button
+        and count it in the stats (a row already finished only gets the new values)
+
+        Args:
+            key: Row key
+            status: Final status text
+            outcome: COMPLETED, FAILED or CANCELLED
+            **fields: Other values to set (e.g. progress=100)
+        """
+        position = self._position(key)
+        if position is None:
+            return
+        self._disable_cancel(key)
+        row = self.rows[position]
+        if row["elapsed"] is None:
+            fields["elapsed"] = time.time() - row["started"]
+            self.finished_rows += 1
+            self.stats.record(outcome, fields["elapsed"])
+            self.stats_changed.emit(self.stats_summary())
+        self.update(key, status=status, **fields)
+        # Rows beyond max_rows that were waiting for this one (or any) to finish
+        self._evict(self.max_rows)
+
+    def stats_summary(self) -> str:
+        """Totals of every finished row, evicted ones included"""
+        stats = self.stats
+        counts = stats.counts
+        summary = (f"{stats.total} {self.item_name}: {counts[COMPLETED]} com sucesso, "
+                   f"{counts[FAILED]} com erro, {counts[CANCELLED]} cancelamentos")
+        latency = stats.latency
+        if latency.count:
+            summary += (f" · tempo médio {latency.mean:.2f}s · p50 {latency.percentile(50):.2f}s"
+                        f" · p95 {latency.percentile(95):.2f}s · p99 {latency.percentile(99):.2f}s")
+        return summary
+
+    def cancel(self, index: QModelIndex):
+        """Run the cancel callback of the row (the action button was clicked)"""
+        callback = self._disable_cancel(self.keys[index.row()])
+        if callback is not None:
+            callback()
+
+    def _disable_cancel(self, key: int) -> Optional[Callable[[], None]]:
+        callback = self.cancel_callbacks.pop(key, None)
+        position = self._position(key)
+        if callback is not None and position is not None and ACTION_COLUMN in self.column_of:
+            action = self.index(position, self.column_of[ACTION_COLUMN])
+            self.dataChanged.emit(action, action)
+        return callback
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal, pyqtSlot
+
+from services.result_view import COLUMNS, ResultFilter, ResultKeys, view_order
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """
+    Person results shown through a row permutation.
+
+    The records stay in received order: the view is a list of row
+    numbers. Sort keys, sorting and filtering are computed on a background
+    thread and the permutation is swapped in when ready, so even a million
+    rows don't freeze the GUI. Requests superseded before they finish are
+    dropped.
+    """
+    HEADERS = ["CPF", "Nome", "Sexo", "Data de Nascimento"]
+
+    # (generation, (results, keys, order)), emitted from the background thread
+    view_ready = pyqtSignal(int, object)
+    # Human-readable state of the view ("Ordenando...", "120 de 5000 resultados")
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, cpf_formatter: Optional[Callable[[str], str]] = None, parent=None):
+        super().__init__(parent)
+        self.cpf_formatter = cpf_formatter or (lambda cpf: cpf)
+
+        self.results: Sequence[Dict] = []
+        self.keys: Optional[ResultKeys] = None
+        # Rows on display, or None for every row in received order
+        self.order = None
+
+        self.sort_column: Optional[str] = None
+        self.descending = False
+        self.row_filter = ResultFilter()
+
+        # Incremented by every change; results of older computations are ignored
+        self.generation = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-view")
+        self.view_ready.connect(self._apply_view)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.results) if self.order is None else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return QVariant()
+        row = index.row() if self.order is None else self.order[index.row()]
+        column = COLUMNS[index.column()]
+        value = self.results[row].get(column, "")
+        if column == "cpf":
+            return self.cpf_formatter(value)
+        return value
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        """Called by the view on header clicks; a negative column restores the received order"""
+        self.sort_column = COLUMNS[column] if 0 <= column < len(COLUMNS) else None
+        self.descending = order == Qt.DescendingOrder
+        self._refresh()
+
+    def set_results(self, results: Sequence[Dict]):
+        """
+        Show a new result set (in received order until the current sort and filter are applied)
+
+        A list is copied, so the caller may keep appending to it; a store with
+        a snapshot() method (BatchResultStore) is read through a snapshot of
+        its current records, without loading them into memory.
+        """
+        snapshot = getattr(results, "snapshot", None)
+        self.beginResetModel()
+        self.results = snapshot() if snapshot is not None else list(results)
+        self.keys = None
+        self.order = None
+        self.endResetModel()
+        if self.sort_column is not None or not self.row_filter.empty:
+            self._refresh()
+        else:
+            self.generation += 1
+            self.status_changed.emit(f"{len(results)} resultados")
+
+    def set_filter(self, row_filter: ResultFilter):
+        """Apply a new filter to the current result set"""
+        self.row_filter = row_filter
+        self._refresh()
+
+    def _refresh(self):
+        """Recompute the view in the background"""
+        self.generation += 1
+        generation = self.generation
+        results, keys = self.results, self.keys
+        column, descending, row_filter = self.sort_column, self.descending, self.row_filter
+
+        if not results:
+            self._apply_view(generation, (results, keys, None))
+            return
+
+        self.status_changed.emit("Ordenando e filtrando...")
+
+        def compute():
+            if generation != self.generation:
+                # Superseded while queued
+                return
+            try:
+                view_keys = keys or ResultKeys(results)
+                order = view_order(view_keys, column, descending, row_filter)
+            except Exception as e:
+                print(f"Failed to sort/filter results: {str(e)}")
+                self.status_changed.emit(f"Erro ao ordenar/filtrar: {str(e)}")
+                return
+            self.view_ready.emit(generation, (results, view_keys, order))
+
+        self.executor.submit(compute)
+
+    @pyqtSlot(int, object)
+    def _apply_view(self, generation: int, view):
+        results, keys, order = view
+        if results is self.results and self.keys is None:
+            # Keys stay valid for every later view of the same results
+            self.keys = keys
+        if generation != self.generation:
+            return
+
+        self.beginResetModel()
+        self.order = order
+        self.endResetModel()
+
+        shown = self.rowCount()
+        if shown == len(self.results):
+            self.status_changed.emit(f"{shown} resultados")
+        else:
+            self.status_changed.emit(f"{shown} de {len(self.results)} resultados")
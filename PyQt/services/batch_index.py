@@ -0,0 +1,155 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .batch_store import BatchResultStore
+from .result_view import cpf_key, MISSING_KEY
+
+# Status of a batch term
+PENDING = "pending"
+FOUND = "found"
+NO_HITS = "no_hits"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERM_STATUSES = (PENDING, FOUND, NO_HITS, FAILED, CANCELLED)
+
+# Status codes as stored per term (one byte each)
+_CODE = {status: code for code, status in enumerate(TERM_STATUSES)}
+
+
+class BatchTermIndex:
+    """
+    Results of a batch, kept per term.
+
+    Each term's results are appended to a BatchResultStore in one run, so a
+    term is just the position and length of its run; statuses are one byte
+    per term. Terms without results are kept in a set and every person's
+    CPF maps to the term (or terms) that returned it, so "which terms found
+    nothing" and "which term produced this person" never scan the batch.
+
+    Updated from the GUI thread as queries finish; reads from other
+    threads go through the store's lock.
+    """
+    def __init__(self, terms: Sequence[str], store: Optional[BatchResultStore] = None):
+        """
+        Args:
+            terms: The batch terms, in dispatch order (addressed by position)
+            store: Where the results go (default: a new BatchResultStore)
+        """
+        self.terms = list(terms)
+        self.store = store if store is not None else BatchResultStore()
+
+        count = len(self.terms)
+        self.statuses = bytearray(count)
+        self.first_result = array("q", [0]) * count
+        self.result_counts = array("l", [0]) * count
+        self.errors: Dict[int, str] = {}
+
+        # Terms that finished without results (answered or failed)
+        self.no_hit_terms = set()
+        # CPF (as an integer) -> index of the first term that returned it;
+        # the rare people returned by several terms also have the rest here
+        self.term_of_cpf: Dict[int, int] = {}
+        self.more_terms_of_cpf: Dict[int, List[int]] = {}
+
+        self.finished = 0
+        self.status_counts = {status: 0 for status in TERM_STATUSES}
+        self.status_counts[PENDING] = count
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @property
+    def result_count(self) -> int:
+        return len(self.store)
+
+    def _set_status(self, term_index: int, status: str):
+        previous = TERM_STATUSES[self.statuses[term_index]]
+        if previous == PENDING and status != PENDING:
+            self.finished += 1
+        self.status_counts[previous] -= 1
+        self.status_counts[status] += 1
+        self.statuses[term_index] = _CODE[status]
+
+    def add_results(self, term_index: int, results: Iterable[Dict]):
+        """Record the results of a term (a term that already finished keeps its first outcome)"""
+        if self.statuses[term_index] != _CODE[PENDING]:
+            return
+        results = list(results)
+        start = len(self.store)
+        self.store.extend(results)
+        self.first_result[term_index] = start
+        self.result_counts[term_index] = len(results)
+
+        for result in results:
+            cpf = cpf_key(result.get("cpf", ""))
+            if cpf == MISSING_KEY:
+                continue
+            first = self.term_of_cpf.setdefault(cpf, term_index)
+            if first != term_index:
+                others = self.more_terms_of_cpf.setdefault(cpf, [])
+                if term_index not in others:
+                    others.append(term_index)
+
+        if results:
+            self._set_status(term_index, FOUND)
+        else:
+            self.no_hit_terms.add(term_index)
+            self._set_status(term_index, NO_HITS)
+
+    def add_error(self, term_index: int, error: str):
+        """Record that a term's query failed"""
+        if self.statuses[term_index] != _CODE[PENDING]:
+            return
+        self.errors[term_index] = error
+        self.no_hit_terms.add(term_index)
+        self._set_status(term_index, FAILED)
+
+    def cancel_pending(self) -> int:
+        """
+        Mark every term still pending as cancelled
+
+        Returns:
+            Number of terms cancelled
+        """
+        pending = [index for index, code in enumerate(self.statuses) if code == _CODE[PENDING]]
+        for term_index in pending:
+            self._set_status(term_index, CANCELLED)
+        return len(pending)
+
+    def summary(self) -> str:
+        """Human-readable count of the terms per status"""
+        counts = self.status_counts
+        text = (f"{self.finished}/{len(self)} termos concluídos: {counts[FOUND]} com resultados, "
+                f"{counts[NO_HITS]} sem resultados, {counts[FAILED]} com erro")
+        if counts[CANCELLED]:
+            text += f", {counts[CANCELLED]} cancelados"
+        return text
+
+    def status(self, term_index: int) -> str:
+        return TERM_STATUSES[self.statuses[term_index]]
+
+    def results_of(self, term_index: int) -> List[Dict]:
+        """Results returned for a term (read back from disk if they were spilled)"""
+        start = self.first_result[term_index]
+        return list(self.store.iter_range(start, start + self.result_counts[term_index]))
+
+    def terms_of(self, cpf: str) -> List[int]:
+        """Indexes of the terms that returned a person, in batch order (empty if none did)"""
+        key = cpf_key(cpf)
+        first = self.term_of_cpf.get(key)
+        if first is None:
+            return []
+        return sorted([first] + self.more_terms_of_cpf.get(key, []))
+
+    def terms_without_hits(self) -> List[int]:
+        """Indexes of the finished terms that returned nothing (including failed ones), in batch order"""
+        return sorted(self.no_hit_terms)
+
+    def terms_with_status(self, status: str) -> List[int]:
+        """Indexes of the terms with a status, in batch order"""
+        code = _CODE[status]
+        return [index for index, term_code in enumerate(self.statuses) if term_code == code]
+
+    def close(self):
+        """Drop the results (and the store's on-disk segment)"""
+        self.store.close()
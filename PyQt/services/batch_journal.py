@@ -0,0 +1,237 @@
+import os
+import re
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import json_backend
+
+# Environment variable that overrides where batch journals are kept
+JOURNAL_DIR_ENV_VAR = "CPF_JOURNAL_DIR"
+
+# Journal format version (first line of every journal)
+FORMAT_VERSION = 1
+
+# Seconds between journal writes: completed terms are written in groups
+FLUSH_INTERVAL = 1.0
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# Start of a term line, as written by BatchJournal (read without decoding the results)
+_TERM_PREFIX = re.compile(rb'\{"term":\s*(\d+)')
+
+
+def default_journal_dir() -> Path:
+    """Return the journal directory (overridable with CPF_JOURNAL_DIR)"""
+    override = os.environ.get(JOURNAL_DIR_ENV_VAR)
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "consulta-cpf" / "batches"
+
+
+class JournalState:
+    """
+    What an interrupted batch had done, read back from its journal
+
+    Attributes:
+        path: Journal file
+        header: Batch settings (query_type, host, port, deadline_seconds, created_at)
+        terms: Every term of the batch, in dispatch order
+        completed: Term index -> results, for the terms answered before the
+            interruption (results are None when loaded without them)
+        valid_size: Bytes up to the end of the last complete line
+    """
+    def __init__(self, path: Path, header: Dict, completed: Dict[int, List[Dict]], valid_size: int):
+        self.path = path
+        self.header = header
+        self.terms: List[str] = header["terms"]
+        self.completed = completed
+        self.valid_size = valid_size
+
+    @property
+    def query_type(self) -> str:
+        return self.header["query_type"]
+
+    @property
+    def host(self) -> str:
+        return self.header["host"]
+
+    @property
+    def port(self) -> int:
+        return self.header["port"]
+
+    @property
+    def deadline_seconds(self) -> Optional[float]:
+        """Time budget the batch was started with (None if it had none)"""
+        return self.header.get("deadline_seconds")
+
+    @property
+    def remaining(self) -> List[int]:
+        """Indexes of the terms still to query (never answered, or failed)"""
+        return [index for index in range(len(self.terms)) if index not in self.completed]
+
+    def summary(self) -> str:
+        """Human-readable description of the interrupted batch"""
+        started = time.strftime("%d/%m/%Y %H:%M", time.localtime(self.header["created_at"]))
+        return (f"Lote de {len(self.terms)} termos ({self.query_type}) em {self.host}:{self.port}, "
+                f"iniciado em {started}: {len(self.completed)} concluídos, {len(self.remaining)} restantes")
+
+
+def load_journal(path: Path, with_results: bool = True) -> JournalState:
+    """
+    Read a journal
+
+    A last line cut short by a crash is ignored (that term is queried again).
+
+    Args:
+        path: Journal file
+        with_results: Decode the results too; without them only the answered
+            term indexes are read, which is quick even for huge journals
+
+    Raises:
+        ValueError: If the file is not a journal of this version
+    """
+    completed = {}
+    with open(path, "rb") as file:
+        first_line = file.readline()
+        header = json_backend.loads(first_line)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported journal version in {path}: {header.get('version')}")
+        valid_size = len(first_line)
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            valid_size += len(line)
+            if with_results:
+                entry = json_backend.loads(line)
+                completed[entry["term"]] = entry["results"]
+            else:
+                match = _TERM_PREFIX.match(line)
+                if match is None:
+                    raise ValueError(f"Malformed entry in {path}")
+                completed[int(match.group(1))] = None
+    return JournalState(Path(path), header, completed, valid_size)
+
+
+def unfinished_journals(directory: Optional[Path] = None) -> List[JournalState]:
+    """Journals of batches that were interrupted, oldest first, without their results (unreadable ones are skipped)"""
+    directory = Path(directory) if directory else default_journal_dir()
+    if not directory.is_dir():
+        return []
+    states = []
+    for path in sorted(directory.glob(f"*{JOURNAL_SUFFIX}")):
+        try:
+            states.append(load_journal(path, with_results=False))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping unreadable batch journal {path}: {str(e)}")
+    return states
+
+
+def discard_journal(path: Path):
+    """Delete a journal (its batch finished or won't be resumed)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BatchJournal:
+    """
+    Append-only on-disk record of a batch's completed terms, so an
+    interrupted batch can be resumed without querying them again.
+
+    The first line holds the batch settings and every term; each later
+    line is one answered term with its results. record() only queues the
+    entry: a background thread encodes and appends whatever accumulated
+    every FLUSH_INTERVAL seconds, with one write and one fsync, so neither
+    the GUI thread nor the executors wait for the disk.
+    """
+    def __init__(self, path: Path, flush_interval: float = FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.file = open(self.path, "ab")
+
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, List[Dict]]] = []
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-journal", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def create(
+        cls,
+        batch_id: str,
+        query_type: str,
+        host: str,
+        port: int,
+        terms: Sequence[str],
+        deadline_seconds: Optional[float] = None,
+        directory: Optional[Path] = None
+    ) -> "BatchJournal":
+        """Start the journal of a new batch (deadline_seconds is its time budget, if any)"""
+        directory = Path(directory) if directory else default_journal_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{batch_id}{JOURNAL_SUFFIX}"
+        header = {
+            "version": FORMAT_VERSION,
+            "batch_id": batch_id,
+            "query_type": query_type,
+            "host": host,
+            "port": port,
+            "deadline_seconds": deadline_seconds,
+            "created_at": time.time(),
+            "terms": list(terms)
+        }
+        with open(path, "wb") as file:
+            file.write(json_backend.dumps(header) + b"\n")
+        return cls(path)
+
+    @classmethod
+    def reopen(cls, state: JournalState) -> "BatchJournal":
+        """Continue the journal of a batch being resumed"""
+        # Drop a line cut short by the interruption before appending after it
+        with open(state.path, "r+b") as file:
+            file.truncate(state.valid_size)
+        return cls(state.path)
+
+    def record(self, term_index: int, results: List[Dict]):
+        """Queue a completed term for the next write"""
+        with self._lock:
+            self._pending.append((term_index, results))
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self.file.closed:
+            return
+        data = b"".join(
+            json_backend.dumps({"term": term_index, "results": results}) + b"\n"
+            for term_index, results in pending
+        )
+        try:
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except (OSError, ValueError) as e:
+            print(f"Failed to write batch journal {self.path}: {str(e)}")
+
+    def _run(self):
+        while not self._closing.wait(self.flush_interval):
+            self._flush()
+
+    def close(self):
+        """Write what is queued and stop (the journal stays, so the batch can be resumed)"""
+        self._closing.set()
+        self._thread.join()
+        self._flush()
+        self.file.close()
+
+    def finish(self):
+        """The batch is over (completed or cancelled): nothing left to resume"""
+        self._closing.set()
+        self._thread.join()
+        with self._lock:
+            self._pending = []
+        self.file.close()
+        discard_journal(self.path)
@@ -0,0 +1,248 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from . import json_backend
+
+# Environment variable that overrides the in-memory ceiling (in MB)
+MEMORY_LIMIT_ENV_VAR = "CPF_BATCH_MEMORY_MB"
+
+# Records kept in memory per batch before older ones spill to disk
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Approximate size of a decoded person record beyond its string contents
+# (the dict plus one str object per field)
+RECORD_OVERHEAD_BYTES = 400
+
+# Spilling frees this fraction of the ceiling (1/8) beyond what is over it
+SPILL_HEADROOM_DIVISOR = 8
+
+# Spilled records decoded and kept around for random access by the view
+READ_CACHE_SIZE = 2048
+
+# Records read from disk per query when iterating
+ITER_CHUNK = 4096
+
+SCHEMA = """
+CREATE TABLE records (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+
+def default_memory_limit() -> int:
+    """Return the in-memory ceiling of a batch (overridable with CPF_BATCH_MEMORY_MB)"""
+    override = os.environ.get(MEMORY_LIMIT_ENV_VAR)
+    if override:
+        try:
+            return int(float(override) * 1024 * 1024)
+        except ValueError:
+            print(f"Invalid {MEMORY_LIMIT_ENV_VAR}={override!r}, using the default")
+    return DEFAULT_MEMORY_LIMIT
+
+
+def record_size(record: Dict) -> int:
+    """Approximate memory used by a decoded record"""
+    return RECORD_OVERHEAD_BYTES + sum(len(value) for value in record.values() if isinstance(value, str))
+
+
+def _close_segment(connection: sqlite3.Connection, path: str):
+    """Close and delete an on-disk segment (also runs at exit for stores never closed)"""
+    try:
+        connection.close()
+    except sqlite3.Error:
+        pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BatchResultStore:
+    """
+    Append-only store of a batch's results with a memory ceiling.
+
+    The newest records stay in memory; once they exceed `memory_limit`,
+    the oldest are moved to a temporary SQLite segment that is deleted when
+    the store is closed or collected. Indexing and iteration read both
+    parts transparently, so a batch can grow beyond RAM while the results
+    view keeps working. All methods are thread-safe.
+    """
+    def __init__(self, memory_limit: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        Args:
+            memory_limit: Bytes of records kept in memory (default: CPF_BATCH_MEMORY_MB or 256 MB)
+            spill_dir: Directory of the temporary segment (default: the system temp directory)
+        """
+        self.memory_limit = memory_limit if memory_limit is not None else default_memory_limit()
+        self.spill_dir = spill_dir
+
+        # Records [spilled, spilled + len(memory)) are in memory; earlier ones on disk
+        self.memory: List[Dict] = []
+        self.memory_bytes = 0
+        self.spilled = 0
+
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._finalizer = None
+        # Index -> decoded spilled record
+        self._read_cache: "OrderedDict[int, Dict]" = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.spilled + len(self.memory)
+
+    @property
+    def spilled_count(self) -> int:
+        """Records currently on disk"""
+        return self.spilled
+
+    def append(self, record: Dict):
+        """Add one record"""
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Dict]):
+        """Add records, spilling the oldest ones to disk when over the memory ceiling"""
+        with self._lock:
+            for record in records:
+                self.memory.append(record)
+                self.memory_bytes += record_size(record)
+            if self.memory_bytes > self.memory_limit:
+                self._spill()
+
+    def _segment(self) -> sqlite3.Connection:
+        """Open the temporary on-disk segment on first use"""
+        if self._connection is None:
+            handle, path = tempfile.mkstemp(prefix="cpf-batch-", suffix=".sqlite3", dir=self.spill_dir)
+            os.close(handle)
+            # Shared by the GUI and the results-view thread, always under the lock
+            connection = sqlite3.connect(path, check_same_thread=False)
+            # Scratch data: no journal, no fsync
+            connection.execute("PRAGMA journal_mode=OFF")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._finalizer = weakref.finalize(self, _close_segment, connection, path)
+            print(f"Batch results over {self.memory_limit // (1024 * 1024)} MB in memory; spilling to {path}")
+        return self._connection
+
+    def _spill(self, target: Optional[int] = None):
+        """Move the oldest in-memory records to disk until at most `target` bytes (default: a little below the ceiling) are left"""
+        # Some headroom so every append doesn't spill, but small enough that
+        # appends from the GUI thread never write a large burst at once
+        if target is None:
+            target = self.memory_limit - self.memory_limit // SPILL_HEADROOM_DIVISOR
+        count = 0
+        freed = 0
+        while count < len(self.memory) and self.memory_bytes - freed > target:
+            freed += record_size(self.memory[count])
+            count += 1
+        if count == 0:
+            return
+
+        connection = self._segment()
+        first_id = self.spilled + 1
+        with connection:
+            connection.executemany(
+                "INSERT INTO records (id, data) VALUES (?, ?)",
+                ((first_id + offset, json_backend.dumps(record)) for offset, record in enumerate(self.memory[:count]))
+            )
+        del self.memory[:count]
+        self.memory_bytes -= freed
+        self.spilled += count
+
+    def release_memory(self):
+        """Move every in-memory record to disk (for a batch that is kept but no longer active)"""
+        with self._lock:
+            self._spill(0)
+
+    def __getitem__(self, index: int) -> Dict:
+        with self._lock:
+            length = self.spilled + len(self.memory)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError("batch result index out of range")
+            if index >= self.spilled:
+                return self.memory[index - self.spilled]
+
+            record = self._read_cache.get(index)
+            if record is not None:
+                self._read_cache.move_to_end(index)
+                return record
+            row = self._connection.execute("SELECT data FROM records WHERE id = ?", (index + 1,)).fetchone()
+            record = json_backend.loads(row[0])
+            self._read_cache[index] = record
+            if len(self._read_cache) > READ_CACHE_SIZE:
+                self._read_cache.popitem(last=False)
+            return record
+
+    def iter_range(self, start: int, stop: int) -> Iterator[Dict]:
+        """
+        Iterate over records [start, stop) in order
+
+        The lock is held per chunk only, so appends can continue meanwhile.
+        """
+        position = start
+        while position < stop:
+            with self._lock:
+                end = min(stop, position + ITER_CHUNK, self.spilled + len(self.memory))
+                if end <= position:
+                    return
+                if position < self.spilled:
+                    end = min(end, self.spilled)
+                    blobs = self._connection.execute(
+                        "SELECT data FROM records WHERE id > ? AND id <= ? ORDER BY id", (position, end)
+                    ).fetchall()
+                    chunk = None
+                else:
+                    chunk = self.memory[position - self.spilled:end - self.spilled]
+            if chunk is None:
+                # Decode outside the lock
+                chunk = [json_backend.loads(blob) for (blob,) in blobs]
+            yield from chunk
+            position = end
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_range(0, len(self))
+
+    def snapshot(self) -> "BatchResultSnapshot":
+        """Read-only view of the records stored so far (later appends are not visible)"""
+        return BatchResultSnapshot(self, len(self))
+
+    def close(self):
+        """Drop the records and delete the on-disk segment"""
+        with self._lock:
+            self.memory = []
+            self.memory_bytes = 0
+            self.spilled = 0
+            self._read_cache.clear()
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+                self._connection = None
+
+
+class BatchResultSnapshot:
+    """The first `length` records of a BatchResultStore, as a read-only sequence"""
+    def __init__(self, store: BatchResultStore, length: int):
+        self.store = store
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("batch result index out of range")
+        return self.store[index]
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.store.iter_range(0, self.length)
@@ -0,0 +1,72 @@
+import threading
+from typing import Callable, List
+
+
+class QueryCancelled(Exception):
+    """Raised inside a query when its cancellation token fires"""
+    pass
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag shared between the manager and one query.
+
+    Besides the flag, callbacks can be registered to interrupt blocking work
+    (e.g. closing the response a stream is reading from) when the token fires.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation was requested"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """Request cancellation and run the registered callbacks (only the first call has effect)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as error:
+                print(f"Error in cancellation callback: {str(error)}")
+
+    def register(self, callback: Callable[[], None]):
+        """
+        Register a callback to run on cancellation
+
+        If the token is already cancelled the callback runs immediately.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def unregister(self, callback: Callable[[], None]):
+        """Remove a previously registered callback"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        """Raise QueryCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise QueryCancelled("Consulta cancelada")
+
+    def wait(self, seconds: float) -> bool:
+        """
+        Sleep for up to `seconds`, waking early on cancellation
+
+        Returns:
+            True if the token was cancelled
+        """
+        return self._event.wait(seconds)
@@ -0,0 +1,275 @@
+import ssl
+import time
+import select
+import weakref
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Peer address used as the TLS session cache key
+PeerKey = Tuple[str, int]
+
+# Default number of pooled connections kept per server
+DEFAULT_POOL_SIZE = 10
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    Client SSL context that reuses TLS sessions across new connections.
+
+    CPython never resumes client sessions on its own, so every new socket
+    pays a full handshake. This context remembers the sessions of the
+    sockets it creates, per peer address, and offers the newest one when
+    another connection to the same server is opened.
+    """
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._live_sockets: Dict[PeerKey, List[weakref.ref]] = {}
+        self._sessions: Dict[PeerKey, ssl.SSLSession] = {}
+        self.handshakes = 0
+        self.resumed = 0
+
+    def _peer_key(self, sock) -> Optional[PeerKey]:
+        try:
+            address = sock.getpeername()
+        except OSError:
+            return None
+        return (address[0], address[1])
+
+    def _lookup_session(self, key: PeerKey) -> Optional[ssl.SSLSession]:
+        """Return the most recent session for a peer"""
+        with self._lock:
+            refs = self._live_sockets.get(key, [])
+            alive = []
+            # TLS 1.3 tickets arrive after the handshake, so prefer sessions
+            # read from open sockets over the one captured at connect time
+            for ref in refs:
+                ssl_sock = ref()
+                if ssl_sock is None:
+                    continue
+                alive.append(ref)
+                try:
+                    session = ssl_sock.session
+                except (OSError, ValueError):
+                    session = None
+                if session is not None:
+                    self._sessions[key] = session
+            self._live_sockets[key] = alive
+            return self._sessions.get(key)
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        key = self._peer_key(sock)
+        if key is not None and "session" not in kwargs:
+            session = self._lookup_session(key)
+            if session is not None:
+                kwargs["session"] = session
+
+        ssl_sock = super().wrap_socket(sock, *args, **kwargs)
+
+        with self._lock:
+            self.handshakes += 1
+            if ssl_sock.session_reused:
+                self.resumed += 1
+            if key is not None:
+                self._live_sockets.setdefault(key, []).append(weakref.ref(ssl_sock))
+                if ssl_sock.session is not None:
+                    self._sessions[key] = ssl_sock.session
+
+        return ssl_sock
+
+    def remember_session(self, ssl_sock: ssl.SSLSocket):
+        """Store the current session of a socket (e.g. after its tickets were read)"""
+        key = self._peer_key(ssl_sock)
+        if key is not None and ssl_sock.session is not None:
+            with self._lock:
+                self._sessions[key] = ssl_sock.session
+
+    def stats(self) -> Dict:
+        """Return handshake counters"""
+        with self._lock:
+            return {"handshakes": self.handshakes, "resumed": self.resumed}
+
+
+def create_ssl_context() -> ResumingSSLContext:
+    """Create the client SSL context (certificate verification disabled, like the rest of the client)"""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTP adapter with a larger connection pool and a session-resuming SSL context
+    """
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        self.ssl_context = create_ssl_context()
+        super().__init__(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=0,  # TCPClient handles retries manually
+                connect=0,
+                backoff_factor=0.5
+            )
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def grow(self, pool_size: int):
+        """
+        Enlarge the pool (never shrinks it)
+
+        urllib3 pools have a fixed size, so the pool manager is rebuilt: idle
+        connections are closed and busy ones are dropped when they are returned.
+        """
+        if pool_size <= self._pool_maxsize:
+            return
+        self.poolmanager.clear()
+        self.init_poolmanager(self._pool_connections, pool_size, block=self._pool_block)
+
+    def prewarm(self, base_url: str, connections: int, timeout: float = 5.0) -> int:
+        """
+        Open pooled connections ahead of the first request
+
+        Args:
+            base_url: Server URL (scheme, host and port)
+            connections: Number of connections to open
+            timeout: Connect timeout for each connection
+
+        Returns:
+            Number of connections that were opened
+        """
+        # Resolve the pool exactly the way requests will for the real queries
+        request = requests.Request("GET", base_url).prepare()
+        if hasattr(self, "get_connection_with_tls_context"):
+            pool = self.get_connection_with_tls_context(request, verify=False)
+        else:
+            pool = self.get_connection(base_url)
+        conns = [pool._get_conn() for _ in range(connections)]
+        opened = []
+
+        def connect(conn):
+            try:
+                conn.timeout = timeout
+                if conn.sock is None:
+                    conn.connect()
+                if isinstance(conn.sock, ssl.SSLSocket):
+                    if not _absorb_session_tickets(conn.sock):
+                        raise ConnectionError("server sent data on an idle connection")
+                    self.ssl_context.remember_session(conn.sock)
+                opened.append(conn)
+            except Exception as error:
+                print(f"Pre-warm connection to {base_url} failed: {str(error)}")
+                conn.close()
+
+        # Connect in parallel so N connections cost about one handshake of wall time
+        threads = [threading.Thread(target=connect, args=(conn,), daemon=True) for conn in conns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Return every connection (open or not) so the pool keeps its size
+        for conn in conns:
+            pool._put_conn(conn)
+
+        return len(opened)
+
+
+def _absorb_session_tickets(ssl_sock: ssl.SSLSocket, wait: float = 0.2) -> bool:
+    """
+    Process TLS 1.3 session tickets waiting on an idle connection.
+
+    Tickets arrive after the handshake and are only parsed on read. Until
+    then the socket looks readable, which makes urllib3 discard it as dropped
+    and leaves nothing to resume from.
+
+    Returns:
+        False if the server sent application data or closed the connection
+    """
+    readable, _, _ = select.select([ssl_sock], [], [], wait)
+    if not readable:
+        return True
+
+    previous_timeout = ssl_sock.gettimeout()
+    ssl_sock.setblocking(False)
+    try:
+        while True:
+            try:
+                # Application data or EOF on an idle connection
+                ssl_sock.recv(1)
+                return False
+            except ssl.SSLWantReadError:
+                # Only handshake records (tickets) were pending
+                if not select.select([ssl_sock], [], [], 0)[0]:
+                    return True
+    finally:
+        ssl_sock.settimeout(previous_timeout)
+
+
+# Shared sessions, one per server URL
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(base_url: str, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    Get the shared session for a server, creating it on first use
+
+    Args:
+        base_url: Server URL (scheme, host and port)
+        pool_size: Maximum pooled connections (an existing session's pool is grown to it)
+
+    Returns:
+        Session whose connections are reused by every query to the server
+    """
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = PooledAdapter(pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        else:
+            session.get_adapter(base_url).grow(pool_size)
+        return session
+
+
+def prewarm(base_url: str, connections: int) -> threading.Thread:
+    """
+    Open pooled connections to a server in the background
+
+    Args:
+        base_url: Server URL (scheme, host and port)
+        connections: Number of connections to open
+
+    Returns:
+        The background thread doing the work
+    """
+    def run():
+        start_time = time.time()
+        session = get_session(base_url, max(connections, DEFAULT_POOL_SIZE))
+        adapter = session.get_adapter(base_url)
+        opened = adapter.prewarm(base_url, connections)
+        print(f"Pre-warmed {opened}/{connections} connections to {base_url} in {time.time() - start_time:.2f}s")
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def close_all():
+    """Close every shared session"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
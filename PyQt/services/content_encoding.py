@@ -0,0 +1,148 @@
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# zstd support is optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def supported_encodings() -> List[str]:
+    """Return the content encodings this client can decode, in order of preference"""
+    encodings = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def accept_encoding() -> str:
+    """Build the Accept-Encoding header value"""
+    return ", ".join(supported_encodings())
+
+
+class _IdentityDecoder:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _GzipDecoder:
+    def __init__(self):
+        # 16 + MAX_WBITS tells zlib to expect a gzip header
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _DeflateDecoder:
+    """
+    Deflate decoder that accepts both zlib-wrapped and raw deflate streams,
+    since servers disagree about what "deflate" means
+    """
+    def __init__(self):
+        self._obj = zlib.decompressobj()
+        self._first_try = True
+        self._data = b""
+
+    def decompress(self, data: bytes) -> bytes:
+        if not self._first_try:
+            return self._obj.decompress(data)
+
+        self._data += data
+        try:
+            decompressed = self._obj.decompress(data)
+            if decompressed:
+                self._first_try = False
+                self._data = b""
+            return decompressed
+        except zlib.error:
+            # Not zlib-wrapped: retry everything seen so far as raw deflate
+            self._first_try = False
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            try:
+                return self._obj.decompress(self._data)
+            finally:
+                self._data = b""
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _ZstdDecoder:
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class StreamDecompressor:
+    """
+    Incremental decompressor for a single HTTP response body.
+
+    Tracks compressed and decoded byte counts and the CPU time spent
+    decompressing so the cost of each transfer can be reported.
+    """
+    def __init__(self, encoding: Optional[str] = None):
+        self.encoding = (encoding or "identity").strip().lower()
+        self.compressed_bytes = 0
+        self.decoded_bytes = 0
+        self.cpu_time = 0.0
+
+        if self.encoding in ("identity", ""):
+            self._decoder = _IdentityDecoder()
+        elif self.encoding in ("gzip", "x-gzip"):
+            self._decoder = _GzipDecoder()
+        elif self.encoding == "deflate":
+            self._decoder = _DeflateDecoder()
+        elif self.encoding == "zstd" and zstandard is not None:
+            self._decoder = _ZstdDecoder()
+        else:
+            raise ValueError(f"Unsupported content encoding: {self.encoding}")
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress a chunk of the body, returning whatever output is ready"""
+        start = time.thread_time()
+        decoded = self._decoder.decompress(data)
+        self.cpu_time += time.thread_time() - start
+
+        self.compressed_bytes += len(data)
+        self.decoded_bytes += len(decoded)
+        return decoded
+
+    def flush(self) -> bytes:
+        """Return any output still buffered in the decoder"""
+        start = time.thread_time()
+        decoded = self._decoder.flush()
+        self.cpu_time += time.thread_time() - start
+
+        self.decoded_bytes += len(decoded)
+        return decoded
+
+    @property
+    def ratio(self) -> float:
+        """Decoded size divided by transferred size"""
+        if not self.compressed_bytes:
+            return 1.0
+        return self.decoded_bytes / self.compressed_bytes
+
+    def stats(self) -> Dict:
+        """Return transfer statistics for reporting"""
+        return {
+            "encoding": self.encoding,
+            "compressed_bytes": self.compressed_bytes,
+            "decoded_bytes": self.decoded_bytes,
+            "ratio": self.ratio,
+            "cpu_time": self.cpu_time
+        }
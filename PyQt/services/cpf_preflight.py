@@ -0,0 +1,292 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# Separators between batch terms (same as the batch input box: one per line or comma-separated)
+TERM_SEPARATORS = b"\n,"
+
+# Reasons a term is rejected
+INVALID_LENGTH = "invalid_length"
+INVALID_CHECK_DIGITS = "invalid_check_digits"
+DUPLICATE = "duplicate"
+
+# Rejected terms kept as examples for the summary
+MAX_REJECTED_EXAMPLES = 10
+
+# Bytes of batch text validated per NumPy pass (bounds the temporary arrays)
+VECTOR_CHUNK_BYTES = 4 * 1024 * 1024
+
+_NON_DIGITS = re.compile(r"[^0-9]")
+_SEPARATORS = re.compile(r"[\n,]")
+
+# Weights of the first and second check digits
+_FIRST_WEIGHTS = tuple(range(10, 1, -1))
+_SECOND_WEIGHTS = tuple(range(11, 1, -1))
+
+
+def check_digits(digits: str) -> str:
+    """
+    The two check digits of the first nine digits of a CPF
+
+    Args:
+        digits: At least nine ASCII digits
+    """
+    values = [ord(digit) - 48 for digit in digits[:9]]
+    first = sum(value * weight for value, weight in zip(values, _FIRST_WEIGHTS)) * 10 % 11 % 10
+    values.append(first)
+    second = sum(value * weight for value, weight in zip(values, _SECOND_WEIGHTS)) * 10 % 11 % 10
+    return f"{first}{second}"
+
+
+def is_valid_cpf(digits: str) -> bool:
+    """
+    Whether 11 digits form a valid CPF: both check digits match and the
+    digits aren't all the same (000.000.000-00 and the like pass the
+    check digits but are never issued)
+    """
+    return (
+        len(digits) == 11 and digits.isdigit() and digits != digits[0] * 11
+        and digits[9:] == check_digits(digits)
+    )
+
+
+def _numpy():
+    """NumPy, if installed (imported on first use: it is slow to import and only needed for batches)"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class PreflightResult:
+    """
+    Outcome of checking a batch of CPF terms
+
+    Attributes:
+        cpfs: Valid, unique CPFs (11 digits each), in input order (first occurrence kept)
+        total_terms: Non-empty terms examined
+        rejected: Reason -> number of terms rejected for it
+        examples: Up to MAX_REJECTED_EXAMPLES (term, reason) pairs
+    """
+    def __init__(self, cpfs: List[str], total_terms: int, rejected: Dict[str, int], examples: List[Tuple[str, str]]):
+        self.cpfs = cpfs
+        self.total_terms = total_terms
+        self.rejected = rejected
+        self.examples = examples
+
+    @property
+    def rejected_count(self) -> int:
+        return sum(self.rejected.values())
+
+    def summary(self) -> str:
+        """Human-readable account of what was kept and rejected"""
+        text = f"{self.total_terms} termos: {len(self.cpfs)} CPFs válidos e únicos"
+        reasons = (
+            (INVALID_CHECK_DIGITS, "com dígitos verificadores inválidos"),
+            (INVALID_LENGTH, "sem 11 dígitos"),
+            (DUPLICATE, "repetidos")
+        )
+        parts = [f"{self.rejected[reason]} {label}" for reason, label in reasons if self.rejected.get(reason)]
+        if parts:
+            text += "; descartados: " + ", ".join(parts)
+        if self.examples:
+            text += " (ex.: " + ", ".join(f"\"{term}\"" for term, _ in self.examples[:3]) + ")"
+        return text
+
+
+def preflight_cpfs(terms: Union[str, Iterable[str]], use_numpy: Optional[bool] = None) -> PreflightResult:
+    """
+    Normalize, validate and deduplicate the terms of a CPF batch, so only
+    queries that can succeed reach the network
+
+    Punctuation and other non-digits are ignored ("123.456.789-09" and
+    "12345678909" are the same CPF). Terms without exactly 11 digits, with
+    wrong check digits or repeating an earlier term are rejected.
+
+    Args:
+        terms: The batch text (terms separated by newlines or commas) or a list of terms
+        use_numpy: Force (True) or avoid (False) the vectorized path; by
+            default it is used when NumPy is installed and terms is text
+
+    Returns:
+        PreflightResult with the CPFs to query and the rejections
+    """
+    numpy = _numpy() if use_numpy is not False else None
+    if use_numpy and numpy is None:
+        raise RuntimeError("NumPy is not installed")
+    if numpy is not None and isinstance(terms, str):
+        return _preflight_vectorized(numpy, terms)
+    if isinstance(terms, str):
+        terms = _SEPARATORS.split(terms)
+    return _preflight_terms(terms)
+
+
+def _preflight_terms(terms: Iterable[str]) -> PreflightResult:
+    """Pure-Python pre-flight, one term at a time"""
+    rejected = {INVALID_LENGTH: 0, INVALID_CHECK_DIGITS: 0, DUPLICATE: 0}
+    examples = []
+    seen = set()
+    kept = []
+    total = 0
+    # Check digits depend on the first nine digits only, and batches often share prefixes
+    expected_check_digits = {}
+
+    for term in terms:
+        term = term.strip()
+        if not term:
+            continue
+        total += 1
+        digits = _NON_DIGITS.sub("", term)
+
+        if len(digits) != 11:
+            reason = INVALID_LENGTH
+        else:
+            prefix = digits[:9]
+            expected = expected_check_digits.get(prefix)
+            if expected is None:
+                expected = expected_check_digits[prefix] = check_digits(prefix)
+            if digits[9:] != expected or digits == digits[0] * 11:
+                reason = INVALID_CHECK_DIGITS
+            elif digits in seen:
+                reason = DUPLICATE
+            else:
+                seen.add(digits)
+                kept.append(digits)
+                continue
+
+        rejected[reason] += 1
+        if len(examples) < MAX_REJECTED_EXAMPLES:
+            examples.append((term, reason))
+
+    return PreflightResult(kept, total, rejected, examples)
+
+
+def _preflight_vectorized(np, text: str) -> PreflightResult:
+    """
+    NumPy pre-flight over the raw batch text
+
+    The encoded text is scanned in chunks of VECTOR_CHUNK_BYTES (cut at a
+    separator), each as one array of bytes; the valid CPFs of all chunks
+    are then deduplicated in one np.unique. Millions of lines take a
+    fraction of a second and memory stays proportional to a chunk.
+    """
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    rejected = {INVALID_LENGTH: 0, INVALID_CHECK_DIGITS: 0, DUPLICATE: 0}
+    # (byte offset, term, reason), so duplicates found at the end can be put back in input order
+    examples: List[Tuple[int, str, str]] = []
+    numbers = []
+    bounds = []
+    total = 0
+
+    start = 0
+    while start < data.size:
+        end = min(start + VECTOR_CHUNK_BYTES, data.size)
+        if end < data.size:
+            # Cut after the last separator so no term is split
+            separators = np.flatnonzero(_separator_mask(np, data[start:end]))
+            if separators.size:
+                end = start + int(separators[-1]) + 1
+        chunk_total, chunk_numbers, chunk_bounds = _scan_chunk(np, data[start:end], start, rejected, examples)
+        total += chunk_total
+        numbers.append(chunk_numbers)
+        bounds.append(chunk_bounds)
+        start = end
+
+    numbers = np.concatenate(numbers) if numbers else np.zeros(0, dtype=np.int64)
+    bounds = np.concatenate(bounds) if bounds else np.zeros((0, 2), dtype=np.int64)
+    # np.unique sorts; the first occurrences, taken in their positions, keep the input order
+    unique_numbers, first_indices = np.unique(numbers, return_index=True)
+    first_indices.sort()
+    unique_numbers = numbers[first_indices]
+    rejected[DUPLICATE] = int(numbers.size - unique_numbers.size)
+    if rejected[DUPLICATE]:
+        # The first duplicates may come before any invalid term, so up to MAX_REJECTED_EXAMPLES are taken
+        is_duplicate = np.ones(numbers.size, dtype=bool)
+        is_duplicate[first_indices] = False
+        for term_start, term_end in bounds[is_duplicate][:MAX_REJECTED_EXAMPLES].tolist():
+            examples.append((term_start, _raw_term(data, term_start, term_end), DUPLICATE))
+    examples.sort()
+
+    # Back to text: the digits of every kept CPF as one ASCII string, sliced per CPF
+    digits = np.zeros((unique_numbers.size, 11), dtype=np.uint8)
+    remaining = unique_numbers.copy()
+    for column in range(10, -1, -1):
+        digits[:, column] = remaining % 10 + 0x30
+        remaining //= 10
+    joined = digits.tobytes().decode("ascii")
+    cpfs = [joined[offset:offset + 11] for offset in range(0, len(joined), 11)]
+
+    return PreflightResult(cpfs, total, rejected, [(term, reason) for _, term, reason in examples[:MAX_REJECTED_EXAMPLES]])
+
+
+def _raw_term(data, start: int, end: int) -> str:
+    """A term as typed, from its bytes in the batch text"""
+    return data[start:end].tobytes().decode("utf-8", "replace").strip(" \t\r\n,")
+
+
+def _separator_mask(np, data):
+    is_separator = np.zeros(data.size, dtype=bool)
+    for separator in TERM_SEPARATORS:
+        is_separator |= data == separator
+    return is_separator
+
+
+def _scan_chunk(np, data, offset: int, rejected: Dict[str, int], examples: List[Tuple[int, str, str]]):
+    """
+    Validate the terms of one chunk of bytes
+
+    Digits are compacted into one array, where each term's digits are
+    contiguous; a running count of digits at the separators gives every
+    term's slice of it. The 11-digit terms are gathered into an (n, 11)
+    matrix and their check digits and repeats computed at once.
+
+    Args:
+        offset: Position of the chunk in the batch text, in bytes
+
+    Returns:
+        Tuple of (non-blank terms, valid CPFs as int64 in input order,
+        (start, end) byte offsets of their terms); rejection counts and
+        (offset, term, reason) examples are added to the arguments
+    """
+    is_separator = _separator_mask(np, data)
+    separators = np.flatnonzero(is_separator)
+    # Bytes wrap around below 0x30, so one comparison finds the digits
+    is_digit = (data - 0x30) < 10
+    digit_values = data[is_digit] - 0x30
+
+    # Digits seen before each term's end; term k's digits are digit_values[starts[k]:ends[k]]
+    digits_seen = np.cumsum(is_digit, dtype=np.int32)
+    ends = np.append(digits_seen[separators], digits_seen[-1])
+    starts = np.concatenate(([0], ends[:-1]))
+    digit_counts = ends - starts
+
+    # Blank terms (whitespace and control characters only) are skipped like in the list path
+    visible_seen = np.cumsum((data > 0x20) & ~is_separator, dtype=np.int32)
+    visible_ends = np.append(visible_seen[separators], visible_seen[-1])
+    non_blank = visible_ends > np.concatenate(([0], visible_ends[:-1]))
+
+    candidates = np.flatnonzero(digit_counts == 11)
+    matrix = digit_values[starts[candidates][:, None] + np.arange(11, dtype=np.int32)].astype(np.int32)
+
+    first = matrix[:, :9] @ np.array(_FIRST_WEIGHTS, dtype=np.int32) * 10 % 11 % 10
+    second = (matrix[:, :9] @ np.array(_SECOND_WEIGHTS[:9], dtype=np.int32) + first * 2) * 10 % 11 % 10
+    repeated = (matrix == matrix[:, :1]).all(axis=1)
+    valid = (matrix[:, 9] == first) & (matrix[:, 10] == second) & ~repeated
+
+    invalid_length = non_blank & (digit_counts != 11)
+    rejected[INVALID_LENGTH] += int(np.count_nonzero(invalid_length))
+    rejected[INVALID_CHECK_DIGITS] += int(np.count_nonzero(~valid))
+
+    # Term k is data[bounds[k]:bounds[k + 1]]
+    bounds = np.concatenate(([0], separators + 1, [data.size])).astype(np.int64)
+    if len(examples) < MAX_REJECTED_EXAMPLES and (invalid_length.any() or not valid.all()):
+        invalid = invalid_length.copy()
+        invalid[candidates[~valid]] = True
+        for term in np.flatnonzero(invalid)[:MAX_REJECTED_EXAMPLES - len(examples)].tolist():
+            reason = INVALID_LENGTH if invalid_length[term] else INVALID_CHECK_DIGITS
+            examples.append((offset + int(bounds[term]), _raw_term(data, bounds[term], bounds[term + 1]), reason))
+
+    numbers = matrix[valid].astype(np.int64) @ (10 ** np.arange(10, -1, -1, dtype=np.int64))
+    kept = candidates[valid]
+    term_bounds = np.stack((bounds[kept], bounds[kept + 1]), axis=1) + offset
+    return int(np.count_nonzero(non_blank)), numbers, term_bounds
@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+# Shortest attempt worth starting: retries are skipped when less than this would remain
+MIN_ATTEMPT_TIME = 1.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a query or batch runs out of its time budget"""
+    pass
+
+
+class Deadline:
+    """
+    Absolute time budget shared by every attempt of a query (or every query of a batch).
+
+    Uses the monotonic clock, so it is unaffected by wall-clock changes and
+    can be shared with worker processes on the same machine.
+    """
+    def __init__(self, seconds: Optional[float] = None):
+        """
+        Args:
+            seconds: Budget from now, or None for no deadline
+        """
+        self.budget = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    @property
+    def unbounded(self) -> bool:
+        """Whether there is no deadline at all"""
+        return self.expires_at is None
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (infinite when unbounded, never negative)"""
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the budget is used up"""
+        return self.remaining() <= 0.0
+
+    def check(self, what: str = "Consulta"):
+        """Raise DeadlineExceeded if the budget is used up"""
+        if self.expired:
+            raise DeadlineExceeded(f"{what}: prazo de {self.budget:g}s esgotado")
+
+    def timeout(self, limit: float) -> float:
+        """
+        Timeout for the next operation: the given limit capped by the remaining budget
+
+        Raises:
+            DeadlineExceeded: If the budget is already used up
+        """
+        self.check()
+        return min(limit, self.remaining())
+
+    def can_fit(self, seconds: float) -> bool:
+        """Whether waiting `seconds` still leaves time for a meaningful attempt"""
+        return self.remaining() >= seconds + MIN_ATTEMPT_TIME
+
+    def __repr__(self) -> str:
+        if self.expires_at is None:
+            return "Deadline(None)"
+        return f"Deadline(budget={self.budget}, remaining={self.remaining():.2f})"
@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.exceptions
+    import h2.settings
+except ImportError:
+    h2 = None
+
+# Offered during the TLS handshake; the server picks one
+ALPN_PROTOCOLS = ["h2", "http/1.1"]
+
+# Receive windows large enough that a big name-search result isn't throttled
+# by flow control (the defaults are 64 KiB)
+STREAM_WINDOW = 16 * 1024 * 1024
+CONNECTION_WINDOW = 64 * 1024 * 1024
+
+# Session event: (kind, stream id, payload)
+SessionEvent = Tuple[str, Optional[int], Any]
+
+
+def available() -> bool:
+    """Whether the optional `h2` package is installed"""
+    return h2 is not None
+
+
+class H2Session:
+    """
+    Protocol state of one HTTP/2 connection (the `h2` state machine).
+
+    Does no I/O: requests and received bytes go in, bytes to send and
+    per-stream events come out. The non-blocking core owns the socket.
+    """
+    def __init__(self, authority: str):
+        self.authority = authority
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=True, header_encoding=None)
+        )
+        self.conn.initiate_connection()
+        self.conn.update_settings({
+            h2.settings.SettingCodes.ENABLE_PUSH: 0,
+            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: STREAM_WINDOW
+        })
+        self.conn.increment_flow_control_window(CONNECTION_WINDOW - 65535)
+
+        # Open stream IDs
+        self.streams = set()
+        self.closed = False
+
+    @property
+    def capacity(self) -> int:
+        """Streams that can still be opened"""
+        if self.closed:
+            return 0
+        limit = self.conn.remote_settings.max_concurrent_streams
+        return max(0, limit - len(self.streams))
+
+    def send_request(self, path: str, headers: Dict[str, str]) -> int:
+        """
+        Open a stream for a GET request
+
+        Returns:
+            The stream ID
+        """
+        stream_id = self.conn.get_next_available_stream_id()
+        request_headers = [
+            (":method", "GET"),
+            (":scheme", "https"),
+            (":authority", self.authority),
+            (":path", path)
+        ]
+        request_headers += [(name.lower(), value) for name, value in headers.items()]
+        self.conn.send_headers(stream_id, request_headers, end_stream=True)
+        self.streams.add(stream_id)
+        return stream_id
+
+    def reset(self, stream_id: int):
+        """Cancel a stream (RST_STREAM); the connection stays usable"""
+        if stream_id in self.streams:
+            self.streams.discard(stream_id)
+            try:
+                self.conn.reset_stream(stream_id, error_code=h2.errors.ErrorCodes.CANCEL)
+            except h2.exceptions.StreamClosedError:
+                pass
+
+    def data_to_send(self) -> bytes:
+        """Bytes the connection wants written to the socket"""
+        return self.conn.data_to_send()
+
+    def receive(self, data: bytes) -> List[SessionEvent]:
+        """
+        Process received bytes
+
+        Returns:
+            Events: ("headers", stream, (status, headers)), ("data", stream, bytes),
+            ("end", stream, None), ("reset", stream, message) and
+            ("terminated", None, message) when the whole connection ends
+        """
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError as error:
+            self.closed = True
+            return [("terminated", None, f"HTTP/2 protocol error: {str(error)}")]
+
+        results = []
+        for event in events:
+            if isinstance(event, h2.events.ResponseReceived):
+                headers = {}
+                for name, value in event.headers:
+                    headers[name.decode("latin-1")] = value.decode("latin-1")
+                status = int(headers.pop(":status", "0"))
+                results.append(("headers", event.stream_id, (status, headers)))
+
+            elif isinstance(event, h2.events.DataReceived):
+                # Give the window back right away: the consumer keeps up with the stream
+                if event.flow_controlled_length:
+                    self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                if event.stream_id in self.streams:
+                    results.append(("data", event.stream_id, event.data))
+
+            elif isinstance(event, h2.events.StreamEnded):
+                if event.stream_id in self.streams:
+                    self.streams.discard(event.stream_id)
+                    results.append(("end", event.stream_id, None))
+
+            elif isinstance(event, h2.events.StreamReset):
+                if event.stream_id in self.streams:
+                    self.streams.discard(event.stream_id)
+                    results.append(("reset", event.stream_id, f"Stream reset by server (code {event.error_code})"))
+
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.closed = True
+                results.append(("terminated", None, f"Server closed the HTTP/2 connection (code {event.error_code})"))
+
+        return results
@@ -0,0 +1,1112 @@
+import ssl
+import time
+import errno
+import heapq
+import socket
+import itertools
+import selectors
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import connection_pool
+from .http2 import ALPN_PROTOCOLS, H2Session, available as http2_available
+
+# Bytes read from a socket per recv()
+READ_SIZE = 64 * 1024
+
+# Default timeouts in seconds
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 90.0
+
+# Idle keep-alive connections kept per server, and how long they are kept
+MAX_IDLE_PER_SERVER = 64
+IDLE_TIMEOUT = 30.0
+
+# Longest the I/O thread sleeps before re-checking timeouts
+MAX_POLL_INTERVAL = 1.0
+
+# Server key: (host, port, use TLS)
+ServerKey = Tuple[str, int, bool]
+
+
+class HTTPCoreError(OSError):
+    """Base class for transport errors of the non-blocking core"""
+
+
+class ConnectError(HTTPCoreError):
+    """The connection (TCP or TLS) could not be established"""
+
+
+class ResponseTimeout(HTTPCoreError):
+    """The server sent nothing for longer than the read timeout, or the deadline passed"""
+
+
+class ProtocolError(HTTPCoreError):
+    """The response was not valid HTTP/1.1, or the connection closed mid-response"""
+
+
+class HTTPStatusError(HTTPCoreError):
+    """The server answered with an error status"""
+    def __init__(self, status: int, reason: str = ""):
+        super().__init__(f"{status} {reason}".strip())
+        self.status = status
+        self.reason = reason
+
+
+class RequestAborted(HTTPCoreError):
+    """The request was cancelled by the caller"""
+
+
+class ResponseParser:
+    """
+    Incremental HTTP/1.1 response parser.
+
+    Bytes are fed as they arrive; the status line and headers are reported
+    once complete, and the body (de-chunked, still content-encoded) is
+    passed on as it is parsed.
+    """
+    def __init__(self, on_headers: Callable[[int, str, Dict[str, str]], None], on_data: Callable[[bytes], None]):
+        self.on_headers = on_headers
+        self.on_data = on_data
+
+        self.status = None
+        self.reason = ""
+        self.version = ""
+        self.headers: Dict[str, str] = {}
+        self.keep_alive = False
+        self.done = False
+
+        self._buffer = bytearray()
+        self._state = "head"
+        self._remaining = 0
+
+    def feed(self, data: bytes):
+        """Parse newly received bytes"""
+        if self._state == "body_close" or (self._state == "body_length" and not self._buffer):
+            # Fast path: body bytes go straight to the consumer
+            self._feed_body(data)
+            return
+        self._buffer += data
+        self._parse()
+
+    def eof(self):
+        """
+        The connection was closed by the server
+
+        Raises:
+            ProtocolError: If the response was not complete
+        """
+        if self._state == "body_close":
+            self._finish()
+        elif not self.done:
+            raise ProtocolError("Connection closed before the response was complete")
+
+    def _finish(self):
+        self._state = "done"
+        self.done = True
+
+    def _feed_body(self, data: bytes):
+        if self._state == "body_close":
+            if data:
+                self.on_data(data)
+            return
+
+        # body_length
+        if len(data) >= self._remaining:
+            tail = data[self._remaining:]
+            if self._remaining:
+                self.on_data(data[:self._remaining])
+            self._remaining = 0
+            self._finish()
+            if tail:
+                raise ProtocolError("Server sent data past the end of the response")
+        else:
+            self._remaining -= len(data)
+            self.on_data(data)
+
+    def _parse_head(self) -> bool:
+        end = self._buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self._buffer) > 64 * 1024:
+                raise ProtocolError("Response headers too large")
+            return False
+
+        lines = bytes(self._buffer[:end]).decode("latin-1").split("\r\n")
+        del self._buffer[:end + 4]
+
+        try:
+            version, status, *reason = lines[0].split(" ", 2)
+            status = int(status)
+        except ValueError:
+            raise ProtocolError(f"Invalid status line: {lines[0]!r}")
+        if not version.startswith("HTTP/1."):
+            raise ProtocolError(f"Unsupported protocol: {version}")
+
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            # Repeated headers are combined, as RFC 9110 allows
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        if 100 <= status < 200:
+            # Interim response (e.g. 100 Continue): the real one follows
+            return True
+
+        self.version = version
+        self.status = status
+        self.reason = reason[0] if reason else ""
+        self.headers = headers
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            self.keep_alive = "close" not in connection
+        else:
+            self.keep_alive = "keep-alive" in connection
+
+        self.on_headers(status, self.reason, headers)
+
+        if status in (204, 304):
+            self._finish()
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            self._state = "chunk_size"
+        elif "content-length" in headers:
+            try:
+                self._remaining = int(headers["content-length"])
+            except ValueError:
+                raise ProtocolError(f"Invalid Content-Length: {headers['content-length']!r}")
+            self._state = "body_length"
+            if self._remaining == 0:
+                self._finish()
+        else:
+            # Body ends when the server closes the connection
+            self._state = "body_close"
+            self.keep_alive = False
+        return True
+
+    def _parse(self):
+        while not self.done:
+            state = self._state
+
+            if state == "head":
+                if not self._parse_head():
+                    return
+
+            elif state in ("body_length", "body_close"):
+                if not self._buffer:
+                    return
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                self._feed_body(data)
+                return
+
+            elif state == "chunk_size":
+                end = self._buffer.find(b"\r\n")
+                if end < 0:
+                    return
+                size_field = bytes(self._buffer[:end]).split(b";", 1)[0].strip()
+                del self._buffer[:end + 2]
+                try:
+                    self._remaining = int(size_field, 16)
+                except ValueError:
+                    raise ProtocolError(f"Invalid chunk size: {size_field!r}")
+                self._state = "chunk_data" if self._remaining else "trailers"
+
+            elif state == "chunk_data":
+                if not self._buffer:
+                    return
+                take = min(self._remaining, len(self._buffer))
+                data = bytes(self._buffer[:take])
+                del self._buffer[:take]
+                self._remaining -= take
+                if not self._remaining:
+                    self._state = "chunk_end"
+                self.on_data(data)
+
+            elif state == "chunk_end":
+                if len(self._buffer) < 2:
+                    return
+                if self._buffer[:2] != b"\r\n":
+                    raise ProtocolError("Missing CRLF after chunk")
+                del self._buffer[:2]
+                self._state = "chunk_size"
+
+            elif state == "trailers":
+                end = self._buffer.find(b"\r\n")
+                if end < 0:
+                    return
+                del self._buffer[:end + 2]
+                if end == 0:
+                    # Empty line ends the trailers and the response
+                    if self._buffer:
+                        raise ProtocolError("Server sent data past the end of the response")
+                    self._finish()
+
+
+class RequestHandle:
+    """
+    One request driven by the I/O thread.
+
+    Exactly one of the request's on_complete/on_error callbacks is called,
+    always on the I/O thread.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        client: "SelectorHTTPClient",
+        server: ServerKey,
+        path: str,
+        headers: Dict[str, str],
+        payload: bytes,
+        on_headers: Optional[Callable[[int, str, Dict[str, str]], None]],
+        on_data: Optional[Callable[[bytes], None]],
+        on_complete: Optional[Callable[[], None]],
+        on_error: Optional[Callable[[Exception], None]],
+        connect_timeout: float,
+        read_timeout: float,
+        deadline_at: Optional[float]
+    ):
+        self.id = next(self._ids)
+        self.client = client
+        self.server = server
+        self.path = path
+        self.headers = headers
+        self.payload = payload
+        self.on_headers = on_headers
+        self.on_data = on_data
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline_at = deadline_at
+
+        self.connection: Optional["_Connection"] = None
+        # Set when the request runs as a stream of an HTTP/2 connection
+        self.http2 = False
+        self.stream_id: Optional[int] = None
+        self.finished = False
+        self.bytes_received = 0
+        self.started_at = time.monotonic()
+        self.last_activity = self.started_at
+
+    def cancel(self):
+        """Abort the request (thread-safe); on_error receives RequestAborted"""
+        self.client.call_soon(self.client._fail, self, RequestAborted("Requisição cancelada"))
+
+    def expires_at(self) -> float:
+        """Monotonic time at which the request times out"""
+        connection = self.connection
+        if connection is None or connection.state in ("connecting", "handshaking"):
+            limit = self.last_activity + self.connect_timeout
+        else:
+            limit = self.last_activity + self.read_timeout
+        if self.deadline_at is not None:
+            limit = min(limit, self.deadline_at)
+        return limit
+
+
+class _Connection:
+    """A non-blocking (possibly TLS) socket and its HTTP/1.1 or HTTP/2 state"""
+    def __init__(self, server: ServerKey, sock: socket.socket, offer_http2: bool = False):
+        self.server = server
+        self.sock = sock
+        # connecting -> (handshaking) -> sending -> receiving -> idle -> sending ...
+        # or, once h2 is negotiated: connecting -> handshaking -> h2
+        self.state = "connecting"
+        self.offer_http2 = offer_http2
+        self.request: Optional[RequestHandle] = None
+        self.parser: Optional[ResponseParser] = None
+        self.outgoing = b""
+        self.reused = False
+        self.idle_since = 0.0
+        self.events = 0
+        # HTTP/2 only: protocol state and stream ID -> request
+        self.session: Optional[H2Session] = None
+        self.streams: Dict[int, RequestHandle] = {}
+
+
+class SelectorHTTPClient:
+    """
+    Non-blocking HTTP/1.1 client driven by a single I/O thread.
+
+    Requests from any thread are handed to the I/O thread, which multiplexes
+    every socket with `selectors`: connection setup, TLS handshakes, sends,
+    chunked decoding and keep-alive reuse all happen there, and response
+    data is passed to the request's callbacks as it arrives. Nothing here
+    blocks except DNS resolution, which is cached per server.
+
+    Requests made with http2=True offer h2 via ALPN and, when the server
+    accepts, share one multiplexed connection per server; cancelling one
+    resets only its stream. Servers that answer with HTTP/1.1 are
+    remembered and served over the keep-alive pool instead.
+    """
+    def __init__(self, ssl_context: Optional[ssl.SSLContext] = None, max_idle_per_server: int = MAX_IDLE_PER_SERVER):
+        self.ssl_context = ssl_context or connection_pool.create_ssl_context()
+        self.max_idle_per_server = max_idle_per_server
+
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
+
+        self._lock = threading.Lock()
+        self._ready: deque = deque()
+        self._timers: List = []
+        self._timer_ids = itertools.count()
+
+        self._requests: Dict[int, RequestHandle] = {}
+        self._idle: Dict[ServerKey, List[_Connection]] = {}
+        self._addresses: Dict[Tuple[str, int], Tuple] = {}
+
+        # HTTP/2: live multiplexed connection per server, connections being set up,
+        # requests waiting for a stream, and servers that declined h2
+        self._h2_connections: Dict[ServerKey, _Connection] = {}
+        self._h2_pending: Dict[ServerKey, _Connection] = {}
+        self._h2_waiting: Dict[ServerKey, deque] = {}
+        self._http1_only = set()
+        self._h2_ssl_context: Optional[ssl.SSLContext] = None
+        self._warned_no_h2 = False
+
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Counters for reporting
+        self.stats = {"requests": 0, "connections": 0, "reused": 0, "h2_streams": 0}
+
+    # Thread-safe scheduling
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="http-core-io")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _wake(self):
+        try:
+            self._wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            # Buffer full means a wakeup is already pending
+            pass
+
+    def in_io_thread(self) -> bool:
+        """Whether the caller is the I/O thread"""
+        return threading.current_thread() is self._thread
+
+    def call_soon(self, callback: Callable, *args):
+        """Run a callback on the I/O thread"""
+        self._ensure_thread()
+        with self._lock:
+            self._ready.append((callback, args))
+        if not self.in_io_thread():
+            self._wake()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> List:
+        """
+        Run a callback on the I/O thread after a delay
+
+        Returns:
+            Timer entry; pass it to cancel_timer() to cancel
+        """
+        self._ensure_thread()
+        entry = [time.monotonic() + max(0.0, delay), next(self._timer_ids), callback, args]
+        with self._lock:
+            heapq.heappush(self._timers, entry)
+        if not self.in_io_thread():
+            self._wake()
+        return entry
+
+    def cancel_timer(self, entry: List):
+        """Cancel a timer returned by call_later"""
+        entry[2] = None
+
+    # Public API
+
+    def request(
+        self,
+        host: str,
+        port: int,
+        path: str,
+        use_https: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+        on_headers: Optional[Callable[[int, str, Dict[str, str]], None]] = None,
+        on_data: Optional[Callable[[bytes], None]] = None,
+        on_complete: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        deadline_at: Optional[float] = None,
+        http2: bool = False
+    ) -> RequestHandle:
+        """
+        Start a GET request; all callbacks run on the I/O thread
+
+        Args:
+            host: Server hostname or IP
+            port: Server port
+            path: Request path (already quoted)
+            use_https: Whether to use TLS
+            headers: Extra request headers
+            on_headers: Called with (status, reason, lower-cased headers)
+            on_data: Called with each piece of the (de-chunked) body
+            on_complete: Called when the response is complete
+            on_error: Called with the exception if the request fails; an exception
+                raised by another callback also ends the request through on_error
+            connect_timeout: Seconds allowed for TCP and TLS setup
+            read_timeout: Seconds allowed without receiving anything
+            deadline_at: Absolute time.monotonic() by which the response must be complete
+            http2: Multiplex over an HTTP/2 connection if the server negotiates h2
+                (HTTPS only, needs the optional `h2` package; otherwise HTTP/1.1 is used)
+
+        Returns:
+            Handle that can cancel the request
+        """
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        handle = RequestHandle(
+            self, (host, port, use_https), path, dict(headers or {}), payload,
+            on_headers, on_data, on_complete, on_error,
+            connect_timeout, read_timeout, deadline_at
+        )
+        if http2 and use_https:
+            if http2_available():
+                handle.http2 = True
+            elif not self._warned_no_h2:
+                self._warned_no_h2 = True
+                print("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        self.call_soon(self._start, handle)
+        return handle
+
+    def fetch(self, host: str, port: int, path: str, use_https: bool = True,
+              headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_READ_TIMEOUT) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Blocking convenience wrapper around request()
+
+        Returns:
+            Tuple of (status, headers, raw body)
+        """
+        done = threading.Event()
+        response = {"status": None, "headers": {}, "body": bytearray(), "error": None}
+
+        def on_headers(status, reason, response_headers):
+            response["status"] = status
+            response["headers"] = response_headers
+
+        def on_error(error):
+            response["error"] = error
+            done.set()
+
+        self.request(
+            host, port, path, use_https, headers,
+            on_headers=on_headers,
+            on_data=response["body"].extend,
+            on_complete=done.set,
+            on_error=on_error,
+            read_timeout=timeout
+        )
+        done.wait()
+        if response["error"] is not None:
+            raise response["error"]
+        return response["status"], response["headers"], bytes(response["body"])
+
+    def close(self):
+        """Stop the I/O thread and close every connection"""
+        with self._lock:
+            self._closed = True
+        self._wake()
+        if self._thread is not None and not self.in_io_thread():
+            self._thread.join(timeout=5.0)
+
+    # I/O thread
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+            timeout = self._poll_timeout()
+            for key, mask in self._selector.select(timeout):
+                if key.data is None:
+                    self._drain_wakeups()
+                else:
+                    self._handle_event(key.data, mask)
+            self._run_timers()
+            self._run_ready()
+            self._check_timeouts()
+
+        # Shutting down: fail what is left
+        for handle in list(self._requests.values()):
+            self._fail(handle, RequestAborted("Cliente HTTP encerrado"))
+        for connections in self._idle.values():
+            for connection in connections:
+                self._close_connection(connection)
+        self._idle.clear()
+        for connection in list(self._h2_connections.values()) + list(self._h2_pending.values()):
+            self._close_connection(connection)
+        self._h2_connections.clear()
+        self._h2_pending.clear()
+
+    def _poll_timeout(self) -> float:
+        now = time.monotonic()
+        timeout = MAX_POLL_INTERVAL
+        with self._lock:
+            if self._ready:
+                return 0.0
+            if self._timers:
+                timeout = min(timeout, self._timers[0][0] - now)
+        for handle in self._requests.values():
+            timeout = min(timeout, handle.expires_at() - now)
+        return max(0.0, timeout)
+
+    def _drain_wakeups(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run_ready(self):
+        with self._lock:
+            ready, self._ready = self._ready, deque()
+        for callback, args in ready:
+            try:
+                callback(*args)
+            except Exception as error:
+                print(f"HTTP core callback failed: {str(error)}")
+
+    def _run_timers(self):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers))
+        for _, _, callback, args in due:
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as error:
+                print(f"HTTP core timer failed: {str(error)}")
+
+    def _check_timeouts(self):
+        now = time.monotonic()
+        for handle in list(self._requests.values()):
+            if now >= handle.expires_at():
+                if handle.deadline_at is not None and now >= handle.deadline_at:
+                    error = ResponseTimeout("Prazo da requisição esgotado")
+                elif handle.connection is None or handle.connection.state in ("connecting", "handshaking"):
+                    error = ConnectError(f"Connection timed out after {handle.connect_timeout:.0f}s")
+                else:
+                    error = ResponseTimeout(f"No data received for {handle.read_timeout:.0f}s")
+                self._fail(handle, error)
+
+        # Drop idle connections nobody reused
+        for server, connections in list(self._idle.items()):
+            for connection in list(connections):
+                if now - connection.idle_since > IDLE_TIMEOUT:
+                    connections.remove(connection)
+                    self._close_connection(connection)
+        for server, connection in list(self._h2_connections.items()):
+            if not connection.streams and now - connection.idle_since > IDLE_TIMEOUT:
+                del self._h2_connections[server]
+                self._close_connection(connection)
+
+    # Request lifecycle (I/O thread only)
+
+    def _start(self, handle: RequestHandle):
+        if handle.finished:
+            return
+        self._requests[handle.id] = handle
+        self.stats["requests"] += 1
+
+        if handle.http2 and handle.server not in self._http1_only:
+            self._start_http2(handle)
+        else:
+            self._start_http1(handle)
+
+    def _start_http1(self, handle: RequestHandle):
+        connection = self._take_idle(handle.server)
+        if connection is not None:
+            self.stats["reused"] += 1
+            try:
+                self._send_request(connection, handle)
+                return
+            except OSError:
+                # Dropped while idle: fall back to a new connection
+                self._close_connection(connection)
+
+        try:
+            connection = self._open_connection(handle.server)
+        except OSError as error:
+            self._fail(handle, ConnectError(str(error)))
+            return
+        connection.request = handle
+        handle.connection = connection
+
+    def _take_idle(self, server: ServerKey) -> Optional[_Connection]:
+        connections = self._idle.get(server)
+        while connections:
+            connection = connections.pop()
+            if connection.state == "idle":
+                connection.reused = True
+                return connection
+        return None
+
+    def _resolve(self, host: str, port: int) -> Tuple:
+        key = (host, port)
+        address = self._addresses.get(key)
+        if address is None:
+            family, socktype, proto, _, sockaddr = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+            address = (family, socktype, proto, sockaddr)
+            self._addresses[key] = address
+        return address
+
+    def _open_connection(self, server: ServerKey, offer_http2: bool = False) -> _Connection:
+        host, port, _ = server
+        family, socktype, proto, sockaddr = self._resolve(host, port)
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        result = sock.connect_ex(sockaddr)
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            sock.close()
+            raise OSError(result, errno.errorcode.get(result, "connect failed"))
+
+        self.stats["connections"] += 1
+        connection = _Connection(server, sock, offer_http2)
+        self._watch(connection, selectors.EVENT_WRITE)
+        return connection
+
+    def _watch(self, connection: _Connection, events: int):
+        if connection.events == events:
+            return
+        if connection.events:
+            self._selector.modify(connection.sock, events, connection)
+        else:
+            self._selector.register(connection.sock, events, connection)
+        connection.events = events
+
+    def _close_connection(self, connection: _Connection):
+        if connection.events:
+            try:
+                self._selector.unregister(connection.sock)
+            except (KeyError, ValueError):
+                pass
+            connection.events = 0
+        connection.state = "closed"
+        try:
+            connection.sock.close()
+        except OSError:
+            pass
+
+    def _send_request(self, connection: _Connection, handle: RequestHandle):
+        connection.request = handle
+        handle.connection = connection
+        handle.last_activity = time.monotonic()
+        connection.parser = ResponseParser(
+            lambda status, reason, headers: self._on_headers(handle, status, reason, headers),
+            lambda data: self._on_data(handle, data)
+        )
+        connection.outgoing = handle.payload
+        connection.state = "sending"
+        self._watch(connection, selectors.EVENT_WRITE)
+        self._send(connection)
+
+    def _handle_event(self, connection: _Connection, mask: int):
+        try:
+            if connection.state == "connecting":
+                self._finish_connect(connection)
+            elif connection.state == "handshaking":
+                self._handshake(connection)
+            elif connection.state == "sending":
+                self._send(connection)
+            elif connection.state == "receiving":
+                self._receive(connection)
+            elif connection.state == "idle":
+                self._check_idle(connection)
+            elif connection.state == "h2":
+                self._h2_io(connection, mask)
+        except Exception as error:
+            # Socket errors become transport errors; a callback's own exception is passed through
+            if isinstance(error, OSError) and not isinstance(error, HTTPCoreError):
+                error = ProtocolError(str(error))
+            if connection.session is not None or connection.offer_http2:
+                self._h2_connection_lost(connection, error)
+                return
+            handle = connection.request
+            self._close_connection(connection)
+            if handle is not None:
+                self._fail(handle, error)
+
+    def _finish_connect(self, connection: _Connection):
+        error = connection.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            raise ConnectError(f"Could not connect to {connection.server[0]}:{connection.server[1]}: {errno.errorcode.get(error, error)}")
+
+        host, _, use_tls = connection.server
+        if use_tls:
+            self._unregister(connection)
+            context = self._http2_ssl_context() if connection.offer_http2 else self.ssl_context
+            connection.sock = context.wrap_socket(
+                connection.sock, server_hostname=host, do_handshake_on_connect=False
+            )
+            connection.state = "handshaking"
+            self._watch(connection, selectors.EVENT_READ | selectors.EVENT_WRITE)
+            self._handshake(connection)
+        else:
+            self._send_request(connection, connection.request)
+
+    def _unregister(self, connection: _Connection):
+        if connection.events:
+            self._selector.unregister(connection.sock)
+            connection.events = 0
+
+    def _handshake(self, connection: _Connection):
+        try:
+            connection.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self._watch(connection, selectors.EVENT_READ)
+            return
+        except ssl.SSLWantWriteError:
+            self._watch(connection, selectors.EVENT_WRITE)
+            return
+        except (ssl.SSLError, OSError) as error:
+            raise ConnectError(f"TLS handshake failed: {str(error)}")
+
+        context = self._http2_ssl_context() if connection.offer_http2 else self.ssl_context
+        remember = getattr(context, "remember_session", None)
+        if remember is not None:
+            remember(connection.sock)
+
+        if connection.offer_http2:
+            self._negotiated(connection)
+        else:
+            self._send_request(connection, connection.request)
+
+    def _send(self, connection: _Connection):
+        while connection.outgoing:
+            try:
+                sent = connection.sock.send(connection.outgoing)
+            except (BlockingIOError, ssl.SSLWantWriteError):
+                return
+            except ssl.SSLWantReadError:
+                self._watch(connection, selectors.EVENT_READ)
+                return
+            connection.outgoing = connection.outgoing[sent:]
+
+        connection.state = "receiving"
+        self._watch(connection, selectors.EVENT_READ)
+
+    def _recv_available(self, connection: _Connection) -> Tuple[List[bytes], bool]:
+        """Read everything currently available; returns (pieces, closed)"""
+        pieces = []
+        while True:
+            try:
+                data = connection.sock.recv(READ_SIZE)
+            except (BlockingIOError, ssl.SSLWantReadError):
+                return pieces, False
+            except ssl.SSLWantWriteError:
+                return pieces, False
+            except (ConnectionResetError, ssl.SSLEOFError, ssl.SSLZeroReturnError):
+                return pieces, True
+            if not data:
+                return pieces, True
+            pieces.append(data)
+
+    def _receive(self, connection: _Connection):
+        handle = connection.request
+        pieces, closed = self._recv_available(connection)
+
+        for data in pieces:
+            handle.last_activity = time.monotonic()
+            handle.bytes_received += len(data)
+            connection.parser.feed(data)
+            if handle.finished:
+                # A callback ended the request (e.g. cancellation)
+                return
+            if connection.parser.done:
+                break
+
+        if connection.parser.done:
+            self._complete(connection, handle)
+            return
+
+        if closed:
+            if connection.reused and handle.bytes_received == 0:
+                # The server dropped a keep-alive connection: retry once on a fresh one
+                self._close_connection(connection)
+                handle.connection = None
+                try:
+                    fresh = self._open_connection(handle.server)
+                except OSError as error:
+                    self._fail(handle, ConnectError(str(error)))
+                    return
+                fresh.request = handle
+                handle.connection = fresh
+                return
+            connection.parser.eof()
+            self._complete(connection, handle)
+
+    def _check_idle(self, connection: _Connection):
+        # Readable while idle: TLS tickets (harmless), or the server closed the connection
+        pieces, closed = self._recv_available(connection)
+        if pieces or closed:
+            self._idle.get(connection.server, []).remove(connection)
+            self._close_connection(connection)
+
+    def _on_headers(self, handle: RequestHandle, status: int, reason: str, headers: Dict[str, str]):
+        if handle.on_headers is not None:
+            handle.on_headers(status, reason, headers)
+
+    def _on_data(self, handle: RequestHandle, data: bytes):
+        if handle.on_data is not None and not handle.finished:
+            handle.on_data(data)
+
+    def _complete(self, connection: _Connection, handle: RequestHandle):
+        connection.request = None
+        parser = connection.parser
+        connection.parser = None
+
+        if parser.keep_alive and connection.state == "receiving":
+            connection.state = "idle"
+            connection.idle_since = time.monotonic()
+            idle = self._idle.setdefault(connection.server, [])
+            if len(idle) < self.max_idle_per_server:
+                idle.append(connection)
+                self._watch(connection, selectors.EVENT_READ)
+            else:
+                self._close_connection(connection)
+        else:
+            self._close_connection(connection)
+
+        self._finish_handle(handle)
+
+    def _finish_handle(self, handle: RequestHandle):
+        if handle.finished:
+            return
+        handle.finished = True
+        self._requests.pop(handle.id, None)
+        if handle.on_complete is not None:
+            try:
+                handle.on_complete()
+            except Exception as error:
+                print(f"HTTP core completion callback failed: {str(error)}")
+
+    def _fail(self, handle: RequestHandle, error: Exception):
+        if handle.finished:
+            return
+        handle.finished = True
+        self._requests.pop(handle.id, None)
+
+        connection = handle.connection
+        if connection is not None and connection.session is not None:
+            # HTTP/2: only this stream is reset, the connection keeps serving the others
+            if connection.streams.pop(handle.stream_id, None) is not None:
+                connection.session.reset(handle.stream_id)
+                try:
+                    self._h2_flush(connection)
+                except OSError:
+                    pass
+        elif connection is not None and connection.request is handle:
+            # The response was not fully read, so the connection can't be reused
+            connection.request = None
+            self._close_connection(connection)
+        elif handle.http2:
+            # Still waiting for an HTTP/2 connection or a free stream
+            waiting = self._h2_waiting.get(handle.server)
+            if waiting and handle in waiting:
+                waiting.remove(handle)
+
+        if handle.on_error is not None:
+            try:
+                handle.on_error(error)
+            except Exception as callback_error:
+                print(f"HTTP core error callback failed: {str(callback_error)}")
+
+
+    # HTTP/2 (I/O thread only)
+
+    def _http2_ssl_context(self) -> ssl.SSLContext:
+        """SSL context that offers h2 via ALPN (kept apart so HTTP/1.1 connections never get h2)"""
+        if self._h2_ssl_context is None:
+            self._h2_ssl_context = connection_pool.create_ssl_context()
+            self._h2_ssl_context.set_alpn_protocols(ALPN_PROTOCOLS)
+        return self._h2_ssl_context
+
+    def _start_http2(self, handle: RequestHandle):
+        server = handle.server
+        connection = self._h2_connections.get(server)
+        if connection is not None and connection.session.capacity > 0:
+            self._open_stream(connection, handle)
+            return
+
+        # Wait for the connection being set up, or for a stream to free up
+        self._h2_waiting.setdefault(server, deque()).append(handle)
+        if connection is None and server not in self._h2_pending:
+            try:
+                self._h2_pending[server] = self._open_connection(server, offer_http2=True)
+            except OSError as error:
+                self._fail_waiting(server, ConnectError(str(error)))
+
+    def _fail_waiting(self, server: ServerKey, error: Exception):
+        waiting = self._h2_waiting.pop(server, deque())
+        for handle in waiting:
+            handle.http2 = False  # Nothing left to remove it from
+            self._fail(handle, error)
+
+    def _negotiated(self, connection: _Connection):
+        """TLS is up on a connection that offered h2: see what the server chose"""
+        server = connection.server
+        self._h2_pending.pop(server, None)
+
+        if connection.sock.selected_alpn_protocol() == "h2":
+            host, port, _ = server
+            connection.session = H2Session(f"{host}:{port}")
+            connection.state = "h2"
+            connection.idle_since = time.monotonic()
+            self._h2_connections[server] = connection
+            self._watch(connection, selectors.EVENT_READ)
+            self._h2_flush(connection)
+            self._drain_h2_waiting(connection)
+            return
+
+        # The server only speaks HTTP/1.1: remember that and use the keep-alive pool
+        print(f"Server {server[0]}:{server[1]} did not negotiate HTTP/2; using HTTP/1.1")
+        self._http1_only.add(server)
+        connection.offer_http2 = False
+        waiting = self._h2_waiting.pop(server, deque())
+        for handle in waiting:
+            handle.http2 = False
+
+        if waiting:
+            self._send_request(connection, waiting.popleft())
+        else:
+            connection.state = "idle"
+            connection.idle_since = time.monotonic()
+            self._idle.setdefault(server, []).append(connection)
+            self._watch(connection, selectors.EVENT_READ)
+        for handle in waiting:
+            self._start_http1(handle)
+
+    def _drain_h2_waiting(self, connection: _Connection):
+        waiting = self._h2_waiting.get(connection.server)
+        while waiting and connection.session.capacity > 0:
+            self._open_stream(connection, waiting.popleft())
+
+    def _open_stream(self, connection: _Connection, handle: RequestHandle):
+        handle.connection = connection
+        handle.last_activity = time.monotonic()
+        handle.stream_id = connection.session.send_request(handle.path, handle.headers)
+        connection.streams[handle.stream_id] = handle
+        self.stats["h2_streams"] += 1
+        self._h2_flush(connection)
+
+    def _h2_flush(self, connection: _Connection):
+        """Queue the session's pending frames and write what the socket accepts"""
+        connection.outgoing += connection.session.data_to_send()
+        while connection.outgoing:
+            try:
+                sent = connection.sock.send(connection.outgoing)
+            except (BlockingIOError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+                break
+            connection.outgoing = connection.outgoing[sent:]
+
+        events = selectors.EVENT_READ
+        if connection.outgoing:
+            events |= selectors.EVENT_WRITE
+        self._watch(connection, events)
+
+    def _h2_io(self, connection: _Connection, mask: int):
+        if mask & selectors.EVENT_WRITE:
+            self._h2_flush(connection)
+        if not mask & selectors.EVENT_READ:
+            return
+
+        pieces, closed = self._recv_available(connection)
+        for data in pieces:
+            for kind, stream_id, payload in connection.session.receive(data):
+                if kind == "terminated":
+                    self._h2_connection_lost(connection, ProtocolError(payload))
+                    return
+                self._h2_stream_event(connection, kind, stream_id, payload)
+
+        if closed:
+            self._h2_connection_lost(connection, ProtocolError("Server closed the HTTP/2 connection"))
+            return
+
+        # Window updates and acknowledgements, then any requests waiting for a stream
+        self._h2_flush(connection)
+        self._drain_h2_waiting(connection)
+
+    def _h2_stream_event(self, connection: _Connection, kind: str, stream_id: int, payload):
+        handle = connection.streams.get(stream_id)
+        if handle is None or handle.finished:
+            return
+        handle.last_activity = time.monotonic()
+
+        try:
+            if kind == "headers":
+                status, headers = payload
+                self._on_headers(handle, status, "", headers)
+            elif kind == "data":
+                handle.bytes_received += len(payload)
+                self._on_data(handle, payload)
+            elif kind == "end":
+                del connection.streams[stream_id]
+                self._finish_handle(handle)
+            elif kind == "reset":
+                del connection.streams[stream_id]
+                self._fail(handle, ProtocolError(payload))
+        except Exception as error:
+            # A failing callback ends only its own stream
+            if isinstance(error, OSError) and not isinstance(error, HTTPCoreError):
+                error = ProtocolError(str(error))
+            self._fail(handle, error)
+
+        if not connection.streams:
+            connection.idle_since = time.monotonic()
+
+    def _h2_connection_lost(self, connection: _Connection, error: Exception):
+        """Fail the streams of a dead HTTP/2 connection (or of one that never came up)"""
+        server = connection.server
+        established = connection.session is not None
+        if self._h2_connections.get(server) is connection:
+            del self._h2_connections[server]
+        if self._h2_pending.get(server) is connection:
+            del self._h2_pending[server]
+
+        streams = list(connection.streams.values())
+        connection.streams.clear()
+        self._close_connection(connection)
+
+        for handle in streams:
+            self._fail(handle, error)
+
+        if established:
+            # Requests that never got a stream were not sent: start them on a new connection
+            waiting = self._h2_waiting.pop(server, deque())
+            for handle in waiting:
+                self._start_http2(handle)
+        else:
+            self._fail_waiting(server, error)
+
+
+# Shared client, started on first use
+_client: Optional[SelectorHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> SelectorHTTPClient:
+    """Return the shared non-blocking client (one I/O thread for the whole process)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SelectorHTTPClient()
+        return _client
@@ -0,0 +1,159 @@
+import os
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Type definitions
+JSONInput = Union[bytes, bytearray, memoryview, str]
+Decoder = Callable[[JSONInput], Any]
+
+# Environment variable that forces a specific backend ("orjson", "msgspec" or "json")
+BACKEND_ENV_VAR = "CPF_JSON_BACKEND"
+
+# Preferred order when no backend is forced
+PREFERRED_BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _load_orjson() -> Decoder:
+    import orjson
+
+    def decode(data: JSONInput) -> Any:
+        # orjson accepts bytes, bytearray, memoryview and str without copying
+        return orjson.loads(data)
+
+    return decode
+
+
+def _load_msgspec() -> Decoder:
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+
+    def decode(data: JSONInput) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as error:
+            # Normalize to ValueError like the other backends
+            raise ValueError(str(error)) from error
+
+    return decode
+
+
+def _load_stdlib() -> Decoder:
+    def decode(data: JSONInput) -> Any:
+        # json.loads detects the encoding of bytes input on its own
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    return decode
+
+
+# Maps backend names to loader functions
+_LOADERS: Dict[str, Callable[[], Decoder]] = {
+    "orjson": _load_orjson,
+    "msgspec": _load_msgspec,
+    "json": _load_stdlib,
+}
+
+# Currently selected backend
+_backend_name: Optional[str] = None
+_decoder: Optional[Decoder] = None
+
+
+def available_backends() -> List[str]:
+    """Return the names of the backends that can be imported in this environment"""
+    names = []
+    for name in PREFERRED_BACKENDS:
+        try:
+            _LOADERS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_decoder(name: str) -> Decoder:
+    """
+    Build a decoder for a specific backend
+
+    Args:
+        name: Backend name ("orjson", "msgspec" or "json")
+
+    Returns:
+        Function that decodes JSON from bytes or str
+    """
+    if name not in _LOADERS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    return _LOADERS[name]()
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    Select the JSON backend used by loads()
+
+    Args:
+        name: Backend name, or None to pick the fastest one installed
+
+    Returns:
+        Name of the selected backend
+    """
+    global _backend_name, _decoder
+
+    candidates = [name] if name else list(PREFERRED_BACKENDS)
+    for candidate in candidates:
+        try:
+            _decoder = get_decoder(candidate)
+            _backend_name = candidate
+            return candidate
+        except ImportError:
+            print(f"JSON backend '{candidate}' not available")
+
+    # Forced backend is missing: fall back to the stdlib
+    _decoder = _load_stdlib()
+    _backend_name = "json"
+    return _backend_name
+
+
+def get_backend() -> str:
+    """Return the name of the selected backend"""
+    if _decoder is None:
+        set_backend(os.environ.get(BACKEND_ENV_VAR) or None)
+    return _backend_name
+
+
+def loads(data: JSONInput) -> Any:
+    """
+    Decode a JSON document with the selected backend
+
+    Args:
+        data: JSON document as bytes (preferred) or str
+
+    Returns:
+        The decoded Python object
+
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if _decoder is None:
+        get_backend()
+    return _decoder(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode an object as UTF-8 JSON bytes with the selected backend
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        Encoded document
+    """
+    backend = get_backend()
+    if backend == "orjson":
+        import orjson
+        return orjson.dumps(obj)
+    if backend == "msgspec":
+        import msgspec
+        return msgspec.json.encode(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,118 @@
+import re
+from typing import Any, List
+
+from . import json_backend
+
+# Tokens of a JSON stream: a brace, a lone quote opening a string that hasn't
+# fully arrived yet, or a run of anything else, complete strings included (so
+# braces inside names are skipped and long stretches of data are passed over
+# in one match). Braces and quotes are ASCII, and ASCII bytes never occur
+# inside a multibyte UTF-8 sequence, so the raw bytes can be scanned without
+# decoding them first.
+#
+# The runs are written as unrolled loops (every byte can match only one way),
+# so an unterminated string at the end of the buffer can't cause backtracking.
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Complete object without nested objects, like one person record
+_FLAT_OBJECT = rb'\{[^{}"]*(?:' + _STRING + rb'[^{}"]*)*\}'
+
+
+def _token_pattern(atom: bytes) -> "re.Pattern":
+    run = rb'[^{}"]+(?:' + atom + rb'[^{}"]*)*|(?:' + atom + rb'[^{}"]*)+'
+    return re.compile(run + rb'|[{}]|"', re.DOTALL)
+
+
+# Between documents every brace counts; inside one, whole records are skipped
+# in one match, so a results array costs a few iterations instead of a few
+# per record
+_TOP_LEVEL_TOKEN = _token_pattern(_STRING)
+_NESTED_TOKEN = _token_pattern(rb'(?:' + _STRING + rb'|' + _FLAT_OBJECT + rb')')
+
+
+class JSONObjectFramer:
+    """
+    Splits a stream of concatenated JSON objects into documents.
+
+    Works on raw bytes: received data is appended to one reusable
+    bytearray, scanning resumes where the previous chunk stopped, and each
+    complete object is decoded straight from a memoryview of the buffer.
+    Nothing is decoded to text before a whole object has arrived, so
+    multibyte characters split across chunks are never lost.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        # Where scanning resumes in the buffer
+        self.scan_position = 0
+        # Brace depth and start of the object being received (-1 between objects)
+        self.depth = 0
+        self.object_start = -1
+        # Complete objects that weren't valid JSON
+        self.invalid_objects = 0
+
+    @property
+    def pending(self) -> int:
+        """Bytes buffered for an object that isn't complete yet"""
+        return len(self.buffer)
+
+    @property
+    def in_object(self) -> bool:
+        """Whether an object has started arriving but isn't complete"""
+        return self.depth > 0
+
+    def feed(self, data: bytes) -> List[Any]:
+        """
+        Add received bytes
+
+        Args:
+            data: Next piece of the stream (bytes, bytearray or memoryview)
+
+        Returns:
+            The objects completed by this piece, in order
+        """
+        if not data:
+            return []
+        self.buffer += data
+
+        objects = []
+        buffer = self.buffer
+        end = len(buffer)
+        scan_position = end
+        position = self.scan_position
+        while position < end:
+            token = (_NESTED_TOKEN if self.depth else _TOP_LEVEL_TOKEN).match(buffer, position)
+            position = token.end()
+            if position - token.start() > 1:
+                # Run of data between braces
+                continue
+            kind = buffer[token.start()]
+            if kind == 0x7B:  # '{'
+                if self.depth == 0:
+                    self.object_start = token.start()
+                self.depth += 1
+            elif kind == 0x22:  # '"'
+                # String still arriving: rescan it with the next piece
+                scan_position = token.start()
+                break
+            elif kind == 0x7D and self.depth > 0:  # '}'
+                self.depth -= 1
+                if self.depth == 0:
+                    with memoryview(buffer) as view:
+                        document = view[self.object_start:position]
+                        try:
+                            objects.append(json_backend.loads(document))
+                        except ValueError:
+                            self.invalid_objects += 1
+                        finally:
+                            document.release()
+                    self.object_start = -1
+        self.scan_position = scan_position
+
+        # Drop what was consumed (deleting from the front of a bytearray doesn't copy the rest)
+        consumed = self.object_start if self.depth > 0 else self.scan_position
+        if consumed > 0:
+            del buffer[:consumed]
+            self.scan_position -= consumed
+            if self.object_start != -1:
+                self.object_start -= consumed
+
+        return objects
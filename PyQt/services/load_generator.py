@@ -0,0 +1,335 @@
+import math
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .tcp_client import TCPClient
+from . import connection_pool
+
+# Supported arrival profiles
+PROFILES = ("constant", "ramp", "poisson")
+
+# Query types the generator can issue
+QUERY_TYPES = ("name", "exactName", "cpf")
+
+
+class ArrivalSchedule:
+    """
+    Open-loop arrival times: requests are due at these offsets no matter
+    how long earlier requests take.
+    """
+    def __init__(
+        self,
+        profile: str,
+        rate: float,
+        duration: float,
+        start_rate: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            profile: "constant", "ramp" (linear from start_rate to rate) or "poisson"
+            rate: Target arrivals per second (final rate for ramps)
+            duration: Length of the run in seconds
+            start_rate: Initial rate for ramps (default 0)
+            seed: Random seed for Poisson arrivals
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown arrival profile: {profile}")
+        if rate <= 0 or duration <= 0:
+            raise ValueError("Rate and duration must be positive")
+
+        self.profile = profile
+        self.rate = rate
+        self.duration = duration
+        self.start_rate = start_rate or 0.0
+        self.rng = random.Random(seed)
+
+    def rate_at(self, offset: float) -> float:
+        """Offered rate at a point of the run"""
+        if self.profile == "ramp":
+            return self.start_rate + (self.rate - self.start_rate) * offset / self.duration
+        return self.rate
+
+    def offsets(self) -> Iterator[float]:
+        """Yield the intended start offsets (seconds from the start of the run)"""
+        if self.profile == "constant":
+            count = int(self.rate * self.duration)
+            for i in range(count):
+                yield i / self.rate
+
+        elif self.profile == "poisson":
+            offset = self.rng.expovariate(self.rate)
+            while offset < self.duration:
+                yield offset
+                offset += self.rng.expovariate(self.rate)
+
+        else:
+            # Ramp: the i-th arrival is where the integral of the rate reaches i,
+            # i.e. start*t + slope*t^2/2 = i
+            slope = (self.rate - self.start_rate) / self.duration
+            i = 0
+            while True:
+                if slope == 0:
+                    offset = i / self.start_rate if self.start_rate else float("inf")
+                else:
+                    offset = (-self.start_rate + math.sqrt(self.start_rate ** 2 + 2 * slope * i)) / slope
+                if offset >= self.duration:
+                    return
+                yield offset
+                i += 1
+
+
+class QueryMix:
+    """Weighted mix of query types, each with its own pool of search terms"""
+    def __init__(self, weights: Dict[str, float], terms: Dict[str, List[str]], seed: Optional[int] = None):
+        """
+        Args:
+            weights: Query type -> relative weight (e.g. {"name": 1, "cpf": 9})
+            terms: Query type -> search terms to draw from
+            seed: Random seed
+        """
+        self.types = [query_type for query_type, weight in weights.items() if weight > 0]
+        if not self.types:
+            raise ValueError("Query mix has no query types with positive weight")
+        for query_type in self.types:
+            if query_type not in QUERY_TYPES:
+                raise ValueError(f"Unknown query type: {query_type}")
+            if not terms.get(query_type):
+                raise ValueError(f"No search terms for query type: {query_type}")
+
+        self.weights = [weights[query_type] for query_type in self.types]
+        self.terms = terms
+        self.rng = random.Random(seed)
+
+    def choose(self) -> Tuple[str, str]:
+        """Pick the next (query type, search term)"""
+        query_type = self.rng.choices(self.types, weights=self.weights)[0]
+        return query_type, self.rng.choice(self.terms[query_type])
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LoadReport:
+    """
+    Latency-vs-throughput report for a load run.
+
+    Latency is measured from each request's intended start, not from when
+    a worker actually picked it up, so time spent waiting behind slow
+    requests is counted (coordinated-omission correction). Service time
+    (from the actual start) is reported alongside for comparison.
+    """
+    PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, schedule: ArrivalSchedule, records: List[Dict], elapsed: float, window: float):
+        self.schedule = schedule
+        self.records = records
+        self.elapsed = elapsed
+        self.window = window
+
+    @staticmethod
+    def _latency_summary(records: List[Dict], start_key: str) -> Dict[str, float]:
+        latencies = sorted(record["end"] - record[start_key] for record in records)
+        summary = {f"p{fraction * 100:g}": percentile(latencies, fraction) for fraction in LoadReport.PERCENTILES}
+        summary["max"] = latencies[-1] if latencies else 0.0
+        summary["mean"] = sum(latencies) / len(latencies) if latencies else 0.0
+        return summary
+
+    def summary(self) -> Dict:
+        """Overall figures, per query type and per time window"""
+        ok = [record for record in self.records if record["ok"]]
+        report = {
+            "profile": self.schedule.profile,
+            "target_rate": self.schedule.rate,
+            "duration": self.schedule.duration,
+            "elapsed": self.elapsed,
+            "requests": len(self.records),
+            "errors": len(self.records) - len(ok),
+            "throughput": len(ok) / self.elapsed if self.elapsed else 0.0,
+            "latency": self._latency_summary(ok, "intended"),
+            "service_time": self._latency_summary(ok, "started"),
+            "by_type": {},
+            "windows": []
+        }
+
+        for query_type in sorted({record["type"] for record in self.records}):
+            typed = [record for record in ok if record["type"] == query_type]
+            report["by_type"][query_type] = {
+                "requests": sum(1 for record in self.records if record["type"] == query_type),
+                "errors": sum(1 for record in self.records if record["type"] == query_type and not record["ok"]),
+                "latency": self._latency_summary(typed, "intended")
+            }
+
+        # Latency vs throughput over time: arrivals grouped by intended start
+        window_count = max(1, math.ceil(self.schedule.duration / self.window))
+        for index in range(window_count):
+            start, end = index * self.window, (index + 1) * self.window
+            in_window = [record for record in self.records if start <= record["intended_offset"] < end]
+            ok_in_window = [record for record in in_window if record["ok"]]
+            span = min(end, self.schedule.duration) - start
+            report["windows"].append({
+                "start": start,
+                "offered_rate": len(in_window) / span if span > 0 else 0.0,
+                "throughput": len(ok_in_window) / span if span > 0 else 0.0,
+                "errors": len(in_window) - len(ok_in_window),
+                "latency": self._latency_summary(ok_in_window, "intended")
+            })
+
+        return report
+
+    def format(self) -> str:
+        """Human-readable report"""
+        summary = self.summary()
+        lines = [
+            f"Profile {summary['profile']}, target {summary['target_rate']:.1f} req/s for {summary['duration']:.0f}s "
+            f"(ran {summary['elapsed']:.1f}s)",
+            f"Requests: {summary['requests']}, errors: {summary['errors']}, throughput: {summary['throughput']:.1f} req/s",
+            "",
+            "Latency (ms)           " + "".join(f"{key:>10}" for key in summary["latency"]),
+            "  corrected (intended) " + "".join(f"{value * 1000:10.1f}" for value in summary["latency"].values()),
+            "  service time         " + "".join(f"{value * 1000:10.1f}" for value in summary["service_time"].values()),
+            "",
+            "By query type:"
+        ]
+        for query_type, stats in summary["by_type"].items():
+            latency = stats["latency"]
+            lines.append(
+                f"  {query_type:<10} {stats['requests']:6d} req {stats['errors']:5d} err  "
+                f"p50 {latency['p50'] * 1000:8.1f} ms  p99 {latency['p99'] * 1000:8.1f} ms"
+            )
+        lines += ["", "Latency vs throughput:", "   start(s)  offered/s  done/s  errors   p50(ms)   p99(ms)  p99.9(ms)"]
+        for window in summary["windows"]:
+            latency = window["latency"]
+            lines.append(
+                f"  {window['start']:9.1f} {window['offered_rate']:10.1f} {window['throughput']:7.1f} {window['errors']:7d}"
+                f" {latency['p50'] * 1000:9.1f} {latency['p99'] * 1000:9.1f} {latency['p99.9'] * 1000:10.1f}"
+            )
+        return "\n".join(lines)
+
+
+class LoadGenerator:
+    """
+    Open-loop load generator built on TCPClient.
+
+    A dispatcher issues requests at their scheduled times into a bounded
+    thread pool; requests never wait for earlier ones to finish, so the
+    offered load is independent of the server's response times.
+    """
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        schedule: ArrivalSchedule,
+        mix: QueryMix,
+        use_https: bool = True,
+        max_in_flight: int = 256,
+        request_timeout: float = 30.0,
+        window: float = 1.0
+    ):
+        """
+        Args:
+            host: Server hostname or IP
+            port: Server port
+            schedule: When requests are due
+            mix: Which queries to send
+            use_https: Whether to use HTTPS
+            max_in_flight: Worker threads (requests beyond this queue up, and that wait is measured)
+            request_timeout: Per-request timeout in seconds (no retries are made)
+            window: Width in seconds of the latency-vs-throughput windows
+        """
+        self.host = host
+        self.port = port
+        self.schedule = schedule
+        self.mix = mix
+        self.use_https = use_https
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.window = window
+
+        self.records: List[Dict] = []
+        self._records_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _execute(self, request_number: int, query_type: str, term: str, intended: float, intended_offset: float):
+        # Requests still queued when the run is stopped are dropped
+        if self._stop.is_set():
+            return
+        started = time.perf_counter()
+        ok = True
+        error = None
+        try:
+            client = TCPClient(self.host, self.port, use_https=self.use_https, request_number=request_number)
+            # Measure the server, not the client's retry policy
+            client.max_retries = 0
+            client.timeout = self.request_timeout
+            client.stream_read_timeout = self.request_timeout
+            client.inactivity_timeout = self.request_timeout
+
+            if query_type == "name":
+                client.get_person_by_name(term)
+            elif query_type == "exactName":
+                client.get_person_by_exact_name(term)
+            else:
+                client.get_person_by_cpf(term)
+        except Exception as e:
+            ok = False
+            error = str(e)
+
+        record = {
+            "type": query_type,
+            "intended": intended,
+            "intended_offset": intended_offset,
+            "started": started,
+            "end": time.perf_counter(),
+            "ok": ok,
+            "error": error
+        }
+        with self._records_lock:
+            self.records.append(record)
+
+    def stop(self):
+        """Stop issuing new requests (queued ones are dropped; those in flight finish)"""
+        self._stop.set()
+
+    def run(self) -> LoadReport:
+        """Run the load and return its report"""
+        protocol = "https" if self.use_https else "http"
+        # Size the shared pool for the concurrency before any client creates it
+        connection_pool.get_session(f"{protocol}://{self.host}:{self.port}", pool_size=self.max_in_flight)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        run_start = time.perf_counter()
+        request_number = 0
+
+        try:
+            for offset in self.schedule.offsets():
+                if self._stop.is_set():
+                    break
+
+                intended = run_start + offset
+                delay = intended - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+
+                request_number += 1
+                query_type, term = self.mix.choose()
+                executor.submit(self._execute, request_number, query_type, term, intended, offset)
+        except KeyboardInterrupt:
+            # Stop before shutting down, or the shutdown would wait for every queued request
+            self.stop()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        elapsed = time.perf_counter() - run_start
+        with self._records_lock:
+            records = list(self.records)
+        return LoadReport(self.schedule, records, elapsed, self.window)
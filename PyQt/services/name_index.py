@@ -0,0 +1,225 @@
+import bisect
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Query types this module can answer
+NAME_QUERY = "name"
+EXACT_NAME_QUERY = "exactName"
+
+# Seconds a cached superset may answer queries (the server's data may change)
+REFINEMENT_TTL = 300.0
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a name the way the server compares them: upper case,
+    accents folded and whitespace collapsed
+
+    Args:
+        name: Raw name
+
+    Returns:
+        Normalized name ("José  da Silva" -> "JOSE DA SILVA")
+    """
+    if not name:
+        return ""
+    if name.isascii():
+        return " ".join(name.upper().split())
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.upper().split())
+
+
+class NameIndex:
+    """
+    Token index over the results of one name search.
+
+    Partial-name queries are substring matches, so the superset for a
+    narrower query is any cached search whose term is contained in it.
+    Whole tokens strictly inside the query must appear as whole tokens in
+    the name, which lets the index narrow candidates before the final
+    substring check.
+
+    The index itself is built on the first lookup, so storing a superset
+    costs nothing on the thread that received it.
+    """
+    def __init__(self, term: str, results: List[Dict]):
+        self.term = normalize_name(term)
+        self.results = results
+        self.created_at = time.monotonic()
+
+        self.names: List[str] = []
+        # Exact normalized name -> record positions
+        self.by_name: Dict[str, List[int]] = {}
+        # Token -> record positions
+        self.by_token: Dict[str, Set[int]] = {}
+        self.sorted_tokens: List[str] = []
+
+        self._built = False
+        self._build_lock = threading.Lock()
+
+    def _build(self):
+        """Build the name and token indexes (once)"""
+        with self._build_lock:
+            if self._built:
+                return
+            self.names = [normalize_name(result.get("nome", "")) for result in self.results]
+            for position, name in enumerate(self.names):
+                self.by_name.setdefault(name, []).append(position)
+                for token in name.split(" "):
+                    self.by_token.setdefault(token, set()).add(position)
+            self.sorted_tokens = sorted(self.by_token)
+            self._built = True
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def covers(self, kind: str, term: str) -> bool:
+        """
+        Whether this superset contains every result of a query
+
+        Both partial and exact name queries only return names that contain
+        their term, so any query whose term contains this index's term is covered.
+        """
+        if kind not in (NAME_QUERY, EXACT_NAME_QUERY):
+            return False
+        return self.term in normalize_name(term)
+
+    def _candidates(self, query: str) -> Optional[Set[int]]:
+        """Positions that may match a substring query, or None to scan everything"""
+        tokens = query.split(" ")
+        candidates = None
+
+        # Middle tokens are bounded by spaces on both sides, so they are whole tokens
+        for token in tokens[1:-1]:
+            postings = self.by_token.get(token, set())
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return set()
+
+        # The last token (when preceded by a space) must start a name token
+        if len(tokens) > 1:
+            prefix = tokens[-1]
+            start = bisect.bisect_left(self.sorted_tokens, prefix)
+            prefixed = set()
+            for token in self.sorted_tokens[start:]:
+                if not token.startswith(prefix):
+                    break
+                prefixed |= self.by_token[token]
+            candidates = prefixed if candidates is None else candidates & prefixed
+
+        return candidates
+
+    def filter_name(self, term: str) -> List[Dict]:
+        """Results whose name contains the term (partial-name semantics)"""
+        self._build()
+        query = normalize_name(term)
+        candidates = self._candidates(query)
+        positions = range(len(self.names)) if candidates is None else sorted(candidates)
+        return [self.results[position] for position in positions if query in self.names[position]]
+
+    def filter_exact(self, term: str) -> List[Dict]:
+        """Results whose name equals the term (exact-name semantics)"""
+        self._build()
+        return [self.results[position] for position in self.by_name.get(normalize_name(term), [])]
+
+    def filter(self, kind: str, term: str) -> List[Dict]:
+        """Answer a query of the given kind from this superset"""
+        if kind == EXACT_NAME_QUERY:
+            return self.filter_exact(term)
+        return self.filter_name(term)
+
+
+class RefinementCache:
+    """
+    In-memory store of recent partial-name search results that answers
+    narrower name and exact-name queries locally.
+
+    A query is only answered when a cached superset provably contains all
+    of its results: the superset's term must be contained in the query
+    term, and the superset must not have been cut off by the server's
+    result limit (when one is configured). Supersets expire after `ttl`
+    seconds.
+    """
+    def __init__(self, max_entries: int = 32, server_result_limit: Optional[int] = None, ttl: float = REFINEMENT_TTL):
+        """
+        Args:
+            max_entries: Number of supersets kept (least recently used are dropped)
+            server_result_limit: Maximum results the server returns per search, if it truncates
+            ttl: Seconds a superset may answer queries
+        """
+        self.max_entries = max_entries
+        self.server_result_limit = server_result_limit
+        self.ttl = ttl
+        self._indexes: "OrderedDict[Tuple[str, str], NameIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, server: str, term: str, results: List[Dict]) -> bool:
+        """
+        Store the results of a partial-name search
+
+        Args:
+            server: Server identifier (host:port)
+            term: Search term
+            results: Results of a search whose stream ended with its completion object
+
+        Returns:
+            True if the results were stored as a usable superset
+        """
+        if self.server_result_limit is not None and len(results) >= self.server_result_limit:
+            # Possibly truncated: not a safe superset
+            return False
+
+        index = NameIndex(term, results)
+        with self._lock:
+            key = (server, index.term)
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+        # Build the index in the background so the first refinement is instant
+        build_thread = threading.Thread(target=index._build)
+        build_thread.daemon = True
+        build_thread.start()
+        return True
+
+    def find_superset(self, server: str, kind: str, term: str) -> Optional[NameIndex]:
+        """
+        Find the smallest cached superset that covers a query
+
+        Returns:
+            The covering index, or None when the query must go to the server
+        """
+        best = None
+        with self._lock:
+            expired_before = time.monotonic() - self.ttl
+            for key in [key for key, index in self._indexes.items() if index.created_at < expired_before]:
+                del self._indexes[key]
+            for (index_server, _), index in self._indexes.items():
+                if index_server == server and index.covers(kind, term):
+                    if best is None or len(index) < len(best):
+                        best = index
+            if best is not None:
+                self._indexes.move_to_end((server, best.term))
+        return best
+
+    def refine(self, server: str, kind: str, term: str) -> Optional[List[Dict]]:
+        """
+        Answer a query locally if possible
+
+        Returns:
+            The filtered results, or None when no cached superset covers the query
+        """
+        index = self.find_superset(server, kind, term)
+        if index is None:
+            return None
+        return index.filter(kind, term)
+
+    def clear(self):
+        """Drop every cached superset"""
+        with self._lock:
+            self._indexes.clear()
@@ -0,0 +1,225 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from . import json_backend
+
+# Environment variable that overrides the cache location
+CACHE_PATH_ENV_VAR = "CPF_CACHE_PATH"
+
+# CPF results are stable for days
+DEFAULT_TTL = 3 * 24 * 60 * 60
+
+# Size ceiling for stored values before old entries are evicted
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# How many writes happen between size checks
+EVICTION_CHECK_INTERVAL = 100
+
+# Threads running cache work for callers that must not wait on the disk
+BACKGROUND_THREADS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);
+"""
+
+
+def default_cache_path() -> Path:
+    """Return the cache file location (overridable with CPF_CACHE_PATH)"""
+    override = os.environ.get(CACHE_PATH_ENV_VAR)
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "consulta-cpf" / "lookups.sqlite3"
+
+
+class PersistentCache:
+    """
+    SQLite-backed cache of query results that survives restarts.
+
+    Every thread gets its own connection; WAL mode lets the executor threads
+    write concurrently with readers. Entries expire after `ttl` seconds and
+    the least recently used ones are evicted once the stored values exceed
+    `max_bytes`.
+    """
+    def __init__(self, path: Optional[Path] = None, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path) if path else default_cache_path()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+
+        # Counters for reporting
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a fresh entry
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value FROM entries WHERE key = ? AND created_at >= ?",
+            (key, now - self.ttl)
+        ).fetchone()
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            connection.commit()
+        except sqlite3.OperationalError:
+            # Access time is best effort; a busy database must not fail the lookup
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return json_backend.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        data = json_backend.dumps(value)
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now)
+        )
+        connection.commit()
+
+        with self._lock:
+            self._writes_since_check += 1
+            should_check = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+            if should_check:
+                self._writes_since_check = 0
+        if should_check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until under max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        connection = self._connection()
+        removed = connection.execute(
+            "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            # Walk entries from least recently used, collecting enough to get under the ceiling
+            excess = total - self.max_bytes
+            keys = []
+            for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+            removed += len(keys)
+
+        connection.commit()
+        return removed
+
+    def clear(self):
+        """Remove every entry"""
+        connection = self._connection()
+        connection.execute("DELETE FROM entries")
+        connection.commit()
+
+    def stats(self) -> Dict:
+        """Return entry count, stored bytes and hit/miss counters"""
+        count, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+# Shared caches, one per file
+_caches: Dict[str, PersistentCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path: Optional[Path] = None) -> PersistentCache:
+    """
+    Get the shared cache for a file, opening it on first use
+
+    Args:
+        path: Cache file, or None for the default location
+
+    Returns:
+        The shared PersistentCache instance
+    """
+    resolved = str(Path(path) if path else default_cache_path())
+    with _caches_lock:
+        cache = _caches.get(resolved)
+        if cache is None:
+            cache = PersistentCache(Path(resolved))
+            _caches[resolved] = cache
+        return cache
+
+
+_background: Optional[ThreadPoolExecutor] = None
+
+
+def submit(function: Callable, *args) -> Future:
+    """
+    Run cache work (opening the cache, lookups, stores) on a shared
+    background thread, for callers such as the GUI thread or the
+    non-blocking I/O thread that must not wait on the disk
+
+    Args:
+        function: Work to run; it handles its own errors
+        args: Arguments for the function
+    """
+    global _background
+    with _caches_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=BACKGROUND_THREADS, thread_name_prefix="cache-io")
+    return _background.submit(function, *args)
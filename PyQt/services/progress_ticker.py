@@ -0,0 +1,132 @@
+import time
+import threading
+from typing import Dict, Optional
+
+from .query_history import LatencyHistogram
+
+# Seconds between progress estimates
+TICK_INTERVAL = 0.1
+
+# Estimated progress never goes past this before the result arrives
+MAX_ESTIMATED_PROGRESS = 95
+
+# Queries are expected to take this percentile of the observed response times
+EXPECTED_PERCENTILE = 90
+
+# Until this many responses were observed, queries are expected to take DEFAULT_ESTIMATE seconds
+MIN_OBSERVED_RESPONSES = 10
+DEFAULT_ESTIMATE = 5.0
+
+
+def cpf_progress_update(progress: float) -> Dict:
+    """Progress update for a CPF lookup, which reports no progress of its own"""
+    if progress < 25:
+        status = "Iniciando consulta"
+        message = "Conectando ao servidor"
+    elif progress < 50:
+        status = "Consultando"
+        message = "Processando solicitação"
+    elif progress < 75:
+        status = "Analisando"
+        message = "Formatando resultados"
+    else:
+        status = "Finalizando"
+        message = "Preparando resposta"
+    return {"progress": progress, "status": status, "message": message}
+
+
+class ProgressTicker:
+    """
+    Estimated progress for queries whose responses report none (CPF lookups).
+
+    One thread serves every such query: every TICK_INTERVAL it estimates
+    each running query's progress from its elapsed time, as a share of the
+    EXPECTED_PERCENTILE of the response times observed so far (or of
+    DEFAULT_ESTIMATE before enough were observed), and puts an update on
+    the result queue when the whole-percent value changed.
+
+    A query stops ticking as soon as stop() is called for it, and the
+    thread sleeps without waking up while no query is running.
+    """
+    def __init__(self, result_queue, interval: float = TICK_INTERVAL):
+        """
+        Args:
+            result_queue: Queue receiving {"type": "progress", ...} messages
+            interval: Seconds between estimates
+        """
+        self.result_queue = result_queue
+        self.interval = interval
+        # Time to a successful response, over the whole session
+        self.latency = LatencyHistogram()
+
+        # Query ID -> [start time, last whole percent sent]
+        self.running: Dict[str, list] = {}
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, query_id: str):
+        """Begin estimating the progress of a query that was just dispatched"""
+        with self.condition:
+            if self.closed:
+                return
+            self.running[query_id] = [time.monotonic(), 0]
+            self._send(query_id, 0)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="progress-ticker", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def stop(self, query_id: str, succeeded: bool = False):
+        """
+        Stop estimating a query's progress (no update for it is queued after this returns)
+
+        Args:
+            query_id: Query ID
+            succeeded: The server answered; its response time joins the observed latencies
+        """
+        with self.condition:
+            entry = self.running.pop(query_id, None)
+            if entry is not None and succeeded:
+                self.latency.add(time.monotonic() - entry[0])
+
+    def expected_duration(self) -> float:
+        """Seconds a query is expected to take"""
+        if self.latency.count < MIN_OBSERVED_RESPONSES:
+            return DEFAULT_ESTIMATE
+        return max(self.latency.percentile(EXPECTED_PERCENTILE), self.interval)
+
+    def estimate(self, elapsed: float, expected: Optional[float] = None) -> float:
+        """Progress (0 to MAX_ESTIMATED_PROGRESS) of a query running for `elapsed` seconds"""
+        expected = expected or self.expected_duration()
+        return min(MAX_ESTIMATED_PROGRESS, elapsed / expected * 100)
+
+    def close(self):
+        """Stop the thread; later start() calls are ignored"""
+        with self.condition:
+            self.closed = True
+            self.running.clear()
+            self.condition.notify()
+
+    def _send(self, query_id: str, progress: float):
+        self.result_queue.put({
+            "type": "progress",
+            "query_id": query_id,
+            "update": cpf_progress_update(progress)
+        })
+
+    def _run(self):
+        with self.condition:
+            while not self.closed:
+                if not self.running:
+                    self.condition.wait()
+                    continue
+                now = time.monotonic()
+                expected = self.expected_duration()
+                for query_id, entry in self.running.items():
+                    progress = self.estimate(now - entry[0], expected)
+                    if int(progress) > entry[1]:
+                        entry[1] = int(progress)
+                        self._send(query_id, progress)
+                # Also wakes up for start() and close()
+                self.condition.wait(self.interval)
@@ -0,0 +1,111 @@
+import math
+import os
+from typing import Dict, Optional
+
+# Environment variable that overrides how many rows each history table keeps
+HISTORY_DEPTH_ENV_VAR = "CPF_HISTORY_ROWS"
+
+# Rows kept per table before the oldest finished ones are evicted
+DEFAULT_HISTORY_DEPTH = 1000
+
+# Outcomes of a finished query or batch
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+OUTCOMES = (COMPLETED, FAILED, CANCELLED)
+
+
+def default_history_depth() -> int:
+    """Return the rows kept per history table (overridable with CPF_HISTORY_ROWS)"""
+    override = os.environ.get(HISTORY_DEPTH_ENV_VAR)
+    if override:
+        try:
+            depth = int(override)
+            if depth > 0:
+                return depth
+        except ValueError:
+            pass
+        print(f"Invalid {HISTORY_DEPTH_ENV_VAR}={override!r}, using the default")
+    return DEFAULT_HISTORY_DEPTH
+
+
+class LatencyHistogram:
+    """
+    Latencies in logarithmic buckets.
+
+    Memory is constant however many values are added (a few hundred
+    buckets cover a millisecond to a week), and percentiles are within
+    half a bucket (about 2.5%) of the exact value.
+    """
+    # Each bucket is this much wider than the previous one
+    GROWTH = 1.05
+    # Values below this (in seconds) share the first bucket
+    RESOLUTION = 0.001
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, seconds: float):
+        seconds = max(0.0, seconds)
+        bucket = int(math.log(max(seconds, self.RESOLUTION) / self.RESOLUTION, self.GROWTH))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = seconds if self.maximum is None else max(self.maximum, seconds)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Approximate latency below which `percent` of the values fall
+
+        Args:
+            percent: 0 to 100
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Geometric middle of the bucket, never outside the observed range
+                value = self.RESOLUTION * self.GROWTH ** (bucket + 0.5)
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+
+class HistoryStats:
+    """
+    Running totals of finished queries (or batches), kept after their rows
+    are evicted from a bounded history
+    """
+    def __init__(self):
+        self.counts: Dict[str, int] = {outcome: 0 for outcome in OUTCOMES}
+        # Time to completion or failure (a cancellation's time says nothing about the server)
+        self.latency = LatencyHistogram()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def record(self, outcome: str, seconds: float):
+        """
+        Add a finished query
+
+        Args:
+            outcome: COMPLETED, FAILED or CANCELLED
+            seconds: Time from submission to the outcome
+        """
+        if outcome not in self.counts:
+            raise ValueError(f"Unknown outcome: {outcome}")
+        self.counts[outcome] += 1
+        if outcome != CANCELLED:
+            self.latency.add(seconds)
@@ -0,0 +1,192 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Window used to report the observed dispatch rate
+RATE_WINDOW = 10.0
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+
+    The balance may go negative when usage is only known afterwards (e.g.
+    response bytes); the bucket then refuses work until it refills.
+    """
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """
+        Take tokens if available
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds to wait
+        """
+        wait = self.wait_time(amount)
+        if wait == 0.0:
+            self.tokens -= amount
+        return wait
+
+    def consume(self, amount: float):
+        """Debit tokens after the fact (the balance may go negative)"""
+        self._refill(time.monotonic())
+        self.tokens -= amount
+
+
+class EndpointRateLimiter:
+    """
+    Per-endpoint rate limits consulted by the scheduler before dispatch.
+
+    Each endpoint (server and query type) can limit requests per second
+    and, optionally, response bytes per second. Queries that would exceed
+    a limit stay queued instead of occupying a worker slot.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Configured limits: endpoint kind (or None for the default) -> settings
+        self._limits: Dict[Optional[str], Dict] = {}
+        # Live buckets: endpoint -> (request bucket, byte bucket)
+        self._buckets: Dict[str, Dict[str, Optional[TokenBucket]]] = {}
+        # Dispatch timestamps and byte counts for reporting
+        self._dispatches: Dict[str, deque] = {}
+        self._bytes: Dict[str, deque] = {}
+
+    def configure(
+        self,
+        kind: Optional[str] = None,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        bytes_per_second: Optional[float] = None
+    ):
+        """
+        Set the limits of an endpoint kind
+
+        Args:
+            kind: Query type ("name", "exactName", "cpf"), or None for the default of every kind
+            requests_per_second: Maximum dispatch rate (None for unlimited)
+            burst: Requests allowed at once after an idle period (defaults to one second's worth)
+            bytes_per_second: Maximum response bytes per second (None for unlimited)
+        """
+        with self._lock:
+            if requests_per_second is None and bytes_per_second is None:
+                self._limits.pop(kind, None)
+            else:
+                self._limits[kind] = {
+                    "requests_per_second": requests_per_second,
+                    "burst": burst,
+                    "bytes_per_second": bytes_per_second
+                }
+            # Rebuild buckets with the new settings
+            self._buckets.clear()
+
+    def _get_buckets(self, endpoint: str, kind: str) -> Dict[str, Optional[TokenBucket]]:
+        buckets = self._buckets.get(endpoint)
+        if buckets is None:
+            limits = self._limits.get(kind) or self._limits.get(None) or {}
+            requests_per_second = limits.get("requests_per_second")
+            bytes_per_second = limits.get("bytes_per_second")
+            buckets = {
+                "requests": TokenBucket(requests_per_second, limits.get("burst")) if requests_per_second else None,
+                # Allow one second's worth of bytes in a burst
+                "bytes": TokenBucket(bytes_per_second, bytes_per_second) if bytes_per_second else None
+            }
+            self._buckets[endpoint] = buckets
+        return buckets
+
+    def reserve(self, endpoint: str, kind: str) -> float:
+        """
+        Ask to dispatch one request
+
+        Args:
+            endpoint: Endpoint identifier (server and query type)
+            kind: Query type, used to pick the configured limits
+
+        Returns:
+            0 if the request may go now (its token is taken), otherwise the seconds to wait
+        """
+        with self._lock:
+            buckets = self._get_buckets(endpoint, kind)
+
+            byte_bucket = buckets["bytes"]
+            if byte_bucket is not None:
+                # Bytes are debited afterwards, so only require a non-negative balance
+                byte_wait = byte_bucket.wait_time(0.0)
+                if byte_wait > 0:
+                    return byte_wait
+
+            request_bucket = buckets["requests"]
+            if request_bucket is not None:
+                wait = request_bucket.try_acquire()
+                if wait > 0:
+                    return wait
+
+            now = time.monotonic()
+            self._dispatches.setdefault(endpoint, deque()).append(now)
+            self._prune(endpoint, now)
+            return 0.0
+
+    def record_bytes(self, endpoint: str, kind: str, size: int):
+        """Debit the bytes of a finished response"""
+        with self._lock:
+            buckets = self._get_buckets(endpoint, kind)
+            if buckets["bytes"] is not None:
+                buckets["bytes"].consume(size)
+            now = time.monotonic()
+            self._bytes.setdefault(endpoint, deque()).append((now, size))
+            self._prune(endpoint, now)
+
+    def _prune(self, endpoint: str, now: float):
+        """Forget an endpoint's samples older than the reporting window"""
+        dispatches = self._dispatches.get(endpoint)
+        while dispatches and now - dispatches[0] > RATE_WINDOW:
+            dispatches.popleft()
+        sizes = self._bytes.get(endpoint)
+        while sizes and now - sizes[0][0] > RATE_WINDOW:
+            sizes.popleft()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Current state of every endpoint
+
+        Returns:
+            endpoint -> {"rate": requests/s over the last window, "bytes_rate": bytes/s,
+            "wait": seconds until the next request may go}
+        """
+        now = time.monotonic()
+        report = {}
+        with self._lock:
+            for endpoint in set(self._dispatches) | set(self._bytes):
+                self._prune(endpoint, now)
+                dispatches = self._dispatches.get(endpoint, deque())
+                sizes = self._bytes.get(endpoint, deque())
+
+                wait = 0.0
+                buckets = self._buckets.get(endpoint)
+                if buckets:
+                    if buckets["requests"] is not None:
+                        wait = max(wait, buckets["requests"].wait_time())
+                    if buckets["bytes"] is not None:
+                        wait = max(wait, buckets["bytes"].wait_time(0.0))
+
+                report[endpoint] = {
+                    "rate": len(dispatches) / RATE_WINDOW,
+                    "bytes_rate": sum(size for _, size in sizes) / RATE_WINDOW,
+                    "wait": wait
+                }
+        return report
@@ -0,0 +1,212 @@
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .name_index import normalize_name
+
+# Columns of the results table, in display order
+COLUMNS = ("cpf", "nome", "sexo", "nasc")
+
+# Sort key of a missing or malformed CPF / birth date (sorts first)
+MISSING_KEY = -1
+
+# Rows sorted per call. A sort holds the GIL from start to end, so large
+# columns are sorted in slices of this size and the presorted runs merged in
+# Python (heapq.merge), which lets the GUI thread run between rows; the
+# longest pause is then one slice sort (about 30 ms), not the whole column.
+SORT_SLICE = 65536
+
+
+def cpf_key(cpf: str) -> int:
+    """CPF as an integer ("123.456.789-09" -> 12345678909), or MISSING_KEY"""
+    digits = (cpf or "").replace(".", "").replace("-", "").strip()
+    return int(digits) if digits.isdigit() else MISSING_KEY
+
+
+def date_key(nasc: str) -> int:
+    """
+    Birth date as a sortable integer (YYYYMMDD), or MISSING_KEY
+
+    Accepts the server's DD/MM/YYYY and ISO YYYY-MM-DD.
+    """
+    nasc = (nasc or "").strip()
+    if len(nasc) == 10:
+        if nasc[2] == "/" and nasc[5] == "/":
+            digits = nasc[6:] + nasc[3:5] + nasc[:2]
+        elif nasc[4] == "-" and nasc[7] == "-":
+            digits = nasc[:4] + nasc[5:7] + nasc[8:]
+        else:
+            return MISSING_KEY
+        if digits.isdigit():
+            return int(digits)
+    return MISSING_KEY
+
+
+def _memoized(function):
+    """Wrap a one-argument function with an unbounded cache (for one key build)"""
+    cache = {}
+
+    def cached(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = function(value)
+            return result
+
+    return cached
+
+
+class ResultKeys:
+    """
+    Sort and filter keys of a result set, computed once per column.
+
+    CPFs and birth dates are kept as machine integers in arrays, names
+    accent-folded and upper-cased, so sorting and filtering never parse a
+    record again.
+    """
+    def __init__(self, results: Iterable[Dict]):
+        # Names and birth dates repeat a lot, so each distinct value is parsed once
+        fold_name = _memoized(normalize_name)
+        parse_date = _memoized(date_key)
+
+        self.cpf = array("q")
+        self.nome: List[str] = []
+        self.sexo: List[str] = []
+        self.nasc = array("l")
+
+        # One pass, so results read from disk (a spilled batch) are decoded once
+        for result in results:
+            self.cpf.append(cpf_key(result.get("cpf", "")))
+            self.nome.append(fold_name(result.get("nome", "")))
+            self.sexo.append((result.get("sexo") or "").strip().upper())
+            self.nasc.append(parse_date(result.get("nasc", "")))
+        self.count = len(self.cpf)
+
+        # Column -> rows in ascending order, built on first use
+        self._orders: Dict[str, array] = {}
+
+    def column(self, name: str) -> Sequence:
+        """Key column by name (one of COLUMNS)"""
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column: {name}")
+        return getattr(self, name)
+
+    def order(self, name: str) -> array:
+        """
+        Rows sorted by a column, ascending and stable (computed once per column)
+
+        Every later view of the column, descending or filtered, is read off
+        this permutation without sorting again.
+        """
+        order = self._orders.get(name)
+        if order is None:
+            key = self.column(name).__getitem__
+            runs = [
+                sorted(range(start, min(start + SORT_SLICE, self.count)), key=key)
+                for start in range(0, self.count, SORT_SLICE)
+            ]
+            # Ties come out of the earlier run first, and earlier runs hold the
+            # lower rows, so the merge stays stable
+            rows = runs[0] if len(runs) == 1 else heapq.merge(*runs, key=key)
+            order = self._orders[name] = array("l", rows)
+        return order
+
+
+class ResultFilter:
+    """
+    Row filter for a result set; empty criteria match everything
+
+    Args:
+        cpf: Digits the CPF starts with (punctuation is ignored)
+        nome: Text contained in the name (case and accents are ignored)
+        sexo: "M" or "F"
+        nasc_from: Earliest birth date (DD/MM/YYYY or a year)
+        nasc_to: Latest birth date (DD/MM/YYYY or a year)
+    """
+    def __init__(
+        self,
+        cpf: str = "",
+        nome: str = "",
+        sexo: str = "",
+        nasc_from: str = "",
+        nasc_to: str = ""
+    ):
+        self.cpf = "".join(filter(str.isdigit, cpf or ""))
+        self.nome = normalize_name(nome)
+        self.sexo = (sexo or "").strip().upper()
+        self.nasc_from = self._date_bound(nasc_from, start=True)
+        self.nasc_to = self._date_bound(nasc_to, start=False)
+
+    @staticmethod
+    def _date_bound(text: str, start: bool) -> Optional[int]:
+        text = (text or "").strip()
+        if not text:
+            return None
+        if len(text) == 4 and text.isdigit():
+            # A year covers all of it
+            return int(text + ("0101" if start else "1231"))
+        key = date_key(text)
+        if key == MISSING_KEY:
+            raise ValueError(f"Data inválida: {text}")
+        return key
+
+    @property
+    def empty(self) -> bool:
+        return not (self.cpf or self.nome or self.sexo) and self.nasc_from is None and self.nasc_to is None
+
+    def apply(self, keys: ResultKeys, rows: Iterable[int]) -> array:
+        """
+        Keep the rows that match, preserving their order
+
+        Args:
+            keys: Keys of the result set
+            rows: Row numbers to filter (e.g. an existing sort order)
+
+        Returns:
+            Matching row numbers
+        """
+        rows = array("l", rows)
+        if self.sexo:
+            sexo, wanted = keys.sexo, self.sexo
+            rows = array("l", [row for row in rows if sexo[row] == wanted])
+        if self.nasc_from is not None or self.nasc_to is not None:
+            nasc = keys.nasc
+            low = self.nasc_from if self.nasc_from is not None else 0
+            high = self.nasc_to if self.nasc_to is not None else 99999999
+            rows = array("l", [row for row in rows if low <= nasc[row] <= high])
+        if self.cpf:
+            # Prefix of the 11-digit CPF, compared on the integer key
+            width = 10 ** (11 - min(len(self.cpf), 11))
+            prefix = int(self.cpf[:11])
+            cpf = keys.cpf
+            rows = array("l", [row for row in rows if cpf[row] >= 0 and cpf[row] // width == prefix])
+        if self.nome:
+            nome, needle = keys.nome, self.nome
+            rows = array("l", [row for row in rows if needle in nome[row]])
+        return rows
+
+
+def view_order(
+    keys: ResultKeys,
+    column: Optional[str] = None,
+    descending: bool = False,
+    row_filter: Optional[ResultFilter] = None
+) -> array:
+    """
+    Rows to display
+
+    Args:
+        keys: Keys of the result set
+        column: Column to sort by (one of COLUMNS), or None for the received order
+        descending: Reverse the order
+        row_filter: Rows to keep (filtering preserves the sorted order)
+
+    Returns:
+        Row numbers in display order
+    """
+    order = keys.order(column) if column is not None else range(keys.count)
+    if descending:
+        order = order[::-1]
+    if row_filter is not None and not row_filter.empty:
+        return row_filter.apply(keys, order)
+    return array("l", order)
@@ -0,0 +1,217 @@
+import os
+import time
+import base64
+import itertools
+import threading
+import urllib.parse
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+from . import json_backend
+
+# Environment variable naming a directory where every response is recorded
+RECORD_DIR_ENV_VAR = "CPF_RECORD_DIR"
+
+# Fixture format version (first line of every recording)
+FORMAT_VERSION = 1
+
+# Response headers kept in recordings (what the client's decoding depends on)
+RECORDED_HEADERS = ("content-type", "content-encoding", "transfer-encoding")
+
+# Distinguishes recordings saved within the same millisecond
+_sequence = itertools.count(1)
+
+
+def recording_directory() -> Optional[str]:
+    """Directory to record responses into (CPF_RECORD_DIR), or None when recording is off"""
+    return os.environ.get(RECORD_DIR_ENV_VAR) or None
+
+
+class StreamRecording:
+    """
+    A response body as it arrived: the raw (still compressed) pieces
+    returned by each read, with the time each was received.
+
+    Saved as JSON lines: a header object (request path, status, headers),
+    then one {"t": seconds since the headers, "data": base64} object per
+    piece. The piece boundaries are the ones the client saw, so replaying
+    them reproduces the framing and decompression work of the original
+    transfer.
+    """
+    def __init__(self, path: str, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.status = status
+        self.headers = {
+            name.lower(): value for name, value in (headers or {}).items()
+            if name.lower() in RECORDED_HEADERS
+        }
+        self.started = time.time()
+        self.chunks: List[Tuple[float, bytes]] = []
+        # False when the body was cut short (cancelled, timed out, connection lost)
+        self.complete = True
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for _, data in self.chunks)
+
+    @property
+    def duration(self) -> float:
+        return self.chunks[-1][0] if self.chunks else 0.0
+
+    def add(self, data: bytes):
+        """Record a piece of the raw body"""
+        self.chunks.append((time.time() - self.started, bytes(data)))
+
+    def save(self, directory: str) -> str:
+        """
+        Write the recording to a new file in a directory
+
+        Returns:
+            Path of the file
+        """
+        os.makedirs(directory, exist_ok=True)
+        slug = "".join(c if c.isalnum() else "-" for c in self.path.strip("/"))[:60]
+        name = f"{int(self.started * 1000)}-{next(_sequence)}-{slug}.stream.jsonl"
+        file_path = os.path.join(directory, name)
+        header = {
+            "version": FORMAT_VERSION,
+            "path": self.path,
+            "status": self.status,
+            "headers": self.headers,
+            "recorded_at": self.started,
+            "complete": self.complete,
+            "chunks": len(self.chunks),
+            "bytes": self.size
+        }
+        with open(file_path, "w", encoding="ascii") as file:
+            file.write(json_backend.dumps(header).decode("ascii") + "\n")
+            for offset, data in self.chunks:
+                line = {"t": round(offset, 6), "data": base64.b64encode(data).decode("ascii")}
+                file.write(json_backend.dumps(line).decode("ascii") + "\n")
+        return file_path
+
+    @classmethod
+    def load(cls, file_path: str) -> "StreamRecording":
+        """Read a recording saved by save()"""
+        with open(file_path, "rb") as file:
+            header = json_backend.loads(file.readline())
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported recording version in {file_path}: {header.get('version')}")
+            recording = cls(header["path"], header["status"], header["headers"])
+            recording.started = header["recorded_at"]
+            recording.complete = header["complete"]
+            for line in file:
+                if line.strip():
+                    piece = json_backend.loads(line)
+                    recording.chunks.append((piece["t"], base64.b64decode(piece["data"])))
+        return recording
+
+
+def load_recordings(paths: Sequence[str]) -> List[StreamRecording]:
+    """Load recordings from files and directories (every *.stream.jsonl inside, in name order)"""
+    recordings = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.endswith(".stream.jsonl"))
+            recordings.extend(StreamRecording.load(os.path.join(path, name)) for name in names)
+        else:
+            recordings.append(StreamRecording.load(path))
+    return recordings
+
+
+class ReplayRaw:
+    """
+    Stand-in for urllib3's raw response: returns the recorded pieces,
+    waiting for each one's original arrival time divided by `speed`
+    """
+    def __init__(self, recording: StreamRecording, speed: float):
+        self.recording = recording
+        self.speed = speed
+        self.started = time.monotonic()
+        self.index = 0
+        # Unread part of the current piece (reads smaller than a piece split it)
+        self.pending = memoryview(b"")
+        self.closed = threading.Event()
+
+    def _next_piece(self) -> bool:
+        if self.index >= len(self.recording.chunks):
+            return False
+        offset, data = self.recording.chunks[self.index]
+        self.index += 1
+        if self.speed > 0:
+            wait = offset / self.speed - (time.monotonic() - self.started)
+            if wait > 0 and self.closed.wait(wait):
+                return False
+        self.pending = memoryview(data)
+        return True
+
+    def read1(self, amount: int = -1, decode_content: bool = False) -> bytes:
+        """Return what has "arrived": the rest of the current piece, up to `amount` bytes"""
+        if self.closed.is_set() or (not self.pending and not self._next_piece()):
+            return b""
+        if amount is None or amount < 0:
+            amount = len(self.pending)
+        data = bytes(self.pending[:amount])
+        self.pending = self.pending[amount:]
+        return data
+
+    def stream(self, amount: int = 65536, decode_content: bool = False) -> Iterator[bytes]:
+        while True:
+            data = self.read1(amount)
+            if not data:
+                return
+            yield data
+
+    def close(self):
+        self.closed.set()
+
+
+class ReplayResponse:
+    """Stand-in for a requests.Response opened with stream=True"""
+    def __init__(self, url: str, recording: StreamRecording, speed: float):
+        self.url = url
+        self.status_code = recording.status
+        self.reason = "OK" if recording.status < 400 else "Recorded error"
+        self.headers = requests.structures.CaseInsensitiveDict(recording.headers)
+        self.raw = ReplayRaw(recording, speed)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} {self.reason} for url: {self.url}", response=self)
+
+    def close(self):
+        self.raw.close()
+
+
+class ReplaySession:
+    """
+    Stand-in for the client's requests session that answers from recordings
+
+    Assign it to a TCPClient's `session` (blocking transport) to run the
+    client's whole response pipeline (decompression, stream framing,
+    progress, results) on recorded traffic without a server. Requests are
+    matched on their path; several recordings of one path are used in turn.
+
+    Args:
+        recordings: Recordings to answer with
+        speed: 1.0 replays at the recorded pace, 10.0 ten times faster,
+            0 without waiting at all
+    """
+    def __init__(self, recordings: Sequence[StreamRecording], speed: float = 1.0):
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.by_path: Dict[str, List[StreamRecording]] = {}
+        self.next_index: Dict[str, int] = {}
+        for recording in recordings:
+            self.by_path.setdefault(recording.path, []).append(recording)
+
+    def get(self, url: str, **kwargs) -> ReplayResponse:
+        path = urllib.parse.urlsplit(url).path
+        with self.lock:
+            candidates = self.by_path.get(path)
+            if not candidates:
+                raise requests.ConnectionError(f"No recording for {path}")
+            index = self.next_index.get(path, 0)
+            self.next_index[path] = index + 1
+        return ReplayResponse(url, candidates[index % len(candidates)], self.speed)
@@ -1,6 +1,6 @@
 import os
-import json
 import time
+import zlib
 import requests
 import urllib3
 import urllib.parse
@@ -8,14 +8,29 @@ import ssl
 from pathlib import Path
 from typing import Dict, List, Optional, Callable, Any, Union
 import socket
+import sqlite3
 import threading
 import selectors
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from . import json_backend
+from . import connection_pool
+from .content_encoding import StreamDecompressor, accept_encoding
+from .json_stream import JSONObjectFramer
+from .cpf_preflight import is_valid_cpf
+from .cancellation import CancellationToken, QueryCancelled
+from .deadline import Deadline, DeadlineExceeded
+from . import persistent_cache
+from .persistent_cache import PersistentCache
+from .stream_recording import StreamRecording, recording_directory
+from . import http_core
 
 # Disable insecure request warnings for development
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Available transports: blocking `requests` calls, the shared non-blocking selectors core,
+# or that core multiplexing requests over HTTP/2 (falls back to HTTP/1.1 when not negotiated)
+TRANSPORTS = ("requests", "selectors", "h2")
+
 class TimeoutSession(requests.Session):
     """
     Custom requests Session that resets read timeout when data is received.
@@ -35,6 +50,46 @@ class TimeoutSession(requests.Session):
         """Check if the session has timed out"""
         return (time.time() - self.last_activity) > self.timeout
 
+# Read sizes of a blocking name-search stream, in raw bytes
+STREAM_READ_MIN = 512
+STREAM_READ_MAX = 256 * 1024
+
+class StreamState:
+    """
+    Parsing and progress state of one name-search stream attempt
+    """
+    def __init__(self):
+        now = time.time()
+        self.start_time = now
+        self.framer = JSONObjectFramer()  # Splits the raw bytes into JSON documents
+        self.results = []
+        self.completed = False
+        self.last_data_time = now  # Time of last data received
+        self.last_progress_time = now
+        self.last_progress_reported = 0
+
+class AdaptiveReadSize:
+    """
+    Read size of one name-search stream.
+    
+    Stays small between documents, so each progress message is handled as
+    soon as it arrives, and doubles while reads come back full in the middle
+    of a document (the bulk results), so a multi-megabyte payload takes a
+    handful of loop iterations instead of thousands.
+    """
+    def __init__(self, framer: JSONObjectFramer, minimum: int = STREAM_READ_MIN, maximum: int = STREAM_READ_MAX):
+        self.framer = framer
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.size = minimum
+    
+    def update(self, received: int) -> None:
+        """Pick the next read size after a read returned `received` bytes (and was parsed)"""
+        if not self.framer.in_object:
+            self.size = self.minimum
+        elif received >= self.size:
+            self.size = min(self.size * 2, self.maximum)
+
 class TCPClient:
     def __init__(
         self, 
@@ -42,7 +97,12 @@ class TCPClient:
         port: int, 
         use_https: bool = True, 
         request_number: int = 1,
-        on_progress_update: Optional[Callable[[Dict], None]] = None
+        on_progress_update: Optional[Callable[[Dict], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        deadline: Optional[Deadline] = None,
+        cache: Optional[PersistentCache] = None,
+        cache_name_queries: bool = False,
+        transport: str = "requests"
     ):
         """
         Initialize TCP Client with connection parameters
@@ -53,20 +113,68 @@ class TCPClient:
             use_https: Whether to use HTTPS (default True)
             request_number: Request ID for tracking
             on_progress_update: Callback function for progress updates
+            cancel_token: Token that aborts the request (open responses and retry waits) when cancelled
+            deadline: Time budget shared by every attempt; attempt timeouts are derived from it
+            cache: Persistent cache for CPF lookups (None disables caching)
+            cache_name_queries: Whether name searches also go through the cache
+            transport: "requests" (blocking, default), "selectors" (shared non-blocking I/O thread)
+                or "h2" (like "selectors", multiplexed over one HTTP/2 connection when the server supports it)
         """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        
         # Setup base URL
         protocol = "https" if use_https else "http"
         self.base_url = f"{protocol}://{host}:{port}"
+        self.host = host
+        self.port = port
+        self.use_https = use_https
+        self.transport = transport
         
         # Configuration
         self.request_number = request_number
         self.on_progress_update = on_progress_update
+        self.cancel_token = cancel_token or CancellationToken()
+        self.deadline = deadline or Deadline()
+        self.cache = cache
+        self.cache_name_queries = cache_name_queries
         self.max_retries = 3
         self.retry_delay = 240
         self.timeout = 240 
         
+        # Stream timeouts (each one is further capped by the deadline)
+        self.stream_connect_timeout = 5.0
+        self.stream_read_timeout = 90.0
+        self.inactivity_timeout = 60.0
+        
+        # Bounds of the adaptive read size of blocking streams
+        self.stream_read_min = STREAM_READ_MIN
+        self.stream_read_max = STREAM_READ_MAX
+        
+        # Transfer statistics (compression ratio, CPU cost) of the last response
+        self.last_transfer_stats = None
+        
+        # Whether the last results were a whole answer: a stream that ended with its
+        # completion object, a CPF response with results, or a cache hit
+        self.last_response_complete = False
+        
+        # Directory where raw responses are recorded for offline replay (CPF_RECORD_DIR), or None
+        self.record_dir = recording_directory()
+        
         # Set up SSL context with our certificates
         self.cert_path = self._get_ssl_cert_path()
+        
+        # Shared session: pooled (possibly pre-warmed) connections with TLS session reuse
+        self.session = connection_pool.get_session(self.base_url)
+    
+    def prewarm(self, connections: int):
+        """
+        Open pooled connections to the server in the background
+        
+        Args:
+            connections: Number of connections to open
+        """
+        return connection_pool.prewarm(self.base_url, connections)
     
     def _get_ssl_cert_path(self) -> tuple:
         """Get path to SSL certificates"""
@@ -82,13 +190,17 @@ class TCPClient:
         return (str(cert_path), str(key_path))
     
     def format_cpf(self, cpf: str) -> str:
-        """Format CPF by removing non-numeric characters"""
+        """Format CPF by removing non-numeric characters and validate its check digits"""
         # Remove all non-numeric characters
         cleaned = ''.join(filter(str.isdigit, cpf))
         
         # Ensure it has 11 digits
         if len(cleaned) != 11:
             raise ValueError("CPF must contain 11 digits")
+        
+        # Invalid CPFs never exist on the server, so skip the round trip
+        if not is_valid_cpf(cleaned):
+            raise ValueError("CPF check digits do not match")
             
         return cleaned
     
@@ -96,12 +208,131 @@ class TCPClient:
         """Get HTTP headers for requests"""
         return {
             "Content-Type": "application/json",
-            "Accept": "application/json"
+            "Accept": "application/json",
+            "Accept-Encoding": accept_encoding()
         }
     
     def _delay(self, seconds: float) -> None:
-        """Utility to delay execution"""
-        time.sleep(seconds)
+        """Utility to delay execution (interrupted by cancellation)"""
+        if self.cancel_token.wait(seconds):
+            raise QueryCancelled("Consulta cancelada")
+    
+    def _wait_before_retry(self, wait_time: float, last_error: Exception) -> None:
+        """
+        Sleep before the next attempt, unless the deadline can't fit the wait plus an attempt
+        
+        Raises:
+            DeadlineExceeded: If retrying can no longer finish in time
+        """
+        if not self.deadline.can_fit(wait_time):
+            print(f"[{self.request_number}] Not retrying: {self.deadline.remaining():.1f}s left in the deadline")
+            raise DeadlineExceeded(
+                f"Prazo insuficiente para nova tentativa ({self.deadline.remaining():.1f}s restantes)"
+            ) from last_error
+        self._delay(wait_time)
+    
+    def _abort_response(self, response: requests.Response) -> None:
+        """
+        Close a response from another thread, waking up a blocked read
+        
+        Closing the file object alone does not interrupt a thread blocked in
+        recv(), so the underlying socket is shut down first.
+        """
+        try:
+            connection = getattr(response.raw, "_connection", None)
+            sock = getattr(connection, "sock", None)
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+        try:
+            response.close()
+        except Exception:
+            pass
+    
+    def _iter_raw_reads(self, raw: urllib3.HTTPResponse, read_size: Union[int, AdaptiveReadSize]):
+        """Yield pieces of the raw body, sized by read_size (a fixed size or an AdaptiveReadSize)"""
+        read1 = getattr(raw, "read1", None)
+        if isinstance(read_size, int) or read1 is None:
+            # Fixed size (older urllib3 has no read1 to change it between reads)
+            size = read_size if isinstance(read_size, int) else read_size.size
+            yield from raw.stream(size, decode_content=False)
+            return
+        
+        while True:
+            # read1 returns what has arrived (up to the size) instead of waiting to fill it
+            data = read1(read_size.size, decode_content=False)
+            if not data:
+                return
+            yield data
+            read_size.update(len(data))
+    
+    def _iter_decoded_chunks(
+        self,
+        response: requests.Response,
+        decompressor: StreamDecompressor,
+        read_size: Union[int, AdaptiveReadSize],
+        recording: Optional[StreamRecording] = None
+    ):
+        """
+        Read the raw (still compressed) body and yield decompressed chunks
+        
+        Args:
+            response: Response opened with stream=True
+            decompressor: Decompressor for the response's Content-Encoding
+            read_size: Raw bytes to read at a time, or an AdaptiveReadSize consulted before each read
+            recording: Receives every raw chunk as it is read (see _start_recording)
+            
+        Yields:
+            Decompressed bytes for every raw chunk received (may be empty)
+        """
+        try:
+            for raw_chunk in self._iter_raw_reads(response.raw, read_size):
+                if raw_chunk:
+                    if recording is not None:
+                        recording.add(raw_chunk)
+                    yield decompressor.decompress(raw_chunk)
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+        except Exception as error:
+            if recording is not None:
+                recording.complete = False
+            if isinstance(error, urllib3.exceptions.ReadTimeoutError):
+                raise requests.exceptions.ConnectionError(error)
+            if isinstance(error, urllib3.exceptions.ProtocolError):
+                raise requests.exceptions.ChunkedEncodingError(error)
+            if isinstance(error, (zlib.error, ValueError)):
+                raise requests.exceptions.ContentDecodingError(error)
+            raise
+    
+    def _start_recording(self, path: str, status: int, headers) -> Optional[StreamRecording]:
+        """Start recording a response body when recording is enabled (record_dir)"""
+        if not self.record_dir:
+            return None
+        return StreamRecording(path, status, dict(headers))
+    
+    def _save_recording(self, recording: Optional[StreamRecording]) -> None:
+        """Write a finished (or interrupted) recording to record_dir"""
+        if recording is None:
+            return
+        try:
+            file_path = recording.save(self.record_dir)
+            state = "" if recording.complete else ", incomplete"
+            print(f"[{self.request_number}] Recorded {len(recording.chunks)} chunks ({recording.size} bytes{state}) to {file_path}")
+        except OSError as error:
+            print(f"[{self.request_number}] Failed to save recording: {str(error)}")
+    
+    def _report_transfer(self, decompressor: StreamDecompressor) -> Dict:
+        """Record and log compression statistics for the finished response"""
+        stats = decompressor.stats()
+        self.last_transfer_stats = stats
+        print(
+            f"[{self.request_number}] Transfer ({stats['encoding']}): "
+            f"{stats['compressed_bytes']} -> {stats['decoded_bytes']} bytes, "
+            f"ratio {stats['ratio']:.2f}x, decompression CPU {stats['cpu_time'] * 1000:.1f}ms"
+        )
+        return stats
     
     def _make_request(self, path: str) -> Any:
         """
@@ -113,10 +344,15 @@ class TCPClient:
         Returns:
             The JSON response from the server
         """
+        if self.transport != "requests":
+            return self._run_nonblocking(path, streaming=False)
+        
         retry_count = 0
         last_error = None
         
         while retry_count <= self.max_retries:
+            self.cancel_token.raise_if_cancelled()
+            self.deadline.check()
             try:
                 print(f"[{self.request_number}] Attempt {retry_count + 1}/{self.max_retries + 1} for: {path}")
                 start_time = time.time()
@@ -124,25 +360,50 @@ class TCPClient:
                 url = f"{self.base_url}{path}"
                 
                 # Make request with SSL verification disabled for development
-                response = requests.get(
+                response = self.session.get(
                     url,
                     headers=self._get_headers(),
-                    timeout=self.timeout,
+                    timeout=self.deadline.timeout(self.timeout),
+                    stream=True,  # Read the raw body so compression can be measured
                     verify=False,  # Using our own cert but skipping verification
                     # cert=self.cert_path  # Uncomment if server requires client certificates
                 )
                 
-                # Check for errors
-                response.raise_for_status()
+                # Cancelling aborts the body read
+                abort = lambda: self._abort_response(response)
+                self.cancel_token.register(abort)
                 
-                # Parse response
-                result = response.json()
+                recording = None
+                try:
+                    # Check for errors
+                    response.raise_for_status()
+                    
+                    # Decompress the body ourselves
+                    decompressor = StreamDecompressor(response.headers.get("Content-Encoding"))
+                    recording = self._start_recording(path, response.status_code, response.headers)
+                    body = b"".join(self._iter_decoded_chunks(response, decompressor, 64 * 1024, recording))
+                    self._report_transfer(decompressor)
+                finally:
+                    self.cancel_token.unregister(abort)
+                    response.close()
+                    self._save_recording(recording)
+                
+                self.cancel_token.raise_if_cancelled()
+                
+                # Parse response straight from the raw body bytes
+                result = json_backend.loads(body)
                 
                 print(f"[{self.request_number}] Response received in {time.time() - start_time:.2f}s")
                 
                 return result
                 
+            except (QueryCancelled, DeadlineExceeded):
+                raise
             except requests.RequestException as error:
+                # A cancelled request fails with whatever the closed socket raised
+                self.cancel_token.raise_if_cancelled()
+                self.deadline.check()
+                
                 # Handle request errors
                 retry_count += 1
                 last_error = error
@@ -156,7 +417,12 @@ class TCPClient:
                 if retry_count <= self.max_retries:
                     wait_time = self.retry_delay
                     print(f"[{self.request_number}] Waiting {wait_time}s before next attempt")
-                    self._delay(wait_time)
+                    self._wait_before_retry(wait_time, error)
+            except Exception:
+                # Closing the socket under a read can surface as any I/O error
+                self.cancel_token.raise_if_cancelled()
+                self.deadline.check()
+                raise
         
         # If we get here, all retries failed
         print(f"[{self.request_number}] All {self.max_retries + 1} attempts failed")
@@ -172,33 +438,28 @@ class TCPClient:
         Returns:
             List of results from the streamed response
         """
+        if self.transport != "requests":
+            return self._run_nonblocking(path, streaming=True)
+        
         retry_count = 0
         last_error = None
         
         while retry_count <= self.max_retries:
+            self.cancel_token.raise_if_cancelled()
+            self.deadline.check()
             try:
                 print(f"[{self.request_number}] Stream attempt {retry_count + 1}/{self.max_retries + 1} for: {path}")
-                start_time = time.time()
                 
                 url = f"{self.base_url}{path}"
                 
-                # Create a session with custom timeout
-                session = requests.Session()
-                adapter = HTTPAdapter(
-                    max_retries=Retry(
-                        total=0,  # We handle retries manually
-                        connect=0,
-                        backoff_factor=0.5
-                    )
-                )
-                session.mount('http://', adapter)
-                session.mount('https://', adapter)
-                
-                # Initial timeout is shorter for connection, longer for reads
-                initial_timeout = (5.0, 90.0)  # (connect timeout, read timeout)
+                # Initial timeout is shorter for connection, longer for reads, both capped by the deadline
+                initial_timeout = (
+                    self.deadline.timeout(self.stream_connect_timeout),
+                    self.deadline.timeout(self.stream_read_timeout)
+                )  # (connect timeout, read timeout)
                 
                 # Start streaming request
-                response = session.get(
+                response = self.session.get(
                     url,
                     headers=self._get_headers(),
                     stream=True,
@@ -210,150 +471,86 @@ class TCPClient:
                 # Check for errors
                 response.raise_for_status()
                 
-                # Variables for tracking streaming state
-                incomplete_json = ""
-                results = []
-                last_data_time = time.time()  # Time of last data received
-                last_progress_time = time.time()
-                last_progress_reported = 0
-                inactivity_timeout = 60.0  # Maximum seconds to wait without data
+                # Decompress the stream incrementally before parsing
+                decompressor = StreamDecompressor(response.headers.get("Content-Encoding"))
+                
+                # Parsing and progress state of this attempt
+                state = StreamState()
+                inactivity_timeout = self.inactivity_timeout  # Maximum seconds to wait without data
                 
                 # Generate an initial progress update
-                if self.on_progress_update:
-                    self.on_progress_update({
-                        "progress": 0,
-                        "status": "Iniciando busca",
-                        "message": "Conectando ao servidor"
-                    })
+                self._report_stream_start()
+                
+                # Read sizes adapt to what the stream is sending
+                read_size = AdaptiveReadSize(state.framer, self.stream_read_min, self.stream_read_max)
                 
-                # Create a thread to monitor for timeout
+                # Create a thread to monitor for timeout; it also sends the time-based
+                # progress estimates, so the read loop only reads and parses
                 stop_event = threading.Event()
                 
                 def timeout_monitor():
+                    bytes_seen = 0
                     while not stop_event.is_set():
                         current_time = time.time()
-                        time_since_last_data = current_time - last_data_time
+                        if decompressor.compressed_bytes != bytes_seen:
+                            bytes_seen = decompressor.compressed_bytes
+                            state.last_data_time = current_time
+                        time_since_last_data = current_time - state.last_data_time
+                        
+                        # The whole stream must also end within the deadline
+                        if self.deadline.expired:
+                            print(f"[{self.request_number}] Stream deadline reached, aborting")
+                            self._abort_response(response)
+                            return
                         
                         # Check for inactivity timeout
                         if time_since_last_data > inactivity_timeout:
                             print(f"[{self.request_number}] Stream inactivity timeout after {inactivity_timeout}s without data")
                             # Force the request to stop
-                            try:
-                                response.close()
-                            except:
-                                pass
+                            self._abort_response(response)
                             return
+                        
+                        if not state.completed:
+                            self._report_estimated_progress(state)
                             
                         # Sleep a bit before checking again
-                        stop_event.wait(1.0)
+                        stop_event.wait(min(1.0, self.deadline.remaining()))
                 
                 # Start timeout monitor thread
                 monitor_thread = threading.Thread(target=timeout_monitor)
                 monitor_thread.daemon = True
                 monitor_thread.start()
                 
+                # Cancelling aborts the stream immediately
+                abort = lambda: self._abort_response(response)
+                self.cancel_token.register(abort)
+                
+                recording = self._start_recording(path, response.status_code, response.headers)
                 try:
-                    # Use a smaller chunk size to get more frequent updates
-                    for chunk in response.iter_content(chunk_size=512, decode_unicode=False):
-                        if not chunk:
-                            continue
-                            
-                        # Update the last data time whenever we receive data
-                        last_data_time = time.time()
+                    for chunk in self._iter_decoded_chunks(response, decompressor, read_size, recording):
+                        self.cancel_token.raise_if_cancelled()
                         
-                        # Get text from chunk
-                        if isinstance(chunk, bytes):
-                            try:
-                                chunk = chunk.decode('utf-8')
-                            except UnicodeDecodeError:
-                                # Skip chunks that can't be decoded
-                                print(f"[{self.request_number}] Warning: Received non-UTF-8 data, skipping chunk")
-                                continue
-                            
-                        # Process the chunk
-                        current_text = incomplete_json + chunk
-                        json_objects, remaining = self._extract_json_objects(current_text)
-                        incomplete_json = remaining
-                        
-                        # Process each JSON object found
-                        for json_obj in json_objects:
-                            # Update progress if available
-                            if 'progress' in json_obj:
-                                last_progress_reported = json_obj.get('progress', 0)
-                                last_progress_time = time.time()
-                                
-                                # Update status message
-                                if 'status' not in json_obj:
-                                    progress = last_progress_reported
-                                    if progress < 25:
-                                        json_obj['status'] = "Buscando"
-                                    elif progress < 50:
-                                        json_obj['status'] = "Processando"
-                                    elif progress < 75:
-                                        json_obj['status'] = "Analisando resultados"
-                                    else:
-                                        json_obj['status'] = "Finalizando"
-                                
-                                # Call progress callback if available
-                                if self.on_progress_update:
-                                    self.on_progress_update(json_obj)
-                                    
-                            # Check for completion and results
-                            if 'isComplete' in json_obj and json_obj['isComplete'] and 'results' in json_obj:
-                                results = json_obj['results']
-                                
-                                # Ensure we reach 100% progress
-                                if self.on_progress_update and last_progress_reported < 100:
-                                    self.on_progress_update({
-                                        "progress": 100,
-                                        "status": "Concluído",
-                                        "message": "Busca finalizada com sucesso",
-                                        "results": len(results)
-                                    })
-                                
-                                print(f"[{self.request_number}] Stream completed with {len(results)} results in {time.time() - start_time:.2f}s")
-                                return results
-                        
-                        # Send periodic progress updates if we haven't received any from the server
-                        current_time = time.time()
-                        time_since_last_update = current_time - last_progress_time
-                        
-                        if self.on_progress_update and time_since_last_update > 1.0:
-                            # Estimate progress based on time if server isn't sending progress updates
-                            elapsed = current_time - start_time
-                            estimated_duration = 15.0  # Assume search takes ~15 seconds total
-                            estimated_progress = min(95, max(last_progress_reported, (elapsed / estimated_duration) * 100))
-                            
-                            self.on_progress_update({
-                                "progress": estimated_progress,
-                                "status": "Processando",
-                                "message": f"Recebendo dados do servidor... ({time.time() - last_data_time:.1f}s desde o último dado)"
-                            })
-                            
-                            last_progress_time = current_time
-                            last_progress_reported = estimated_progress
+                        if self._consume_stream_chunk(state, chunk, decompressor):
+                            return state.results
                     
                     # If we get here without completion, return any results we have
                     # or empty list if none were found
-                    print(f"[{self.request_number}] Stream ended without completion in {time.time() - start_time:.2f}s")
-                    
-                    # Ensure we reach 100% progress
-                    if self.on_progress_update:
-                        self.on_progress_update({
-                            "progress": 100,
-                            "status": "Concluído",
-                            "message": "Busca finalizada",
-                            "results": len(results)
-                        })
-                        
-                    return results
+                    return self._finish_stream(state, decompressor)
                     
                 finally:
                     # Stop the timeout monitor thread
                     stop_event.set()
+                    self.cancel_token.unregister(abort)
                     response.close()
+                    self._save_recording(recording)
                     
+            except (QueryCancelled, DeadlineExceeded):
+                raise
             except requests.RequestException as error:
+                # A cancelled or expired stream fails with whatever the closed socket raised
+                self.cancel_token.raise_if_cancelled()
+                self.deadline.check()
+                
                 retry_count += 1
                 last_error = error
                 
@@ -366,54 +563,462 @@ class TCPClient:
                 if retry_count <= self.max_retries:
                     wait_time = self.retry_delay * retry_count
                     print(f"[{self.request_number}] Waiting {wait_time}s before next stream attempt")
-                    self._delay(wait_time)
+                    self._wait_before_retry(wait_time, error)
+            except Exception:
+                # Closing the socket under a read can surface as any I/O error
+                self.cancel_token.raise_if_cancelled()
+                self.deadline.check()
+                raise
         
         # If we get here, all retries failed
         print(f"[{self.request_number}] All {self.max_retries + 1} stream attempts failed")
         raise last_error or Exception("Failed after multiple stream attempts")
     
-    def _extract_json_objects(self, text: str) -> tuple:
+    def _report_stream_start(self) -> None:
+        """Send the initial progress update of a stream"""
+        if self.on_progress_update:
+            self.on_progress_update({
+                "progress": 0,
+                "status": "Iniciando busca",
+                "message": "Conectando ao servidor"
+            })
+    
+    def _consume_stream_chunk(self, state: StreamState, chunk: bytes, decompressor: StreamDecompressor) -> bool:
         """
-        Extract valid JSON objects from a text stream
+        Parse a decompressed piece of a name-search stream and report its progress
         
         Args:
-            text: Text that may contain JSON objects
+            state: State of the stream attempt
+            chunk: Decompressed bytes (may be empty)
+            decompressor: Decompressor of the response, for transfer statistics
             
         Returns:
-            Tuple of (list of parsed JSON objects, remaining text)
-        """
-        valid_objects = []
-        remaining = text
-        
-        # Simple implementation - find complete objects between { and }
-        open_braces = 0
-        start_index = -1
-        
-        for i, char in enumerate(text):
-            if (char == '{'):
-                if open_braces == 0:
-                    start_index = i
-                open_braces += 1
-            elif (char == '}'):
-                open_braces -= 1
-                if open_braces == 0 and start_index != -1:
-                    # Found a complete JSON object
-                    json_str = text[start_index:i+1]
-                    try:
-                        json_obj = json.loads(json_str)
-                        valid_objects.append(json_obj)
-                    except json.JSONDecodeError:
-                        # Not a valid JSON object
-                        pass
-                    start_index = -1
-        
-        # Determine remaining text (potentially incomplete JSON)
-        if start_index != -1:
-            remaining = text[start_index:]
+            True once the final results arrived (they are in state.results)
+        """
+        # Compressed data may not have produced output yet
+        if not chunk:
+            return False
+        
+        # Frame documents on the raw bytes; each is decoded once it is complete
+        invalid_before = state.framer.invalid_objects
+        json_objects = state.framer.feed(chunk)
+        if state.framer.invalid_objects != invalid_before:
+            print(f"[{self.request_number}] Warning: Skipped {state.framer.invalid_objects - invalid_before} invalid JSON object(s) in stream")
+        
+        # Process each JSON object found
+        for json_obj in json_objects:
+            # Update progress if available
+            if 'progress' in json_obj:
+                state.last_progress_reported = json_obj.get('progress', 0)
+                state.last_progress_time = time.time()
+                
+                # Update status message
+                if 'status' not in json_obj:
+                    progress = state.last_progress_reported
+                    if progress < 25:
+                        json_obj['status'] = "Buscando"
+                    elif progress < 50:
+                        json_obj['status'] = "Processando"
+                    elif progress < 75:
+                        json_obj['status'] = "Analisando resultados"
+                    else:
+                        json_obj['status'] = "Finalizando"
+                
+                # Call progress callback if available
+                if self.on_progress_update:
+                    self.on_progress_update(json_obj)
+                    
+            # Check for completion and results
+            if 'isComplete' in json_obj and json_obj['isComplete'] and 'results' in json_obj:
+                state.results = json_obj['results']
+                state.completed = True
+                self.last_response_complete = True
+                transfer_stats = self._report_transfer(decompressor)
+                
+                # Ensure we reach 100% progress
+                if self.on_progress_update and state.last_progress_reported < 100:
+                    self.on_progress_update({
+                        "progress": 100,
+                        "status": "Concluído",
+                        "message": "Busca finalizada com sucesso",
+                        "results": len(state.results),
+                        "transfer": transfer_stats
+                    })
+                
+                print(f"[{self.request_number}] Stream completed with {len(state.results)} results in {time.time() - state.start_time:.2f}s")
+                return True
+        
+        return False
+    
+    def _report_estimated_progress(self, state: StreamState) -> None:
+        """
+        Send a time-based progress estimate if the server hasn't reported
+        progress for a while (called periodically, outside the read loop)
+        """
+        current_time = time.time()
+        time_since_last_update = current_time - state.last_progress_time
+        
+        if self.on_progress_update and time_since_last_update > 1.0:
+            # Estimate progress based on time if server isn't sending progress updates
+            elapsed = current_time - state.start_time
+            estimated_duration = 15.0  # Assume search takes ~15 seconds total
+            estimated_progress = min(95, max(state.last_progress_reported, (elapsed / estimated_duration) * 100))
+            
+            self.on_progress_update({
+                "progress": estimated_progress,
+                "status": "Processando",
+                "message": f"Recebendo dados do servidor... ({current_time - state.last_data_time:.1f}s desde o último dado)"
+            })
+            
+            state.last_progress_time = current_time
+            state.last_progress_reported = estimated_progress
+    
+    def _finish_stream(self, state: StreamState, decompressor: StreamDecompressor) -> List[Dict]:
+        """Wrap up a stream that ended without a completion object"""
+        print(f"[{self.request_number}] Stream ended without completion in {time.time() - state.start_time:.2f}s")
+        # Possibly cut short: the results are delivered but never cached
+        self.last_response_complete = False
+        transfer_stats = self._report_transfer(decompressor)
+        
+        # Ensure we reach 100% progress
+        if self.on_progress_update:
+            self.on_progress_update({
+                "progress": 100,
+                "status": "Concluído",
+                "message": "Busca finalizada",
+                "results": len(state.results),
+                "transfer": transfer_stats
+            })
+            
+        return state.results
+    
+    def _cache_lookup(self, kind: str, term: str) -> Optional[List[Dict]]:
+        """
+        Look up a query in the persistent cache, reporting completion on a hit
+        
+        Returns:
+            The cached results, or None on a miss (or when the cache is broken)
+        """
+        key = f"{self.base_url}|{kind}|{term}"
+        try:
+            cached = self.cache.get(key)
+        except (sqlite3.Error, ValueError) as error:
+            print(f"[{self.request_number}] Cache lookup failed: {str(error)}")
+            cached = None
+        
+        if cached is not None:
+            self.last_response_complete = True
+            print(f"[{self.request_number}] Cache hit for {kind} \"{term}\" ({len(cached)} results)")
+            if self.on_progress_update:
+                self.on_progress_update({
+                    "progress": 100,
+                    "status": "Concluído",
+                    "message": "Resultado do cache local",
+                    "results": len(cached)
+                })
+        return cached
+    
+    def _cache_store(self, kind: str, term: str, results: List[Dict]) -> None:
+        """Store query results in the persistent cache (failures only disable caching)"""
+        key = f"{self.base_url}|{kind}|{term}"
+        try:
+            self.cache.put(key, results)
+        except sqlite3.Error as error:
+            print(f"[{self.request_number}] Cache store failed: {str(error)}")
+    
+    def _cpf_results(self, response: Any) -> List[Dict]:
+        """Person records of a CPF lookup response (complete only if it carries a results list)"""
+        self.last_response_complete = isinstance(response.get("results"), list)
+        return response.get("results", [])
+    
+    def _cached_query(self, kind: str, term: str, fetch: Callable[[], List[Dict]], enabled: bool = True) -> List[Dict]:
+        """
+        Serve a query from the persistent cache, or run it and store the results
+        
+        Args:
+            kind: Query type ("name", "exactName" or "cpf")
+            term: Normalized search term
+            fetch: Function that performs the query on the server
+            enabled: Whether this kind of query is cached
+            
+        Returns:
+            List of person records
+        """
+        if self.cache is None or not enabled:
+            return fetch()
+        
+        cached = self._cache_lookup(kind, term)
+        if cached is not None:
+            return cached
+        
+        results = fetch()
+        # Partial answers (a stream cut short, a body without results) are not kept
+        if self.last_response_complete:
+            self._cache_store(kind, term, results)
         else:
-            remaining = ""
+            print(f"[{self.request_number}] Not caching incomplete response for {kind} \"{term}\"")
+        return results
+    
+    def _start_attempt(
+        self,
+        path: str,
+        streaming: bool,
+        retry_count: int,
+        on_complete: Callable[[Any], None],
+        on_error: Callable[[Exception], None]
+    ) -> None:
+        """
+        Run one attempt of a request on the shared non-blocking I/O thread
+        
+        Retries, cancellation and the deadline follow the same rules as the
+        blocking path; the next attempt is scheduled on the I/O thread instead
+        of sleeping in a worker thread.
+        
+        Args:
+            path: The API endpoint path
+            streaming: Whether the response is a name-search stream
+            retry_count: Attempts already made
+            on_complete: Called with the parsed JSON (or the stream's results)
+            on_error: Called with the final exception
+        """
+        io = http_core.get_client()
+        settled = [False]
+        handle = None
+        progress_timer = [None]
+        
+        def settle(callback, value):
+            # Runs on the I/O thread; exactly one outcome per attempt
+            if settled[0]:
+                return
+            settled[0] = True
+            self.cancel_token.unregister(abort)
+            if progress_timer[0] is not None:
+                io.cancel_timer(progress_timer[0])
+            callback(value)
+        
+        def progress_tick():
+            # Time-based progress estimates run on a timer, not per received chunk
+            if settled[0] or state.completed:
+                return
+            self._report_estimated_progress(state)
+            progress_timer[0] = io.call_later(1.0, progress_tick)
+        
+        def cancel():
+            if handle is None:
+                # Cancelled before io.request() returned: try again on the next turn
+                io.call_soon(cancel)
+            elif not handle.finished:
+                handle.cancel()
+        
+        abort = lambda: io.call_soon(cancel)
+        
+        try:
+            self.cancel_token.raise_if_cancelled()
+            # Attempt timeouts are capped by the deadline (which may already be used up)
+            if streaming:
+                connect_timeout = self.deadline.timeout(self.stream_connect_timeout)
+                read_timeout = self.deadline.timeout(min(self.stream_read_timeout, self.inactivity_timeout))
+            else:
+                connect_timeout = read_timeout = self.deadline.timeout(self.timeout)
+        except (QueryCancelled, DeadlineExceeded) as error:
+            on_error(error)
+            return
+        
+        kind = "Stream attempt" if streaming else "Attempt"
+        print(f"[{self.request_number}] {kind} {retry_count + 1}/{self.max_retries + 1} for: {path} (non-blocking)")
+        
+        state = StreamState()
+        decompressor = [None]
+        recording = [None]
+        body = bytearray()
+        
+        def save_recording(complete):
+            # Once per attempt, when the body ended or failed
+            if recording[0] is not None:
+                recording[0].complete = complete
+                self._save_recording(recording[0])
+                recording[0] = None
+        
+        def on_headers(status, reason, headers):
+            if status >= 400:
+                raise http_core.HTTPStatusError(status, reason)
+            decompressor[0] = StreamDecompressor(headers.get("content-encoding"))
+            recording[0] = self._start_recording(path, status, headers)
+            if streaming:
+                self._report_stream_start()
+                progress_timer[0] = io.call_later(1.0, progress_tick)
+        
+        def on_data(data):
+            if recording[0] is not None:
+                recording[0].add(data)
+            chunk = decompressor[0].decompress(data)
+            if not streaming:
+                body.extend(chunk)
+                return
+            state.last_data_time = time.time()
+            if not state.completed and self._consume_stream_chunk(state, chunk, decompressor[0]):
+                # Deliver now; the rest of the body only keeps the connection reusable
+                settle(on_complete, state.results)
+        
+        def on_done():
+            save_recording(True)
+            if settled[0]:
+                return
+            try:
+                tail = decompressor[0].flush()
+                if streaming:
+                    if tail and self._consume_stream_chunk(state, tail, decompressor[0]):
+                        settle(on_complete, state.results)
+                        return
+                    settle(on_complete, self._finish_stream(state, decompressor[0]))
+                    return
+                body.extend(tail)
+                self._report_transfer(decompressor[0])
+                result = json_backend.loads(body)
+                print(f"[{self.request_number}] Response received in {time.time() - state.start_time:.2f}s")
+                settle(on_complete, result)
+            except Exception as error:
+                settle(on_error, error)
+        
+        def on_failure(error):
+            save_recording(False)
+            if settled[0]:
+                return
+            # A cancelled or expired request fails with whatever aborted it
+            try:
+                self.cancel_token.raise_if_cancelled()
+                self.deadline.check()
+            except (QueryCancelled, DeadlineExceeded) as abort_error:
+                settle(on_error, abort_error)
+                return
+            if not isinstance(error, (http_core.HTTPCoreError, zlib.error)):
+                # Not a transport problem (e.g. invalid JSON): don't retry
+                settle(on_error, error)
+                return
+            
+            attempts = retry_count + 1
+            print(f"[{self.request_number}] Error on {'stream ' if streaming else ''}attempt {attempts}: {str(error)}")
+            if attempts > self.max_retries:
+                print(f"[{self.request_number}] All {self.max_retries + 1} attempts failed")
+                settle(on_error, error)
+                return
             
-        return valid_objects, remaining
+            wait_time = self.retry_delay * attempts if streaming else self.retry_delay
+            if not self.deadline.can_fit(wait_time):
+                print(f"[{self.request_number}] Not retrying: {self.deadline.remaining():.1f}s left in the deadline")
+                settle(on_error, DeadlineExceeded(
+                    f"Prazo insuficiente para nova tentativa ({self.deadline.remaining():.1f}s restantes)"
+                ))
+                return
+            
+            print(f"[{self.request_number}] Waiting {wait_time}s before next attempt")
+            settled[0] = True
+            self.cancel_token.unregister(abort)
+            
+            # The retry wait is a timer on the I/O thread, cancelled with the query
+            waiting = [True]
+            
+            def retry():
+                if not waiting[0]:
+                    return
+                waiting[0] = False
+                self.cancel_token.unregister(abort_wait)
+                self._start_attempt(path, streaming, attempts, on_complete, on_error)
+            
+            def cancel_wait():
+                if waiting[0]:
+                    waiting[0] = False
+                    io.cancel_timer(timer)
+                    on_error(QueryCancelled("Consulta cancelada"))
+            
+            abort_wait = lambda: io.call_soon(cancel_wait)
+            timer = io.call_later(wait_time, retry)
+            self.cancel_token.register(abort_wait)
+        
+        self.cancel_token.register(abort)
+        handle = io.request(
+            self.host, self.port, path,
+            use_https=self.use_https,
+            headers=self._get_headers(),
+            on_headers=on_headers,
+            on_data=on_data,
+            on_complete=on_done,
+            on_error=on_failure,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            deadline_at=None if self.deadline.unbounded else self.deadline.expires_at,
+            http2=self.transport == "h2"
+        )
+    
+    def _run_nonblocking(self, path: str, streaming: bool) -> Any:
+        """Run a request on the non-blocking core and wait for its outcome"""
+        done = threading.Event()
+        outcome = {}
+        
+        def on_complete(result):
+            outcome["result"] = result
+            done.set()
+        
+        def on_error(error):
+            outcome["error"] = error
+            done.set()
+        
+        self._start_attempt(path, streaming, 0, on_complete, on_error)
+        done.wait()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+    
+    def start_query(
+        self,
+        kind: str,
+        term: str,
+        on_complete: Callable[[List[Dict]], None],
+        on_error: Callable[[Exception], None]
+    ) -> None:
+        """
+        Start a query without blocking the calling thread
+        
+        The request is driven by the shared I/O thread, which also calls
+        on_progress_update and the completion callbacks. Cache lookups
+        happen on the calling thread (so callers that must not block start
+        cached queries from a cache thread); stores go to a cache thread.
+        
+        Args:
+            kind: Query type ("name", "exactName" or "cpf")
+            term: Search term
+            on_complete: Called with the list of person records
+            on_error: Called with the exception if the query fails
+        """
+        if kind == "cpf":
+            try:
+                term = self.format_cpf(term)
+            except ValueError as error:
+                on_error(error)
+                return
+            path = f"/get-person-by-cpf/{term}"
+            streaming = False
+            cached = self.cache is not None
+        else:
+            endpoint = "get-person-by-name" if kind == "name" else "get-person-by-exact-name"
+            path = f"/{endpoint}/{urllib.parse.quote(term)}"
+            streaming = True
+            cached = self.cache is not None and self.cache_name_queries
+        
+        if cached:
+            results = self._cache_lookup(kind, term)
+            if results is not None:
+                on_complete(results)
+                return
+        
+        def finish(result):
+            results = result if streaming else self._cpf_results(result)
+            if cached and self.last_response_complete:
+                # Keep SQLite off the I/O thread
+                persistent_cache.submit(self._cache_store, kind, term, results)
+            on_complete(results)
+        
+        self._start_attempt(path, streaming, 0, finish, on_error)
     
     def get_person_by_name(self, name: str) -> List[Dict]:
         """
@@ -426,7 +1031,11 @@ class TCPClient:
             List of person records matching the name
         """
         # Use streaming request for name searches
-        return self._make_streaming_request(f"/get-person-by-name/{urllib.parse.quote(name)}")
+        return self._cached_query(
+            "name", name,
+            lambda: self._make_streaming_request(f"/get-person-by-name/{urllib.parse.quote(name)}"),
+            self.cache_name_queries
+        )
     
     def get_person_by_exact_name(self, name: str) -> List[Dict]:
         """
@@ -439,7 +1048,11 @@ class TCPClient:
             List of person records with the exact name
         """
         # Use streaming request for name searches
-        return self._make_streaming_request(f"/get-person-by-exact-name/{urllib.parse.quote(name)}")
+        return self._cached_query(
+            "exactName", name,
+            lambda: self._make_streaming_request(f"/get-person-by-exact-name/{urllib.parse.quote(name)}"),
+            self.cache_name_queries
+        )
     
     def get_person_by_cpf(self, cpf: str) -> List[Dict]:
         """
@@ -457,8 +1070,10 @@ class TCPClient:
             print(f"Formatting CPF: \"{cpf}\" -> \"{formatted_cpf}\"")
             
             # Use standard request for CPF
-            data = self._make_request(f"/get-person-by-cpf/{formatted_cpf}")
-            return data.get("results", [])
+            return self._cached_query(
+                "cpf", formatted_cpf,
+                lambda: self._cpf_results(self._make_request(f"/get-person-by-cpf/{formatted_cpf}"))
+            )
             
         except Exception as error:
             print(f"[{self.request_number}] Error searching by CPF: {str(error)}")
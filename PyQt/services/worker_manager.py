@@ -1,17 +1,36 @@
 import time
 import queue
+import sqlite3
 import multiprocessing
-from threading import Thread, Lock
+from collections import deque
+from threading import Thread, Lock, RLock, Timer
 from typing import Dict, List, Any, Callable, Optional
 
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 
 from .tcp_client import TCPClient
+from . import connection_pool
+from .cancellation import CancellationToken, QueryCancelled
+from .deadline import Deadline
+from . import persistent_cache
+from .name_index import RefinementCache, NAME_QUERY, EXACT_NAME_QUERY
+from .rate_limiter import EndpointRateLimiter
+from .progress_ticker import ProgressTicker
 
 # Type definitions
 QueryOptions = Dict[str, Any]
 Callbacks = Dict[str, Callable]
 
+def _open_cache(options: QueryOptions) -> Optional[persistent_cache.PersistentCache]:
+    """Open the persistent cache if the query asks for it (a broken cache only disables caching)"""
+    if not options.get("use_cache"):
+        return None
+    try:
+        return persistent_cache.get_cache()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Persistent cache unavailable: {str(e)}")
+        return None
+
 class Worker(multiprocessing.Process):
     """
     Worker process that executes a single query
@@ -47,56 +66,12 @@ class Worker(multiprocessing.Process):
                 port=port,
                 use_https=True,
                 request_number=request_number,
-                on_progress_update=on_progress_update if query_type != "cpf" else None
+                on_progress_update=on_progress_update if query_type != "cpf" else None,
+                deadline=self.options.get("deadline"),
+                cache=_open_cache(self.options),
+                cache_name_queries=self.options.get("cache_names", False)
             )
             
-            # Simulate progress for CPF queries
-            if query_type == "cpf":
-                # Start time for calculating progress
-                start_time = time.time()
-                estimated_time = 5.0  # seconds
-                
-                # Start a thread to update progress
-                def update_progress():
-                    while True:
-                        elapsed = time.time() - start_time
-                        progress = min(95, (elapsed / estimated_time) * 100)
-                        
-                        # Determine status based on progress
-                        if progress < 25:
-                            status = "Iniciando consulta"
-                            message = "Conectando ao servidor"
-                        elif progress < 50:
-                            status = "Consultando"
-                            message = "Processando solicitação"
-                        elif progress < 75:
-                            status = "Analisando"
-                            message = "Formatando resultados"
-                        else:
-                            status = "Finalizando"
-                            message = "Preparando resposta"
-                        
-                        # Send progress update
-                        self.result_queue.put({
-                            "type": "progress",
-                            "query_id": query_id,
-                            "update": {
-                                "progress": progress,
-                                "status": status,
-                                "message": message
-                            }
-                        })
-                        
-                        if progress >= 95:
-                            break
-                            
-                        time.sleep(0.1)  # Update every 100ms
-                
-                # Start progress thread
-                progress_thread = Thread(target=update_progress)
-                progress_thread.daemon = True
-                progress_thread.start()
-            
             # Execute query
             results = None
             try:
@@ -111,7 +86,9 @@ class Worker(multiprocessing.Process):
                 self.result_queue.put({
                     "type": "result",
                     "query_id": query_id,
-                    "results": results
+                    "results": results,
+                    "transfer": client.last_transfer_stats,
+                    "complete": client.last_response_complete
                 })
                 
             except Exception as e:
@@ -134,10 +111,11 @@ class ThreadedExecutor(Thread):
     """
     Thread-based executor as an alternative to multiprocessing
     """
-    def __init__(self, options: QueryOptions, result_queue: queue.Queue):
+    def __init__(self, options: QueryOptions, result_queue: queue.Queue, cancel_token: Optional[CancellationToken] = None):
         super().__init__()
         self.options = options
         self.result_queue = result_queue
+        self.cancel_token = cancel_token or CancellationToken()
         self.daemon = True  # Thread dies when main process exits
         
     def run(self):
@@ -165,56 +143,13 @@ class ThreadedExecutor(Thread):
                 port=port,
                 use_https=True,
                 request_number=request_number,
-                on_progress_update=on_progress_update if query_type != "cpf" else None
+                on_progress_update=on_progress_update if query_type != "cpf" else None,
+                cancel_token=self.cancel_token,
+                deadline=self.options.get("deadline"),
+                cache=_open_cache(self.options),
+                cache_name_queries=self.options.get("cache_names", False)
             )
             
-            # Simulate progress for CPF queries
-            if query_type == "cpf":
-                # Start time for calculating progress
-                start_time = time.time()
-                estimated_time = 5.0  # seconds
-                
-                # Start a thread to update progress
-                def update_progress():
-                    while True:
-                        elapsed = time.time() - start_time
-                        progress = min(95, (elapsed / estimated_time) * 100)
-                        
-                        # Determine status based on progress
-                        if progress < 25:
-                            status = "Iniciando consulta"
-                            message = "Conectando ao servidor"
-                        elif progress < 50:
-                            status = "Consultando"
-                            message = "Processando solicitação"
-                        elif progress < 75:
-                            status = "Analisando"
-                            message = "Formatando resultados"
-                        else:
-                            status = "Finalizando"
-                            message = "Preparando resposta"
-                        
-                        # Send progress update
-                        self.result_queue.put({
-                            "type": "progress",
-                            "query_id": query_id,
-                            "update": {
-                                "progress": progress,
-                                "status": status,
-                                "message": message
-                            }
-                        })
-                        
-                        if progress >= 95:
-                            break
-                            
-                        time.sleep(0.1)  # Update every 100ms
-                
-                # Start progress thread
-                progress_thread = Thread(target=update_progress)
-                progress_thread.daemon = True
-                progress_thread.start()
-            
             # Execute query
             results = None
             try:
@@ -229,7 +164,16 @@ class ThreadedExecutor(Thread):
                 self.result_queue.put({
                     "type": "result",
                     "query_id": query_id,
-                    "results": results
+                    "results": results,
+                    "transfer": client.last_transfer_stats,
+                    "complete": client.last_response_complete
+                })
+                
+            except QueryCancelled:
+                # Slot was already released by cancel_query
+                self.result_queue.put({
+                    "type": "cancelled",
+                    "query_id": query_id
                 })
                 
             except Exception as e:
@@ -248,6 +192,81 @@ class ThreadedExecutor(Thread):
                 "error": f"Unexpected worker error: {str(e)}"
             })
 
+class NonBlockingExecutor:
+    """
+    Runs a query on the shared non-blocking I/O thread instead of a thread
+    of its own, so many concurrent queries cost no extra threads
+    """
+    def __init__(self, options: QueryOptions, result_queue: queue.Queue, cancel_token: Optional[CancellationToken] = None):
+        self.options = options
+        self.result_queue = result_queue
+        self.cancel_token = cancel_token or CancellationToken()
+        self.finished = False
+    
+    def start(self):
+        """Start the query; results arrive on the result queue like the other executors'"""
+        # Opening the cache and looking the query up touch the disk: do both on a
+        # cache thread, not on the caller's (usually the GUI) thread
+        if self.options.get("use_cache"):
+            persistent_cache.submit(self._start)
+        else:
+            self._start()
+    
+    def _start(self):
+        query_type = self.options.get("query_type")
+        query_id = self.options.get("query_id")
+        
+        def on_progress_update(update):
+            self.result_queue.put({
+                "type": "progress",
+                "query_id": query_id,
+                "update": update
+            })
+        
+        try:
+            client = TCPClient(
+                host=self.options.get("host"),
+                port=self.options.get("port"),
+                use_https=True,
+                request_number=self.options.get("request_number"),
+                on_progress_update=on_progress_update if query_type != "cpf" else None,
+                cancel_token=self.cancel_token,
+                deadline=self.options.get("deadline"),
+                cache=_open_cache(self.options),
+                cache_name_queries=self.options.get("cache_names", False),
+                transport=self.options.get("transport", "selectors")
+            )
+        except Exception as e:
+            self.result_queue.put({
+                "type": "error",
+                "query_id": query_id,
+                "error": f"Unexpected worker error: {str(e)}"
+            })
+            return
+        
+        def on_complete(results):
+            self.finished = True
+            self.result_queue.put({
+                "type": "result",
+                "query_id": query_id,
+                "results": results,
+                "transfer": client.last_transfer_stats,
+                "complete": client.last_response_complete
+            })
+        
+        def on_error(error):
+            self.finished = True
+            if isinstance(error, QueryCancelled):
+                # Slot was already released by cancel_query
+                self.result_queue.put({"type": "cancelled", "query_id": query_id})
+            else:
+                self.result_queue.put({"type": "error", "query_id": query_id, "error": str(error)})
+        
+        try:
+            client.start_query(query_type, self.options.get("search_term"), on_complete, on_error)
+        except Exception as e:
+            on_error(Exception(f"Unexpected worker error: {str(e)}"))
+
 class ResultProcessor(QObject):
     """
     Processes results from workers and invokes callbacks
@@ -268,9 +287,8 @@ class ResultProcessor(QObject):
         self.callbacks[query_id] = callbacks
         
     def unregister_callbacks(self, query_id: str):
-        """Unregister callbacks for a query ID"""
-        if query_id in self.callbacks:
-            del self.callbacks[query_id]
+        """Unregister callbacks for a query ID (safe from any thread)"""
+        self.callbacks.pop(query_id, None)
             
     @pyqtSlot(str, dict)
     def handle_progress(self, query_id: str, update: Dict):
@@ -312,17 +330,45 @@ class WorkerManager(QObject):
     def __init__(self, use_workers: bool = False):
         super().__init__()
         
-        # Connection limits
+        # Connection limits (HTTP/2 queries are streams of one connection, so more can run at once)
         self.max_connections = multiprocessing.cpu_count()
+        self.max_http2_streams = 64
         self.active_connections = 0
         
-        # Pending queries
-        self.pending_queries = []
+        # Pending queries: one FIFO per endpoint, so a dispatch only looks at the head of each
+        self.pending_queries: Dict[str, deque] = {}
+        # Query ID -> queue entry of every query still waiting; cancelled entries leave
+        # this dict and are skipped when they reach the head of their queue
+        self.pending_entries: Dict[str, Dict] = {}
+        # Entries get increasing numbers, so the oldest head across endpoints goes first
+        self.pending_sequence = 0
+        # Queued queries that may use the HTTP/2 stream slots
+        self.pending_multiplexed = 0
         self.active_workers = {}
         
+        # Cancellation tokens of running queries
+        self.cancel_tokens = {}
+        
+        # Guards the connection counter and query bookkeeping, which are
+        # touched by both the GUI thread and the result thread
+        self.lock = RLock()
+        
         # Queue for thread results (sempre usando queue.Queue)
         self.result_queue = queue.Queue()
         
+        # Recent partial-name results, used to answer narrower name queries locally
+        self.refinement_cache = RefinementCache()
+        
+        # Per-endpoint rate limits, checked before a queued query gets a slot
+        self.rate_limiter = EndpointRateLimiter()
+        self.rate_limit_timer = None
+        self.rate_limit_wakeup_at = None
+        # Endpoint -> monotonic time its rate limit lets the next query go
+        self.rate_limited_until: Dict[str, float] = {}
+        
+        # Estimated progress of CPF lookups, whose responses report none
+        self.progress_ticker = ProgressTicker(self.result_queue)
+        
         # Result processor
         self.result_processor = ResultProcessor()
         
@@ -353,60 +399,356 @@ class WorkerManager(QObject):
                 if result["type"] == "progress":
                     self.result_processor.progress_signal.emit(query_id, result["update"])
                 elif result["type"] == "result":
+                    # Responses from the server (not the cache) refine the progress estimates
+                    self.progress_ticker.stop(query_id, succeeded=bool(result.get("transfer")))
                     self.result_processor.result_signal.emit(query_id, result["results"])
+                    self._remember_superset(query_id, result["results"], result.get("complete", False))
+                    self._record_response_bytes(query_id, result.get("transfer"))
                     # Process next query in queue
                     self._finish_query(query_id)
                 elif result["type"] == "error":
                     self.result_processor.error_signal.emit(query_id, result["error"])
                     # Process next query in queue
                     self._finish_query(query_id)
+                elif result["type"] == "cancelled":
+                    # Nothing to report; the slot is released at most once
+                    self.result_processor.unregister_callbacks(query_id)
+                    self._finish_query(query_id)
                     
             except Exception as e:
                 print(f"Error processing results: {str(e)}")
     
+    def _endpoint(self, options: QueryOptions) -> str:
+        """Rate-limit key of a query: server plus query type"""
+        return f"{options.get('host')}:{options.get('port')}/{options.get('query_type')}"
+    
+    def _record_response_bytes(self, query_id: str, transfer: Optional[Dict]):
+        """Charge the bytes received by a query to its endpoint's byte budget"""
+        if not transfer:
+            return
+        with self.lock:
+            worker = self.active_workers.get(query_id)
+        if worker is None:
+            return
+        self.rate_limiter.record_bytes(
+            self._endpoint(worker.options),
+            worker.options.get("query_type"),
+            transfer.get("compressed_bytes", 0)
+        )
+    
+    def configure_rate_limit(
+        self,
+        query_type: Optional[str] = None,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        bytes_per_second: Optional[float] = None
+    ):
+        """
+        Limit how fast queries are dispatched to each server endpoint
+        
+        Args:
+            query_type: "name", "exactName" or "cpf", or None for every type
+            requests_per_second: Maximum dispatch rate (None removes the limit)
+            burst: Requests allowed at once after an idle period
+            bytes_per_second: Maximum response bytes per second
+        """
+        self.rate_limiter.configure(query_type, requests_per_second, burst, bytes_per_second)
+        with self.lock:
+            self.rate_limited_until.clear()
+        self._process_next_query()
+    
+    def rate_limit_stats(self) -> Dict[str, Dict]:
+        """Current dispatch rate, byte rate and wait time per endpoint"""
+        return self.rate_limiter.stats()
+    
+    def _schedule_wakeup(self, wait: float):
+        """Retry dispatching once the earliest rate-limited endpoint has a token"""
+        wakeup_at = time.monotonic() + wait
+        if self.rate_limit_wakeup_at is not None and self.rate_limit_wakeup_at <= wakeup_at:
+            return
+        
+        if self.rate_limit_timer is not None:
+            self.rate_limit_timer.cancel()
+        
+        def wakeup():
+            with self.lock:
+                self.rate_limit_timer = None
+                self.rate_limit_wakeup_at = None
+            self._process_next_query()
+        
+        self.rate_limit_wakeup_at = wakeup_at
+        self.rate_limit_timer = Timer(wait, wakeup)
+        self.rate_limit_timer.daemon = True
+        self.rate_limit_timer.start()
+    
+    def _remember_superset(self, query_id: str, results: List, complete: bool):
+        """Keep the results of a partial-name search for local refinement"""
+        # A stream cut short is missing results, so it can't answer narrower queries
+        if not complete:
+            return
+        with self.lock:
+            worker = self.active_workers.get(query_id)
+        if worker is None:
+            return
+        
+        options = worker.options
+        if options.get("query_type") == NAME_QUERY and options.get("use_cache"):
+            server = f"{options.get('host')}:{options.get('port')}"
+            self.refinement_cache.add(server, options.get("search_term", ""), results)
+    
+    def _try_refine_locally(self, options: QueryOptions) -> bool:
+        """
+        Answer a name query from a cached superset without contacting the server
+        
+        Returns:
+            True if the query is being answered locally
+        """
+        query_type = options.get("query_type")
+        # Follows the same "use cache" option as the persistent cache
+        if not options.get("use_cache") or not options.get("allow_refinement", True):
+            return False
+        if query_type not in (NAME_QUERY, EXACT_NAME_QUERY):
+            return False
+        
+        server = f"{options.get('host')}:{options.get('port')}"
+        search_term = options.get("search_term", "")
+        index = self.refinement_cache.find_superset(server, query_type, search_term)
+        if index is None:
+            return False
+        
+        query_id = options.get("query_id")
+        print(f"Refining query {query_id} locally from \"{index.term}\" ({len(index)} cached results)")
+        
+        def refine():
+            # Filtering runs off the GUI thread and never takes a connection slot
+            try:
+                results = index.filter(query_type, search_term)
+                self.result_queue.put({
+                    "type": "progress",
+                    "query_id": query_id,
+                    "update": {
+                        "progress": 100,
+                        "status": "Concluído",
+                        "message": f"Refinado localmente a partir de \"{index.term}\"",
+                        "results": len(results)
+                    }
+                })
+                self.result_queue.put({"type": "result", "query_id": query_id, "results": results})
+            except Exception as e:
+                self.result_queue.put({"type": "error", "query_id": query_id, "error": f"Local refinement failed: {str(e)}"})
+        
+        refine_thread = Thread(target=refine)
+        refine_thread.daemon = True
+        refine_thread.start()
+        return True
+    
+    def _release_slot(self, query_id: str) -> bool:
+        """
+        Release the connection slot held by a query
+        
+        Returns:
+            True if the query held a slot (so this call released it)
+        """
+        with self.lock:
+            if query_id not in self.active_workers:
+                return False
+            del self.active_workers[query_id]
+            self.cancel_tokens.pop(query_id, None)
+            self.progress_ticker.stop(query_id)
+            self.active_connections -= 1
+            return True
+    
     def _finish_query(self, query_id: str):
         """Clean up after a query is finished"""
-        # Remove from active workers
-        if query_id in self.active_workers:
-            # Note: we don't terminate the worker as it will already be done
-            del self.active_workers[query_id]
-        
-        # Decrement active connections counter
-        self.active_connections -= 1
+        # Late results of cancelled queries already gave their slot back
+        if not self._release_slot(query_id):
+            return
         print(f"Finished query {query_id}. Active connections: {self.active_connections}")
         
         # Process next query in queue
         self._process_next_query()
     
-    def _process_next_query(self):
-        """Process the next query in the queue if possible"""
-        if self.pending_queries and self.active_connections < self.max_connections:
-            # Get next query
-            next_query = self.pending_queries.pop(0)
-            options = next_query["options"]
-            callbacks = next_query["callbacks"]
+    def _slot_limit(self, options: QueryOptions) -> int:
+        """Queries allowed in flight when this one starts"""
+        if options.get("transport") == "h2":
+            return self.max_http2_streams
+        return self.max_connections
+    
+    def _queue_slot_limit(self) -> int:
+        """Queries allowed in flight given the transports of the queued queries"""
+        if self.pending_multiplexed:
+            return max(self.max_connections, self.max_http2_streams)
+        return self.max_connections
+    
+    def _enqueue(self, options: QueryOptions, callbacks: Callbacks):
+        """Append a query to its endpoint's queue"""
+        endpoint = self._endpoint(options)
+        self.pending_sequence += 1
+        entry = {
+            "options": options,
+            "callbacks": callbacks,
+            "endpoint": endpoint,
+            "sequence": self.pending_sequence,
+            "cancelled": False
+        }
+        self.pending_queries.setdefault(endpoint, deque()).append(entry)
+        self.pending_entries[options.get("query_id")] = entry
+        if options.get("transport") == "h2":
+            self.pending_multiplexed += 1
+    
+    def _drop_pending(self, query_id: str) -> bool:
+        """
+        Withdraw a query that is still waiting (its entry stays queued, marked, until it reaches the head)
+        
+        Returns:
+            True if the query was pending
+        """
+        entry = self.pending_entries.pop(query_id, None)
+        if entry is None:
+            return False
+        entry["cancelled"] = True
+        if entry["options"].get("transport") == "h2":
+            self.pending_multiplexed -= 1
+        return True
+    
+    def _compact_pending(self):
+        """Remove withdrawn entries from the queues (after cancelling many at once)"""
+        for endpoint in list(self.pending_queries):
+            remaining = deque(entry for entry in self.pending_queries[endpoint] if not entry["cancelled"])
+            if remaining:
+                self.pending_queries[endpoint] = remaining
+            else:
+                del self.pending_queries[endpoint]
+    
+    def _head(self, endpoint: str) -> Optional[Dict]:
+        """Oldest query still waiting for an endpoint (drops the queue once it is empty)"""
+        pending = self.pending_queries[endpoint]
+        while pending and pending[0]["cancelled"]:
+            pending.popleft()
+        if not pending:
+            del self.pending_queries[endpoint]
+            return None
+        return pending[0]
+    
+    def _next_dispatchable(self):
+        """
+        Find the oldest pending query that may start now, looking only at the
+        head of each endpoint's queue (FIFO order is kept within an endpoint)
+        
+        Returns:
+            Tuple of (queue entry or None, shortest rate-limit wait)
+        """
+        while True:
+            now = time.monotonic()
+            shortest_wait = None
+            oldest = None
+            for endpoint in list(self.pending_queries):
+                head = self._head(endpoint)
+                if head is None:
+                    continue
+                options = head["options"]
+                
+                # Expired queries are dispatched straight to their failure
+                deadline = options.get("deadline")
+                if deadline is not None and deadline.expired:
+                    return head, 0.0
+                
+                # Only multiplexed queries may use the slots beyond max_connections
+                if self.active_connections >= self._slot_limit(options):
+                    continue
+                
+                # Rate-limited endpoints are skipped until their token is due
+                ready_at = self.rate_limited_until.get(endpoint)
+                if ready_at is not None:
+                    if ready_at > now:
+                        wait = ready_at - now
+                        shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                        continue
+                    del self.rate_limited_until[endpoint]
+                
+                if oldest is None or head["sequence"] < oldest["sequence"]:
+                    oldest = head
             
-            # Execute query
-            self._execute_query(options, callbacks)
+            if oldest is None:
+                return None, shortest_wait
+            
+            wait = self.rate_limiter.reserve(oldest["endpoint"], oldest["options"].get("query_type"))
+            if wait == 0.0:
+                return oldest, 0.0
+            # Look again without this endpoint (at most once per endpoint)
+            self.rate_limited_until[oldest["endpoint"]] = now + wait
+    
+    def _take_pending(self, entry: Dict):
+        """Remove a dispatched entry, which is the head of its queue"""
+        endpoint = entry["endpoint"]
+        pending = self.pending_queries[endpoint]
+        pending.popleft()
+        if not pending:
+            del self.pending_queries[endpoint]
+        self._drop_pending(entry["options"].get("query_id"))
+    
+    def _process_next_query(self):
+        """Start pending queries while there are free slots and rate-limit tokens"""
+        with self.lock:
+            while self.pending_entries:
+                # Every slot the queued queries could use is busy
+                if self.active_connections >= self._queue_slot_limit():
+                    return
+                
+                entry, wait = self._next_dispatchable()
+                if entry is None:
+                    # Rate limited: wait in the queue, not in a worker slot
+                    if wait is not None:
+                        self._schedule_wakeup(wait)
+                    return
+                
+                # Get next query
+                self._take_pending(entry)
+                options = entry["options"]
+                callbacks = entry["callbacks"]
+                
+                # Queries whose deadline ran out while queued fail without using a slot.
+                # The failure goes through the result thread like any other error: emitting
+                # here would run the GUI's on_error (possibly a modal dialog) under the lock
+                deadline = options.get("deadline")
+                if deadline is not None and deadline.expired:
+                    self.result_queue.put({
+                        "type": "error",
+                        "query_id": options.get("query_id"),
+                        "error": f"Prazo de {deadline.budget:g}s esgotado antes do início da consulta"
+                    })
+                    continue
+                
+                # Execute query
+                self._execute_query(options, callbacks)
     
     def execute_query(self, options: QueryOptions, callbacks: Callbacks):
         """
         Execute a query using a worker
         
         Args:
-            options: Query options
+            options: Query options (an optional "deadline" is shared by queueing and every attempt;
+                "timeout_budget" in seconds creates one for this query)
             callbacks: Callbacks for progress, completion, and errors
         """
+        # Start the clock when the query is submitted, so queueing counts against the budget
+        if options.get("deadline") is None and options.get("timeout_budget"):
+            options["deadline"] = Deadline(options["timeout_budget"])
+        
         # Register callbacks
         query_id = options.get("query_id")
         self.result_processor.register_callbacks(query_id, callbacks)
         
-        # Check if we can execute immediately or need to queue
-        if self.active_connections >= self.max_connections:
-            print(f"Queueing query {query_id}. Active connections: {self.active_connections}")
-            self.pending_queries.append({"options": options, "callbacks": callbacks})
-        else:
-            self._execute_query(options, callbacks)
+        # Narrower name queries are filtered from cached results when possible
+        if self._try_refine_locally(options):
+            return
+        
+        # Queue the query and start whatever slots and rate limits allow
+        with self.lock:
+            self._enqueue(options, callbacks)
+            self._process_next_query()
+            if query_id not in self.active_workers:
+                print(f"Queueing query {query_id}. Active connections: {self.active_connections}")
     
     def _execute_query(self, options: QueryOptions, callbacks: Callbacks):
         """
@@ -421,10 +763,31 @@ class WorkerManager(QObject):
         query_id = options.get("query_id")
         print(f"Executing query {query_id}. Active connections: {self.active_connections}")
         
-        # Sempre usar ThreadedExecutor (modo sem worker) que demonstrou melhor desempenho
-        executor = ThreadedExecutor(options, self.result_queue)
-        executor.start()
+        # Sempre usar ThreadedExecutor (modo sem worker) que demonstrou melhor desempenho,
+        # ou o núcleo de E/S não bloqueante quando a consulta pede
+        cancel_token = CancellationToken()
+        if options.get("transport") in ("selectors", "h2"):
+            executor = NonBlockingExecutor(options, self.result_queue, cancel_token)
+        else:
+            executor = ThreadedExecutor(options, self.result_queue, cancel_token)
         self.active_workers[query_id] = executor
+        self.cancel_tokens[query_id] = cancel_token
+        if options.get("query_type") == "cpf":
+            self.progress_ticker.start(query_id)
+        executor.start()
+    
+    def prewarm(self, host: str, port: int, use_https: bool = True):
+        """
+        Open pooled connections to a server in the background so the first
+        queries skip DNS, TCP and TLS setup
+        
+        Args:
+            host: Server hostname or IP
+            port: Server port
+            use_https: Whether to use HTTPS (default True)
+        """
+        client = TCPClient(host=host, port=port, use_https=use_https)
+        return client.prewarm(self.max_connections)
     
     def cancel_query(self, query_id: str):
         """
@@ -433,34 +796,79 @@ class WorkerManager(QObject):
         Args:
             query_id: ID of query to cancel
         """
-        # Terminate worker if active
-        if query_id in self.active_workers:
-            worker = self.active_workers[query_id]
-            if isinstance(worker, multiprocessing.Process):
-                worker.terminate()
-            # Remove from active workers
-            del self.active_workers[query_id]
-            
-            # Unregister callbacks
-            self.result_processor.unregister_callbacks(query_id)
-            
-            # Decrement active connections counter
-            self.active_connections -= 1
+        # Unregister callbacks so late progress/results are dropped
+        self.result_processor.unregister_callbacks(query_id)
+        
+        with self.lock:
+            # Drop the query if it is still waiting for a slot
+            self._drop_pending(query_id)
             
-            # Process next query in queue
+            worker = self.active_workers.get(query_id)
+            cancel_token = self.cancel_tokens.get(query_id)
+        
+        if worker is None:
+            return
+        
+        # Stop the worker: processes are terminated, threads abort their
+        # response and retry waits through the token
+        if isinstance(worker, multiprocessing.Process):
+            worker.terminate()
+        if cancel_token is not None:
+            cancel_token.cancel()
+        
+        # Give the slot back immediately (exactly once)
+        if self._release_slot(query_id):
+            print(f"Cancelled query {query_id}. Active connections: {self.active_connections}")
             self._process_next_query()
     
+    def cancel_queries(self, query_ids: List[str]):
+        """
+        Cancel several queries (e.g. every query of a batch)
+        
+        Args:
+            query_ids: IDs of queries to cancel
+        """
+        query_ids = set(query_ids)
+        
+        # Drop pending ones first so cancelling running ones doesn't start them
+        with self.lock:
+            dropped = [query_id for query_id in query_ids if self._drop_pending(query_id)]
+            if dropped:
+                self._compact_pending()
+        
+        for query_id in query_ids:
+            self.cancel_query(query_id)
+    
+    def forget_queries(self, query_ids: List[str]):
+        """
+        Drop the callbacks still registered for queries that are no longer
+        pending or running (e.g. ones that never reported back), once the
+        UI has no use for them
+        
+        Args:
+            query_ids: IDs of finished queries
+        """
+        with self.lock:
+            for query_id in query_ids:
+                if query_id not in self.pending_entries and query_id not in self.active_workers:
+                    self.result_processor.unregister_callbacks(query_id)
+    
     def cancel_all_queries(self):
         """Cancel all running queries"""
-        # Create a copy of keys to avoid modifying during iteration
-        query_ids = list(self.active_workers.keys())
+        with self.lock:
+            # Clear pending queries first so cancelling doesn't start them
+            for query_id in self.pending_entries:
+                self.result_processor.unregister_callbacks(query_id)
+            self.pending_queries.clear()
+            self.pending_entries.clear()
+            self.pending_multiplexed = 0
+            
+            # Create a copy of keys to avoid modifying during iteration
+            query_ids = list(self.active_workers.keys())
         
         # Cancel each query
         for query_id in query_ids:
             self.cancel_query(query_id)
-        
-        # Clear pending queries
-        self.pending_queries.clear()
     
     def shutdown(self):
         """Shutdown the worker manager"""
@@ -472,4 +880,14 @@ class WorkerManager(QObject):
         
         # Wait for result thread to finish
         if self.result_thread.is_alive():
-            self.result_thread.join(1.0)  # Wait up to 1 second
\ No newline at end of file
+            self.result_thread.join(1.0)  # Wait up to 1 second
+        
+        # Stop waiting for rate-limit tokens
+        if self.rate_limit_timer is not None:
+            self.rate_limit_timer.cancel()
+        
+        # Stop estimating progress
+        self.progress_ticker.close()
+        
+        # Close pooled connections
+        connection_pool.close_all()
\ No newline at end of file